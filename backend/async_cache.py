@@ -0,0 +1,98 @@
+"""
+Async Cache - short-TTL LRU cache with single-flight loading.
+
+Concurrent requests for the same key share one in-flight load instead of each
+calling upstream. The load runs as its own task, so a caller that disconnects
+or runs out of its deadline does not cancel it for the others.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from deadline import no_deadline, within_deadline
+from metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+CACHE_HIT_AGE = Histogram(
+    "cache_hit_age_seconds", "Age of the entry served on a cache hit", ["cache"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+)
+
+
+class SingleFlightCache:
+    def __init__(self, ttl: float, max_entries: int = 1000, name: str = "cache"):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.name = name
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (stored_at, value)
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def peek(self, key: Hashable, max_age: Optional[float] = None) -> Optional[Any]:
+        """Cached value if younger than `max_age` (default: the TTL), without loading"""
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[0] >= (self.ttl if max_age is None else max_age):
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value, joining or starting a single upstream load on a miss"""
+        value = self.peek(key)
+        if value is not None:
+            self.hits += 1
+            CACHE_HIT_AGE.observe(time.monotonic() - self._entries[key][0], self.name)
+            return value
+        return await self.refresh(key, loader, count_miss=True)
+
+    async def refresh(self, key: Hashable, loader: Callable[[], Awaitable[Any]], count_miss: bool = False) -> Any:
+        """Force a load (joining one already in flight) and cache a non-None result"""
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            if count_miss:
+                self.misses += 1
+            # Shared by every joining caller, so it must not inherit this caller's deadline
+            with no_deadline():
+                task = asyncio.ensure_future(loader())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        # A caller out of time stops waiting; the shared load still completes for the others
+        return await within_deadline(asyncio.shield(task))
+
+    def _finish(self, key: Hashable, task: asyncio.Future):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Reading the exception also marks it retrieved when no caller is left waiting
+        if task.cancelled() or task.exception() is not None:
+            return
+        if task.result() is not None:
+            self.put(key, task.result())
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "in_flight": len(self._in_flight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0
+        }
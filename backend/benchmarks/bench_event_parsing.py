@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Event parsing benchmark - whole-page json.loads + transform versus streaming
+decode + field projection + transform, over synthetic Gamma /events pages.
+
+Reports wall time and peak traced memory for each path.
+
+Usage: python benchmarks/bench_event_parsing.py [--events 400 2000] [--runs 3]
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import logging
+
+from fixtures import synthetic_events_payload
+from json_stream import iter_json_array
+from market_service import MarketService, project_event
+
+CHUNK_SIZE = 64 * 1024
+
+
+def chunked(payload: bytes):
+    for start in range(0, len(payload), CHUNK_SIZE):
+        yield payload[start:start + CHUNK_SIZE]
+
+
+def parse_whole(service: MarketService, payload: bytes) -> int:
+    now = datetime.now(timezone.utc)
+    events = json.loads(b''.join(chunked(payload)))
+    return sum(service._transform_event(event, now) is not None for event in events)
+
+
+def parse_streaming(service: MarketService, payload: bytes) -> int:
+    now = datetime.now(timezone.utc)
+    return sum(
+        service._transform_event(project_event(event), now) is not None
+        for event in iter_json_array(chunked(payload))
+    )
+
+
+def measure(fn, service: MarketService, payload: bytes, runs: int) -> dict:
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        kept = fn(service, payload)
+        times.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    fn(service, payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"median_s": statistics.median(times), "peak_mb": peak / 1e6, "kept": kept}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, nargs="+", default=[400, 2000])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    # Per-event skip logging would dominate the timings
+    logging.disable(logging.CRITICAL)
+    service = MarketService()
+
+    print(f"{'events':>7} {'payload MB':>10} {'path':>10} {'median s':>9} {'peak MB':>8} {'kept':>5}")
+    for count in args.events:
+        payload = synthetic_events_payload(count)
+        for name, fn in (("whole", parse_whole), ("streaming", parse_streaming)):
+            result = measure(fn, service, payload, args.runs)
+            print(f"{count:>7} {len(payload) / 1e6:>10.1f} {name:>10} "
+                  f"{result['median_s']:>9.3f} {result['peak_mb']:>8.1f} {result['kept']:>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Logging overhead benchmark - cost of hot-path log calls to the caller and to
+the event loop, with the stream handler writing directly (the old basicConfig
+setup) versus through log_pipeline's queue, with and without rate limiting.
+
+Async tasks (request handlers) and worker threads (upstream calls run via
+to_thread) log from a handful of call sites at a fixed rate while the sink
+sleeps per write to mimic a container log pipe under backpressure.
+
+Usage: python benchmarks/bench_logging.py [--seconds 3] [--tasks 50] [--threads 4]
+        [--rate 2000] [--sink-delay-us 200]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import log_pipeline
+from log_pipeline import LOG_FORMAT, LOG_RECORDS_DROPPED, LOG_RECORDS_SUPPRESSED, RateLimitFilter, configure_logging
+
+logger = logging.getLogger("bench")
+
+
+class SlowSink:
+    """A stream whose writes block for `delay` seconds, like a full stderr pipe"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.lines = 0
+        self._devnull = open(os.devnull, "w")
+
+    def write(self, text: str):
+        self.lines += text.count("\n")
+        if self.delay:
+            time.sleep(self.delay)
+        self._devnull.write(text)
+
+    def flush(self):
+        self._devnull.flush()
+
+
+def setup(mode: str, sink: SlowSink):
+    root = logging.getLogger()
+    log_pipeline.stop_logging()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    if mode == "direct":
+        handler = logging.StreamHandler(sink)
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+    else:
+        unlimited = RateLimitFilter(burst=10 ** 9) if mode == "queued" else None
+        configure_logging(stream=sink, rate_limit=unlimited)
+
+
+def log_hot_paths(i: int, samples: list):
+    # Same shapes as the per-request lines the API used to emit at INFO
+    started = time.perf_counter_ns()
+    if i % 3 == 0:
+        logger.info(f"Fetching orderbook for market_id={i % 500}, token_id={i * 7919}")
+    elif i % 3 == 1:
+        logger.info(f"Returning cached markets (age: {i % 60:.1f}s)")
+    else:
+        logger.info(f"Skipping EXPIRED/ENDING-SOON market: Event {i} (ends: 2026-01-01T00:00:00Z)")
+    samples.append(time.perf_counter_ns() - started)
+
+
+async def run_mode(mode: str, args) -> dict:
+    sink = SlowSink(args.sink_delay_us / 1e6)
+    setup(mode, sink)
+    suppressed_before = LOG_RECORDS_SUPPRESSED.total()
+    dropped_before = LOG_RECORDS_DROPPED.total()
+
+    call_ns, lag = [], []
+    stop = time.perf_counter() + args.seconds
+    per_worker_interval = (args.tasks + args.threads) / args.rate
+
+    async def handler(task_id: int):
+        i = task_id
+        while time.perf_counter() < stop:
+            log_hot_paths(i, call_ns)
+            i += args.tasks
+            await asyncio.sleep(per_worker_interval)
+
+    def worker(thread_id: int):
+        i = thread_id
+        while time.perf_counter() < stop:
+            log_hot_paths(i, call_ns)
+            i += args.threads
+            time.sleep(per_worker_interval)
+
+    async def lag_probe(interval: float = 0.01):
+        while time.perf_counter() < stop:
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            lag.append(time.perf_counter() - started - interval)
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    await asyncio.gather(lag_probe(), *(handler(t) for t in range(args.tasks)))
+    for thread in threads:
+        thread.join()
+    drain_started = time.perf_counter()
+    log_pipeline.stop_logging()  # Flush the queue so written lines are complete
+    drain = time.perf_counter() - drain_started
+
+    call_ns.sort()
+    lag.sort()
+    return {
+        "calls": len(call_ns),
+        "call_p50_us": call_ns[len(call_ns) // 2] / 1000,
+        "call_p99_us": call_ns[int(len(call_ns) * 0.99)] / 1000,
+        "loop_lag_p99_ms": lag[int(len(lag) * 0.99)] * 1000,
+        "loop_lag_max_ms": lag[-1] * 1000,
+        "lines_written": sink.lines,
+        "suppressed": int(LOG_RECORDS_SUPPRESSED.total() - suppressed_before),
+        "dropped": int(LOG_RECORDS_DROPPED.total() - dropped_before),
+        "drain_s": drain,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=2000, help="log calls offered per second, all workers")
+    parser.add_argument("--sink-delay-us", type=float, default=200)
+    args = parser.parse_args()
+
+    print(f"{'mode':>15} {'calls':>7} {'call p50 us':>11} {'call p99 us':>11} {'lag p99 ms':>10} "
+          f"{'lag max ms':>10} {'written':>8} {'suppressed':>10} {'dropped':>8} {'drain s':>7}")
+    for mode in ("direct", "queued", "queued+sampled"):
+        r = asyncio.run(run_mode(mode, args))
+        print(f"{mode:>15} {r['calls']:>7} {r['call_p50_us']:>11.1f} {r['call_p99_us']:>11.1f} "
+              f"{r['loop_lag_p99_ms']:>10.1f} {r['loop_lag_max_ms']:>10.1f} {r['lines_written']:>8} "
+              f"{r['suppressed']:>10} {r['dropped']:>8} {r['drain_s']:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+MarketService microbenchmarks - the markets refresh pipeline (streamed page
+decode, expiry and placeholder filters, transform), orderbook and price-chart
+transforms, and snapshot analytics, each at several fixture scales.
+
+The Polymarket client is replaced by an in-memory stub serving synthetic
+fixtures, so only our own code is timed. Each case reports ops/sec (median of
+--repeats timed rounds), peak traced memory and retained allocation blocks per
+call.
+
+Results are compared against benchmarks/baseline.json. Throughput is compared
+as a ratio to a fixed reference workload timed in the same run, so a baseline
+saved on one machine still holds on a faster or slower one; peak memory is
+compared as is. A case whose relative ops/sec drops, or whose peak memory
+grows, by more than --threshold is flagged and the script exits 1.
+
+Usage: python benchmarks/bench_market_service.py [--cases refresh orderbook chart analytics]
+        [--threshold 0.25] [--repeats 5] [--min-time 0.2] [--save-baseline] [--baseline PATH]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fixtures import synthetic_book, synthetic_events, synthetic_events_payload, synthetic_history
+from ingest_pipeline import Pipeline
+from market_service import MarketService
+from market_snapshot import MarketSnapshot
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+# Peak memory changes smaller than this are allocator noise, not regressions
+MIN_PEAK_DELTA_KB = 64
+PAGE_SIZE = 100
+# Throughput of every case is stored and compared relative to this workload
+REFERENCE_KEY = "reference"
+
+SCALES = {
+    "refresh": [200, 1000, 5000],       # events crawled, in PAGE_SIZE pages
+    "orderbook": [10, 100, 1000],       # levels per side
+    "chart": [500, 5000, 50000],        # history points
+    "analytics": [300, 3000, 20000],    # markets in the snapshot
+}
+
+
+class StubResponse:
+    """Just enough of requests.Response for MarketService._decode_streamed_page"""
+
+    def __init__(self, body: bytes, url: str):
+        self.body = body
+        self.url = url
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def iter_content(self, chunk_size: int = 1):
+        return (self.body[i:i + chunk_size] for i in range(0, len(self.body), chunk_size))
+
+
+class StubClient:
+    """Serves fixtures in place of PolymarketClient"""
+
+    def __init__(self, events: List[Dict] = None, book: Dict = None, history: List[Dict] = None):
+        # Pre-encode the /events pages so the encoding isn't timed
+        self.pages = {offset: json.dumps(events[offset:offset + PAGE_SIZE]).encode()
+                      for offset in range(0, len(events or []), PAGE_SIZE)}
+        self.book = book
+        self.history = history or []
+
+    def open_events_page(self, limit: int = 100, offset: int = 0, tag=None):
+        return StubResponse(self.pages.get(offset, b"[]"), f"stub://events?offset={offset}")
+
+    def get_orderbook(self, token_id: str):
+        return self.book
+
+    def get_price_history(self, token_id: str, interval: str = "1h", **kwargs):
+        return self.history
+
+
+def refresh_pipeline(service: MarketService) -> Pipeline:
+    """The server's streaming markets refresh pipeline, minus the snapshot index stage"""
+    return Pipeline("bench_refresh", [
+        ("fetch", lambda offsets: service.open_event_pages(offsets, PAGE_SIZE)),
+        ("decode", service.decode_event_pages),
+        ("expiry_filter", service.filter_live_events),
+        ("placeholder_filter", service.filter_placeholder_outcomes),
+        ("transform", service.transform_events),
+    ])
+
+
+def run_refresh(loop: asyncio.AbstractEventLoop, pipeline: Pipeline, offsets: range) -> List[Dict]:
+    async def collect():
+        return [market async for market in pipeline.run(offsets)]
+    return loop.run_until_complete(collect())
+
+def build_case(name: str, scale: int) -> Callable[[], object]:
+    service = MarketService.__new__(MarketService)
+    if name == REFERENCE_KEY:
+        # Fixed pure-Python work that tracks the host's speed, not our code
+        payload = synthetic_events_payload(500)
+        return lambda: json.dumps(json.loads(payload), sort_keys=True)
+    if name == "refresh":
+        service.client = StubClient(events=synthetic_events(scale))
+        pipeline = refresh_pipeline(service)
+        offsets = range(0, scale, PAGE_SIZE)
+        loop = asyncio.new_event_loop()
+        return lambda: run_refresh(loop, pipeline, offsets)
+    if name == "orderbook":
+        service.client = StubClient(book=synthetic_book(scale))
+        return lambda: service.get_orderbook("bench")
+    if name == "chart":
+        service.client = StubClient(history=synthetic_history(scale))
+        return lambda: service.get_price_chart_data("bench")
+    if name == "analytics":
+        page = json.dumps(synthetic_events(min(scale, 2000))).encode()
+        sample = service.transform_page(page, datetime.now(timezone.utc))
+        # Cycle the transformed sample (with unique ids) up to the requested size
+        markets = [{**sample[i % len(sample)], 'id': f"bench-{i}"} for i in range(scale)]
+        # analytics() memoizes per snapshot, so each op builds the snapshot it aggregates
+        return lambda: MarketSnapshot(markets).analytics()
+    raise ValueError(f"unknown case {name}")
+
+
+def measure(op: Callable[[], object], repeats: int, min_time: float) -> Dict:
+    op()  # Warm caches and lazy imports
+
+    # Size each round so it runs for at least min_time
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            op()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed == 0 else max(2, int(min_time / elapsed) + 1)
+
+    rates = [loops / elapsed]
+    for _ in range(repeats - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            op()
+        rates.append(loops / (time.perf_counter() - started))
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    result = op()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+    del result
+
+    return {
+        "ops_per_s": round(statistics.median(rates), 2),
+        "peak_kb": round(peak / 1024, 1),
+        "retained_blocks": retained,
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        if "relative" in base and result["relative"] < base["relative"] * (1 - threshold):
+            regressions.append(f"{key}: ops/sec relative to {REFERENCE_KEY} {base['relative']} -> {result['relative']}")
+        if result["peak_kb"] > base["peak_kb"] * (1 + threshold) and result["peak_kb"] - base["peak_kb"] > MIN_PEAK_DELTA_KB:
+            regressions.append(f"{key}: peak KB {base['peak_kb']} -> {result['peak_kb']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cases", nargs="+", choices=list(SCALES), default=list(SCALES))
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed fractional regression")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timed round")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    # Per-event skip logging and per-call info logs would dominate the timings
+    logging.disable(logging.CRITICAL)
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    results = {}
+    reference_op = build_case(REFERENCE_KEY, 0)
+    print(f"{'case':>20} {'ops/sec':>10} {'relative':>10} {'baseline':>10} {'delta':>7} {'peak KB':>9} {'retained':>9}")
+    for name in args.cases:
+        # Re-time the reference next to each group so host speed drift cancels out
+        reference = measure(reference_op, args.repeats, args.min_time)
+        print(f"{REFERENCE_KEY:>20} {reference['ops_per_s']:>10.1f}")
+        for scale in SCALES[name]:
+            key = f"{name}[{scale}]"
+            result = results[key] = measure(build_case(name, scale), args.repeats, args.min_time)
+            result["relative"] = round(result["ops_per_s"] / reference["ops_per_s"], 6)
+            base = baseline.get(key, {}).get("relative")
+            delta = f"{result['relative'] / base - 1:+.0%}" if base else "-"
+            print(f"{key:>20} {result['ops_per_s']:>10.1f} {result['relative']:>10.4f} {base or '-':>10} {delta:>7} "
+                  f"{result['peak_kb']:>9.1f} {result['retained_blocks']:>9}")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps({**baseline, **results}, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\nRegressions beyond {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    if baseline:
+        print(f"\nNo regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark - import time of `server` and boot time to the first served
+/api/markets response.
+
+By default the boot run is seeded with a synthetic on-disk snapshot (the warm
+start path), so it measures our own startup cost rather than Polymarket
+latency. Pass --cold to boot without a snapshot and wait for the live fetch.
+
+Usage: python benchmarks/bench_startup.py [--runs 5] [--cold] [--port 8765]
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import requests
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+def bench_env(snapshot_path: str) -> dict:
+    env = dict(os.environ)
+    env.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    env.setdefault("DB_NAME", "polyfluid_bench")
+    env["SNAPSHOT_CACHE_PATH"] = snapshot_path
+    return env
+
+
+def seed_snapshot(path: str, markets: int = 300):
+    """Write a synthetic snapshot so boot can serve from the warm-start file"""
+    from market_snapshot import MarketSnapshot, write_snapshot_file
+    rows = [
+        {
+            "id": str(i), "title": f"Synthetic market {i}", "category": "Politics",
+            "is_multi_outcome": False, "yesPrice": 0.5, "noPrice": 0.5,
+            "volume": float(i * 1000), "liquidity": float(i * 100), "endDate": "2030-01-01",
+            "image": "", "change24h": 0.0, "slug": f"market-{i}", "token_id": str(10 ** 20 + i)
+        }
+        for i in range(markets)
+    ]
+    write_snapshot_file(MarketSnapshot(rows, version=1), path)
+
+
+def measure_import(env: dict) -> dict:
+    """Wall-clock time of `import server` in a fresh interpreter, plus the slowest modules"""
+    code = "import time; t = time.perf_counter(); import server; print(time.perf_counter() - t)"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        # Nesting is shown by indentation; keep the modules `server` imports directly
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            modules.append((int(cumulative_us), name.strip()))
+    modules.sort(reverse=True)
+    return {"seconds": float(result.stdout.strip()), "top_modules": modules[:8]}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_boot(env: dict, port: int, timeout: float = 60) -> float:
+    """Seconds from spawning uvicorn until /api/markets answers 200"""
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                response = requests.get(f"http://127.0.0.1:{port}/api/markets?limit=10", timeout=timeout)
+                if response.status_code == 200:
+                    return time.perf_counter() - started
+            except requests.exceptions.ConnectionError:
+                pass
+            time.sleep(0.01)
+        raise TimeoutError(f"/api/markets not served within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--cold", action="store_true", help="boot without a warm-start snapshot")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_path = os.path.join(tmp, "markets.snapshot")
+        env = bench_env(snapshot_path)
+
+        imports = [measure_import(env) for _ in range(args.runs)]
+        boots = []
+        for _ in range(args.runs):
+            if not args.cold:
+                seed_snapshot(snapshot_path)
+            elif os.path.exists(snapshot_path):
+                os.remove(snapshot_path)
+            boots.append(measure_boot(env, args.port or free_port()))
+
+    results = {
+        "import_seconds": {"median": statistics.median(i["seconds"] for i in imports), "min": min(i["seconds"] for i in imports)},
+        "first_markets_seconds": {"median": statistics.median(boots), "min": min(boots), "max": max(boots)},
+        "mode": "cold" if args.cold else "warm",
+        "top_modules": imports[-1]["top_modules"],
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"import server          median {results['import_seconds']['median'] * 1000:8.1f} ms   min {results['import_seconds']['min'] * 1000:8.1f} ms")
+    print(f"first /api/markets ({results['mode']}) median {results['first_markets_seconds']['median'] * 1000:8.1f} ms   "
+          f"min {results['first_markets_seconds']['min'] * 1000:8.1f} ms   max {results['first_markets_seconds']['max'] * 1000:8.1f} ms")
+    print("slowest direct imports of server (cumulative):")
+    for cumulative_us, name in results["top_modules"]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
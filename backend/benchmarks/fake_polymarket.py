@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Fake Polymarket - a local stand-in for the Gamma and CLOB endpoints the
+backend calls, for reproducible offline benchmarks.
+
+Serves Gamma /events, /markets and /markets/{slug}, and CLOB /book, /books,
+/prices and /prices-history from either a recorded /events fixture (optionally
+scaled up by cloning) or synthetic events. Latency, tail stalls and errors
+can be injected, and changed at runtime via POST /__fault.
+
+Point the backend at it with:
+    POLYMARKET_GAMMA_URL=http://127.0.0.1:9010 POLYMARKET_CLOB_URL=http://127.0.0.1:9010
+
+Usage:
+    python benchmarks/fake_polymarket.py serve [--events 5000 | --fixture events.json [--scale 20000]]
+        [--port 9010] [--latency-ms 20] [--jitter-ms 10] [--tail-prob 0.01] [--tail-ms 2000]
+        [--error-rate 0.0] [--error-status 503]
+    python benchmarks/fake_polymarket.py record --out events.json [--pages 5]
+"""
+import argparse
+import asyncio
+import copy
+import hashlib
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import Response
+
+from fixtures import synthetic_events
+
+GAMMA_URL = "https://gamma-api.polymarket.com"
+
+
+class FaultConfig:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, tail_prob: float = 0.0,
+                 tail_ms: float = 0.0, error_rate: float = 0.0, error_status: int = 503):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tail_prob = tail_prob
+        self.tail_ms = tail_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+
+    def update(self, values: Dict):
+        for key, value in values.items():
+            if hasattr(self, key):
+                setattr(self, key, type(getattr(self, key))(value))
+
+    def as_dict(self) -> Dict:
+        return dict(vars(self))
+
+
+def scale_events(events: List[Dict], count: int) -> List[Dict]:
+    """Clone recorded events (with fresh ids, slugs and token ids) until there are `count`"""
+    scaled = []
+    for i in range(count):
+        event = events[i % len(events)]
+        if i < len(events):
+            scaled.append(event)
+            continue
+        clone = copy.deepcopy(event)
+        suffix = f"-x{i // len(events)}"
+        clone['id'] = f"{event.get('id', i)}{suffix}"
+        clone['slug'] = f"{event.get('slug', '')}{suffix}"
+        for market in clone.get('markets') or []:
+            market['id'] = f"{market.get('id', '')}{suffix}"
+            market['slug'] = f"{market.get('slug', '')}{suffix}"
+            token_ids = market.get('clobTokenIds')
+            if isinstance(token_ids, str):
+                market['clobTokenIds'] = json.dumps([f"{t}{suffix}" for t in json.loads(token_ids)])
+        scaled.append(clone)
+    return scaled
+
+
+def _unit(seed: str) -> float:
+    """Deterministic value in [0, 1) for a token id"""
+    return int(hashlib.sha1(seed.encode()).hexdigest()[:8], 16) / 0x100000000
+
+
+class FakeMarketData:
+    def __init__(self, events: List[Dict]):
+        self.events = sorted(events, key=lambda e: float(e.get('volume24hr') or 0), reverse=True)
+        self.markets = [m for e in self.events for m in (e.get('markets') or [])]
+        self.markets_by_slug = {m.get('slug'): m for m in self.markets}
+        self.mid_by_token = {}
+        for market in self.markets:
+            try:
+                token_ids = json.loads(market.get('clobTokenIds') or '[]')
+                prices = json.loads(market.get('outcomePrices') or '[]')
+            except (TypeError, ValueError):
+                continue
+            for token_id, price in zip(token_ids, prices):
+                self.mid_by_token[str(token_id)] = float(price)
+
+    def mid(self, token_id: str) -> float:
+        return self.mid_by_token.get(token_id, 0.05 + 0.9 * _unit(token_id))
+
+    def book(self, token_id: str) -> Dict:
+        mid = self.mid(token_id)
+        rng = random.Random(token_id)
+        bids = [{"price": f"{max(mid - 0.01 * (i + 1), 0.001):.3f}", "size": f"{rng.uniform(10, 5000):.2f}"} for i in range(15)]
+        asks = [{"price": f"{min(mid + 0.01 * (i + 1), 0.999):.3f}", "size": f"{rng.uniform(10, 5000):.2f}"} for i in range(15)]
+        # CLOB lists bids ascending and asks descending (best price last)
+        return {"market": token_id, "asset_id": token_id, "bids": bids[::-1], "asks": asks[::-1],
+                "timestamp": str(int(time.time() * 1000))}
+
+    def history(self, token_id: str, start_ts: int, end_ts: int, fidelity: int) -> List[Dict]:
+        step = max(fidelity, 1) * 60
+        mid = self.mid(token_id)
+        points = []
+        for ts in range(start_ts - start_ts % step, end_ts + 1, step):
+            # Smooth deterministic wiggle around the mid, so repeated requests agree
+            offset = 0.05 * (_unit(f"{token_id}:{ts // (step * 12)}") - 0.5)
+            points.append({"t": ts, "p": round(min(max(mid + offset, 0.001), 0.999), 4)})
+        return points[-5000:]
+
+
+INTERVAL_SECONDS = {'1h': 3600, '6h': 6 * 3600, '1d': 86400, '1w': 7 * 86400, '1m': 30 * 86400, 'max': 365 * 86400}
+
+
+def create_app(data: FakeMarketData, faults: FaultConfig) -> FastAPI:
+    app = FastAPI(title="Fake Polymarket")
+    stats = {"requests": 0, "errors_injected": 0, "tail_stalls": 0}
+
+    def json_response(payload) -> Response:
+        return Response(json.dumps(payload), media_type="application/json")
+
+    @app.middleware("http")
+    async def inject_faults(request: Request, call_next):
+        if request.url.path.startswith("/__"):
+            return await call_next(request)
+        stats["requests"] += 1
+        delay = faults.latency_ms + random.uniform(-faults.jitter_ms, faults.jitter_ms)
+        if faults.tail_prob and random.random() < faults.tail_prob:
+            stats["tail_stalls"] += 1
+            delay = faults.tail_ms
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if faults.error_rate and random.random() < faults.error_rate:
+            stats["errors_injected"] += 1
+            return Response('{"error": "injected"}', status_code=faults.error_status, media_type="application/json")
+        return await call_next(request)
+
+    @app.get("/events")
+    async def events(limit: int = 100, offset: int = 0, order: str = "volume24hr", tag: Optional[str] = None):
+        selected = data.events
+        if tag:
+            selected = [e for e in selected if any(t.get('label') == tag or t.get('slug') == tag for t in e.get('tags') or [])]
+        if order == "liquidity":
+            selected = sorted(selected, key=lambda e: float(e.get('liquidity') or 0), reverse=True)
+        return json_response(selected[offset:offset + limit])
+
+    @app.get("/markets")
+    async def markets(limit: int = 50, offset: int = 0):
+        return json_response(data.markets[offset:offset + limit])
+
+    @app.get("/markets/{slug}")
+    async def market(slug: str):
+        found = data.markets_by_slug.get(slug)
+        if found is None:
+            return Response('{"error": "not found"}', status_code=404, media_type="application/json")
+        return json_response(found)
+
+    @app.get("/book")
+    async def book(token_id: str):
+        return json_response(data.book(token_id))
+
+    @app.post("/books")
+    async def books(request: Request):
+        body = await request.json()
+        return json_response([data.book(str(item.get('token_id'))) for item in body])
+
+    @app.post("/prices")
+    async def prices(request: Request):
+        body = await request.json()
+        quotes: Dict[str, Dict] = {}
+        for item in (body if isinstance(body, list) else body.get('params', [])):
+            token_id, side = str(item.get('token_id')), item.get('side', 'BUY')
+            mid = data.mid(token_id)
+            quotes.setdefault(token_id, {})[side] = f"{mid - 0.005 if side == 'BUY' else mid + 0.005:.4f}"
+        return json_response(quotes)
+
+    @app.get("/prices-history")
+    async def prices_history(market: str, interval: str = "1h", fidelity: int = 60,
+                             startTs: Optional[int] = Query(None), endTs: Optional[int] = Query(None)):
+        now = int(time.time())
+        if startTs is not None:
+            start, end = startTs, endTs if endTs is not None else now
+        else:
+            start, end = now - INTERVAL_SECONDS.get(interval, 3600), now
+        return json_response({"history": data.history(market, start, end, fidelity)})
+
+    @app.get("/__stats")
+    async def get_stats():
+        return {**stats, "events": len(data.events), "faults": faults.as_dict()}
+
+    @app.post("/__fault")
+    async def set_faults(request: Request):
+        faults.update(await request.json())
+        return faults.as_dict()
+
+    return app
+
+
+def load_events(args) -> List[Dict]:
+    if args.fixture:
+        events = json.loads(Path(args.fixture).read_text())
+        return scale_events(events, args.scale) if args.scale else events
+    return synthetic_events(args.events)
+
+
+def record(out: str, pages: int, page_size: int = 100):
+    """Save live Gamma /events pages as a fixture (needs network access)"""
+    import requests
+
+    events = []
+    for page in range(pages):
+        response = requests.get(f"{GAMMA_URL}/events", params={
+            "limit": page_size, "offset": page * page_size, "closed": "false", "archived": "false",
+            "active": "true", "order": "volume24hr", "ascending": "false"
+        }, timeout=30)
+        response.raise_for_status()
+        batch = response.json()
+        events.extend(batch)
+        if len(batch) < page_size:
+            break
+    Path(out).write_text(json.dumps(events))
+    print(f"Recorded {len(events)} events to {out}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve")
+    serve.add_argument("--port", type=int, default=9010)
+    serve.add_argument("--events", type=int, default=5000, help="synthetic events (ignored with --fixture)")
+    serve.add_argument("--fixture", help="recorded /events JSON array")
+    serve.add_argument("--scale", type=int, help="clone the fixture up to this many events")
+    serve.add_argument("--latency-ms", type=float, default=0)
+    serve.add_argument("--jitter-ms", type=float, default=0)
+    serve.add_argument("--tail-prob", type=float, default=0)
+    serve.add_argument("--tail-ms", type=float, default=0)
+    serve.add_argument("--error-rate", type=float, default=0)
+    serve.add_argument("--error-status", type=int, default=503)
+
+    rec = commands.add_parser("record")
+    rec.add_argument("--out", required=True)
+    rec.add_argument("--pages", type=int, default=5)
+
+    args = parser.parse_args()
+    if args.command == "record":
+        record(args.out, args.pages)
+        return
+
+    import uvicorn
+
+    faults = FaultConfig(args.latency_ms, args.jitter_ms, args.tail_prob, args.tail_ms, args.error_rate, args.error_status)
+    data = FakeMarketData(load_events(args))
+    print(f"Serving {len(data.events)} events ({len(data.markets)} markets) on port {args.port}")
+    uvicorn.run(create_app(data, faults), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
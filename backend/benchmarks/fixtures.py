@@ -0,0 +1,96 @@
+"""
+Synthetic Polymarket fixtures - deterministic Gamma /events payloads shaped
+like the real API (including the nested markets and the large fields we never
+read), plus CLOB books and price histories, for benchmarks that must not
+depend on Polymarket.
+"""
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+TAG_LABELS = ['Politics', 'Crypto', 'Sports', 'Economics', 'Business', 'Science', 'Culture']
+
+
+def synthetic_market(rng: random.Random, event_id: int, index: int) -> Dict:
+    yes_price = round(rng.uniform(0.01, 0.99), 3)
+    return {
+        'id': str(event_id * 100 + index),
+        'question': f"Synthetic question {event_id}-{index}?",
+        'groupItemTitle': f"Outcome {index}",
+        'description': "Resolution criteria. " * rng.randint(20, 60),
+        'outcomes': '["Yes", "No"]',
+        'outcomePrices': json.dumps([str(yes_price), str(round(1 - yes_price, 3))]),
+        'clobTokenIds': json.dumps([str(rng.getrandbits(96)), str(rng.getrandbits(96))]),
+        'acceptingOrders': True,
+        'slug': f"synthetic-{event_id}-{index}",
+        'volume': str(rng.uniform(1e3, 1e6)),
+        'liquidity': str(rng.uniform(1e2, 1e5)),
+        'rewardsMinSize': 50,
+        'umaResolutionStatuses': '[]',
+        'clobRewards': [{'id': str(index), 'rewardsAmount': 0, 'rewardsDailyRate': 0.001}],
+    }
+
+
+def synthetic_event(rng: random.Random, event_id: int, now: datetime) -> Dict:
+    outcomes = 1 if rng.random() < 0.6 else rng.randint(3, 12)
+    # A slice of events ends within a day, so the expiry filter has work to do
+    end = now + timedelta(hours=rng.choice([6, 48, 24 * 30, 24 * 200]))
+    return {
+        'id': str(event_id),
+        'ticker': f"synthetic-{event_id}",
+        'slug': f"synthetic-event-{event_id}",
+        'title': f"Synthetic event {event_id}",
+        'description': "Long form event description. " * rng.randint(10, 40),
+        'startDate': (now - timedelta(days=30)).isoformat().replace('+00:00', 'Z'),
+        'endDate': end.isoformat().replace('+00:00', 'Z'),
+        'image': f"https://example.invalid/{event_id}.png",
+        'icon': f"https://example.invalid/{event_id}-icon.png",
+        'active': True,
+        'closed': False,
+        'archived': False,
+        'volume': rng.uniform(1e3, 5e7),
+        'volume24hr': rng.uniform(0, 1e6),
+        'liquidity': rng.uniform(1e2, 1e6),
+        'commentCount': rng.randint(0, 5000),
+        'tags': [{'id': str(i), 'label': label, 'slug': label.lower()}
+                 for i, label in enumerate(rng.sample(TAG_LABELS, 3))],
+        'markets': [synthetic_market(rng, event_id, i) for i in range(outcomes)],
+    }
+
+
+def synthetic_events(count: int, seed: int = 7) -> List[Dict]:
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    return [synthetic_event(rng, event_id, now) for event_id in range(1, count + 1)]
+
+
+def synthetic_events_payload(count: int, seed: int = 7) -> bytes:
+    """The /events response body for `count` synthetic events"""
+    return json.dumps(synthetic_events(count, seed)).encode('utf-8')
+
+
+def synthetic_book(levels: int, seed: int = 7) -> Dict:
+    """A CLOB /book response with `levels` price levels per side (best price last, as CLOB sends them)"""
+    rng = random.Random(seed)
+    mid = rng.uniform(0.2, 0.8)
+    step = min(mid, 1 - mid) / (levels + 1)
+
+    def side(sign: int) -> List[Dict]:
+        return [{'price': f"{mid + sign * step * (i + 1):.4f}", 'size': f"{rng.uniform(1, 5000):.2f}"}
+                for i in reversed(range(levels))]
+
+    return {'market': str(seed), 'asset_id': str(seed), 'bids': side(-1), 'asks': side(1),
+            'timestamp': str(int(datetime.now(timezone.utc).timestamp() * 1000))}
+
+
+def synthetic_history(points: int, seed: int = 7, step_seconds: int = 60) -> List[Dict]:
+    """A CLOB /prices-history `history` list: a bounded random walk, one point per step"""
+    rng = random.Random(seed)
+    end = int(datetime.now(timezone.utc).timestamp())
+    price = rng.uniform(0.2, 0.8)
+    history = []
+    for i in range(points):
+        price = min(max(price + rng.gauss(0, 0.01), 0.001), 0.999)
+        history.append({'t': end - (points - i) * step_seconds, 'p': round(price, 4)})
+    return history
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+HTTP load test - async virtual users replaying the frontend's polling mix
+against the API, stepped through increasing user counts.
+
+Personas follow what the pages actually request:
+    markets    /api/markets at limit 20, 80 then 150 (the Markets page load)
+    trading    /api/markets?limit=10, then orderbook + chart for one outcome,
+               polled every 30s (chart with `since`)
+    portfolio  /api/markets?limit=100 + /api/positions, every 60s
+    analytics  /api/analytics, every 30s
+Poll intervals are divided by --time-scale so a short step carries the
+request mix of a long session. Users move to another market after a few polls.
+
+Each step reports throughput, per-route p50/p95/p99 and error rate, the
+server's event-loop lag (latency of a 10/s probe to the no-op GET /api/ route
+on top of its idle latency) and the load generator's own loop lag, which
+should stay low for the other numbers to be trusted.
+
+With --spawn, the fake Polymarket server and uvicorn are started locally
+(MongoDB from MONGO_URL, default localhost); otherwise --base-url is used.
+
+Usage:
+    python benchmarks/load_test.py run [--spawn] [--base-url URL] [--users 10 50 100] [--duration 30]
+        [--time-scale 10] [--mix trading=0.45,markets=0.35,portfolio=0.1,analytics=0.1]
+        [--label NAME] [--out results.json]
+    python benchmarks/load_test.py compare results-a.json results-b.json ...
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+BENCH_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCH_DIR.parent
+
+DEFAULT_MIX = {"trading": 0.45, "markets": 0.35, "portfolio": 0.1, "analytics": 0.1}
+POLLS_PER_MARKET = 4
+PROBE_INTERVAL = 0.1
+
+
+def percentile(ordered: List[float], fraction: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def summarize_ms(samples: List[float]) -> Dict:
+    ordered = sorted(samples)
+    return {
+        "p50": round(percentile(ordered, 0.50) * 1000, 1) if ordered else None,
+        "p95": round(percentile(ordered, 0.95) * 1000, 1) if ordered else None,
+        "p99": round(percentile(ordered, 0.99) * 1000, 1) if ordered else None,
+        "max": round(ordered[-1] * 1000, 1) if ordered else None,
+    }
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def get(self, http: httpx.AsyncClient, route: str, url: str, **params) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await http.get(url, params=params or None)
+        except httpx.HTTPError as e:
+            self.latencies[route].append(time.perf_counter() - started)
+            self.statuses[route][type(e).__name__] += 1
+            self.errors[route] += 1
+            return None
+        self.latencies[route].append(time.perf_counter() - started)
+        self.statuses[route][str(response.status_code)] += 1
+        if response.status_code >= 400:
+            self.errors[route] += 1
+            return None
+        return response
+
+
+class Catalog:
+    """Market ids and outcome token ids to aim trading users at"""
+
+    def __init__(self, markets: List[Dict]):
+        self.outcomes = []
+        for market in markets:
+            if market.get('is_multi_outcome'):
+                for outcome in market.get('outcomes') or []:
+                    if outcome.get('token_id'):
+                        self.outcomes.append((market['id'], outcome['token_id']))
+            elif market.get('token_id'):
+                self.outcomes.append((market['id'], market['token_id']))
+        if not self.outcomes:
+            raise RuntimeError("no markets with token ids to load-test against")
+
+    def pick(self, rng: random.Random):
+        # Traffic concentrates on the top of the list, as it does on the Markets page
+        return self.outcomes[min(int(rng.expovariate(1 / 15)), len(self.outcomes) - 1)]
+
+
+async def poll_sleep(seconds: float, time_scale: float, rng: random.Random):
+    await asyncio.sleep(seconds / time_scale * rng.uniform(0.8, 1.2))
+
+
+async def markets_user(http, rec: Recorder, catalog: Catalog, rng: random.Random, time_scale: float):
+    while True:
+        for limit in (20, 80, 150):
+            await rec.get(http, "GET /api/markets", "/api/markets", limit=limit)
+        await poll_sleep(30, time_scale, rng)
+
+
+async def trading_user(http, rec: Recorder, catalog: Catalog, rng: random.Random, time_scale: float):
+    while True:
+        await rec.get(http, "GET /api/markets", "/api/markets", limit=10)
+        market_id, token_id = catalog.pick(rng)
+        since = None
+        for _ in range(POLLS_PER_MARKET):
+            chart_params = {"token_id": token_id, "interval": "1h"}
+            if since is not None:
+                chart_params["since"] = since
+            _, chart = await asyncio.gather(
+                rec.get(http, "GET /api/markets/{id}/orderbook", f"/api/markets/{market_id}/orderbook", token_id=token_id),
+                rec.get(http, "GET /api/markets/{id}/chart", f"/api/markets/{market_id}/chart", **chart_params),
+            )
+            if chart is not None:
+                points = chart.json().get("data") or []
+                if points:
+                    since = points[-1]["timestamp"]
+            await poll_sleep(30, time_scale, rng)
+
+
+async def portfolio_user(http, rec: Recorder, catalog: Catalog, rng: random.Random, time_scale: float):
+    user_id = f"load-{rng.getrandbits(32):08x}"
+    while True:
+        await asyncio.gather(
+            rec.get(http, "GET /api/markets", "/api/markets", limit=100),
+            rec.get(http, "GET /api/positions", "/api/positions", user_id=user_id),
+        )
+        await poll_sleep(60, time_scale, rng)
+
+
+async def analytics_user(http, rec: Recorder, catalog: Catalog, rng: random.Random, time_scale: float):
+    while True:
+        await rec.get(http, "GET /api/analytics", "/api/analytics", timeframe="24h")
+        await poll_sleep(30, time_scale, rng)
+
+
+PERSONAS = {
+    "markets": markets_user,
+    "trading": trading_user,
+    "portfolio": portfolio_user,
+    "analytics": analytics_user,
+}
+
+
+async def probe_server_lag(http, samples: List[float]):
+    """Latency of the no-op root route: queueing behind a blocked or saturated server loop"""
+    while True:
+        started = time.perf_counter()
+        try:
+            await http.get("/api/")
+            samples.append(time.perf_counter() - started)
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(PROBE_INTERVAL)
+
+
+async def probe_client_lag(samples: List[float], interval: float = 0.05):
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(time.perf_counter() - started - interval, 0))
+
+
+async def idle_probe_latency(http, count: int = 20) -> float:
+    samples = []
+    for _ in range(count):
+        started = time.perf_counter()
+        await http.get("/api/")
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+async def run_step(base_url: str, catalog: Catalog, users: int, duration: float, mix: Dict[str, float],
+                   time_scale: float, seed: int) -> Dict:
+    rec = Recorder()
+    server_lag, client_lag = [], []
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=base_url, timeout=30, limits=limits) as http, \
+            httpx.AsyncClient(base_url=base_url, timeout=30) as probe_http:
+        idle = await idle_probe_latency(probe_http)
+        rng = random.Random(seed)
+        names, weights = zip(*mix.items())
+
+        async def start_user(index: int):
+            user_rng = random.Random(seed * 100003 + index)
+            # Stagger arrivals over one poll interval so users don't poll in lockstep
+            await asyncio.sleep(user_rng.uniform(0, 30 / time_scale))
+            persona = rng.choices(names, weights)[0]
+            await PERSONAS[persona](http, rec, catalog, user_rng, time_scale)
+
+        tasks = [asyncio.create_task(start_user(i)) for i in range(users)]
+        tasks.append(asyncio.create_task(probe_server_lag(probe_http, server_lag)))
+        tasks.append(asyncio.create_task(probe_client_lag(client_lag)))
+        started = time.perf_counter()
+        await asyncio.sleep(duration)
+        elapsed = time.perf_counter() - started
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    routes = {}
+    for route, samples in sorted(rec.latencies.items()):
+        routes[route] = {
+            "count": len(samples),
+            "rps": round(len(samples) / elapsed, 2),
+            **summarize_ms(samples),
+            "error_rate": round(rec.errors[route] / len(samples), 4),
+            "statuses": dict(rec.statuses[route]),
+        }
+    total = sum(len(samples) for samples in rec.latencies.values())
+    return {
+        "users": users,
+        "duration_s": round(elapsed, 1),
+        "throughput_rps": round(total / elapsed, 2),
+        "error_rate": round(sum(rec.errors.values()) / total, 4) if total else 0.0,
+        "routes": routes,
+        "server_loop_lag_ms": summarize_ms([max(s - idle, 0) for s in server_lag]),
+        "client_loop_lag_ms": summarize_ms(client_lag),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(url: str, timeout: float = 120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=5).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{url} did not become ready within {timeout}s")
+
+
+def spawn_stack(args) -> Tuple[str, List[subprocess.Popen]]:
+    """Start the fake upstream and the API server; returns the API base URL and the processes"""
+    upstream_port, api_port = free_port(), free_port()
+    upstream = subprocess.Popen(
+        [sys.executable, str(BENCH_DIR / "fake_polymarket.py"), "serve", "--port", str(upstream_port),
+         "--events", str(args.upstream_events), "--latency-ms", str(args.upstream_latency_ms),
+         "--jitter-ms", str(args.upstream_latency_ms / 2)],
+        stdout=subprocess.DEVNULL,
+    )
+    wait_ready(f"http://127.0.0.1:{upstream_port}/__stats")
+
+    env = dict(os.environ)
+    env.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    env.setdefault("DB_NAME", "polyfluid_load")
+    env["SNAPSHOT_CACHE_PATH"] = str(Path(tempfile.mkdtemp()) / "snapshot.bin")
+    env["POLYMARKET_GAMMA_URL"] = env["POLYMARKET_CLOB_URL"] = f"http://127.0.0.1:{upstream_port}"
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(api_port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{api_port}"
+    try:
+        wait_ready(f"{base_url}/api/markets?limit=1")
+    except RuntimeError:
+        api.terminate()
+        upstream.terminate()
+        raise
+    return base_url, [api, upstream]
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in PERSONAS:
+            raise argparse.ArgumentTypeError(f"unknown persona {name!r}")
+        mix[name] = float(weight)
+    return mix
+
+
+def print_step(step: Dict):
+    print(f"\n{step['users']} users: {step['throughput_rps']} req/s, errors {step['error_rate']:.2%}, "
+          f"server loop lag p99 {step['server_loop_lag_ms']['p99']} ms, "
+          f"generator lag p99 {step['client_loop_lag_ms']['p99']} ms")
+    print(f"  {'route':<34} {'count':>6} {'rps':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>7}")
+    for route, r in step["routes"].items():
+        print(f"  {route:<34} {r['count']:>6} {r['rps']:>7.1f} {r['p50']:>8} {r['p95']:>8} {r['p99']:>8} "
+              f"{r['error_rate']:>7.2%}")
+
+
+async def run(args) -> Dict:
+    processes = []
+    base_url = args.base_url
+    if args.spawn:
+        base_url, processes = spawn_stack(args)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as http:
+            response = await http.get("/api/markets", params={"limit": 150})
+            response.raise_for_status()
+            catalog = Catalog(response.json()["markets"])
+
+        steps = []
+        for i, users in enumerate(args.users):
+            step = await run_step(base_url, catalog, users, args.duration, args.mix, args.time_scale, args.seed + i)
+            print_step(step)
+            steps.append(step)
+    finally:
+        for proc in processes:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    return {
+        "label": args.label,
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {"users": args.users, "duration_s": args.duration, "time_scale": args.time_scale,
+                   "mix": args.mix, "spawned": args.spawn, "base_url": base_url},
+        "steps": steps,
+    }
+
+
+def compare(paths: List[str]):
+    """p95/p99 and throughput of each route and user count, side by side across result files"""
+    runs = [json.loads(Path(p).read_text()) for p in paths]
+    labels = [run.get("label") or Path(p).stem for run, p in zip(runs, paths)]
+    rows = defaultdict(dict)
+    for label, run in zip(labels, runs):
+        for step in run["steps"]:
+            for route, r in step["routes"].items():
+                rows[(step["users"], route)][label] = f"{r['p95']}/{r['p99']} ({r['error_rate']:.1%})"
+            rows[(step["users"], "total req/s | server lag p99")][label] = \
+                f"{step['throughput_rps']} | {step['server_loop_lag_ms']['p99']} ms"
+
+    width = max(24, *(len(label) for label in labels))
+    print(f"p95/p99 ms (error rate) per route\n{'users':>5}  {'route':<34}" + "".join(f" {label:>{width}}" for label in labels))
+    for (users, route), cells in sorted(rows.items()):
+        print(f"{users:>5}  {route:<34}" + "".join(f" {cells.get(label, '-'):>{width}}" for label in labels))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run")
+    run_parser.add_argument("--base-url", default="http://127.0.0.1:8001")
+    run_parser.add_argument("--spawn", action="store_true", help="start fake upstream + API server locally")
+    run_parser.add_argument("--upstream-events", type=int, default=2000)
+    run_parser.add_argument("--upstream-latency-ms", type=float, default=40)
+    run_parser.add_argument("--users", type=int, nargs="+", default=[10, 50, 100])
+    run_parser.add_argument("--duration", type=float, default=30, help="seconds per step")
+    run_parser.add_argument("--time-scale", type=float, default=10, help="divide page poll intervals by this")
+    run_parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX)
+    run_parser.add_argument("--seed", type=int, default=1)
+    run_parser.add_argument("--label", default="run")
+    run_parser.add_argument("--out", help="write results JSON here")
+
+    compare_parser = commands.add_parser("compare")
+    compare_parser.add_argument("results", nargs="+")
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        compare(args.results)
+        return
+
+    results = asyncio.run(run(args))
+    if args.out:
+        Path(args.out).write_text(json.dumps(results, indent=2) + "\n")
+        print(f"\nResults written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Request Deadlines - a per-request time budget carried in a contextvar.
+
+Every downstream call (Polymarket, web search, LLM) shrinks its timeout to the
+time left instead of running past the point where the client stopped waiting.
+The contextvar follows the request into asyncio.to_thread workers and tasks.
+"""
+import asyncio
+import contextlib
+import time
+from contextvars import ContextVar
+from typing import Awaitable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Header a client can send to say how many seconds it will wait
+DEADLINE_HEADER = "X-Request-Timeout"
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out before this step could finish"""
+
+
+def set_deadline(seconds: float):
+    """Start a budget of `seconds` from now; returns a token for reset_deadline"""
+    return _deadline.set(time.monotonic() + seconds)
+
+
+def reset_deadline(token):
+    _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current budget, or None outside a request"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def timeout_for(default: float) -> float:
+    """`default`, shrunk to the remaining budget; raises DeadlineExceeded if none is left"""
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded("request deadline exceeded")
+    return min(default, left)
+
+
+async def within_deadline(awaitable: Awaitable[T], reserve: float = 0.0) -> T:
+    """
+    Await with the remaining budget (minus `reserve`, kept for building the
+    response) as the timeout; the work is cancelled and DeadlineExceeded raised
+    when it runs out.
+    """
+    left = remaining()
+    if left is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, timeout=max(left - reserve, 0))
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded("request deadline exceeded")
+
+
+@contextlib.contextmanager
+def no_deadline():
+    """Run shared work (e.g. a cache load other requests join) free of the caller's budget"""
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
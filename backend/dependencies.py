@@ -0,0 +1,68 @@
+"""
+Service providers - services are constructed on first use instead of at import.
+
+Each service module is imported inside its provider, so heavy dependencies
+(solana/solders RPC client, emergentintegrations/litellm) are only loaded by
+the routes that need them, and a missing key only disables those routes.
+"""
+import hmac
+import logging
+import os
+from functools import lru_cache
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def get_market_service():
+    from market_service import MarketService
+    return MarketService()
+
+
+@lru_cache(maxsize=None)
+def get_solana_service():
+    from solana_service import SolanaService
+    return SolanaService()
+
+
+@lru_cache(maxsize=None)
+def get_insights_service():
+    from insights_service import MarketInsightsService
+    return MarketInsightsService()
+
+
+def solana_service_provider():
+    """FastAPI dependency; failed construction is retried on the next request"""
+    try:
+        return get_solana_service()
+    except ValueError as e:
+        logger.error(f"Solana service unavailable: {e}")
+        raise HTTPException(status_code=503, detail="Wallet service unavailable")
+
+
+def insights_service_provider():
+    """FastAPI dependency; failed construction is retried on the next request"""
+    try:
+        return get_insights_service()
+    except (ValueError, ImportError) as e:
+        logger.error(f"Insights service unavailable: {e}")
+        raise HTTPException(status_code=503, detail="Insights service unavailable")
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    """True if `token` matches ADMIN_TOKEN; always False when no ADMIN_TOKEN is set"""
+    expected = os.environ.get('ADMIN_TOKEN')
+    if not expected or not token:
+        return False
+    return hmac.compare_digest(token.encode(), expected.encode())
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """FastAPI dependency for admin routes; they don't exist unless ADMIN_TOKEN is set"""
+    if not os.environ.get('ADMIN_TOKEN'):
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
@@ -0,0 +1,145 @@
+"""
+Ingest Pipeline - chain async generator stages through bounded queues.
+
+Every stage runs as its own task, so a slow stage only blocks its producer once
+the queue between them is full (backpressure) while the stages ahead of it keep
+working, e.g. the next page is fetched while the previous one is transformed.
+Per-stage counters, busy time and queue depth are kept across runs.
+"""
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A stage consumes an async iterator of inputs and yields zero or more outputs per input
+Stage = Callable[[AsyncIterator], AsyncIterator]
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class StageMetrics:
+    def __init__(self, name: str, queue_size: int):
+        self.name = name
+        self.queue_size = queue_size
+        self.items_in = 0
+        self.items_out = 0
+        self.active_seconds = 0.0  # From receiving an input until asking for the next one
+        self.blocked_seconds = 0.0  # Part of that spent waiting for room in the downstream queue
+        self.max_queue_depth = 0
+        self.queue = None
+
+    def stats(self) -> Dict:
+        busy_seconds = max(self.active_seconds - self.blocked_seconds, 0.0)
+        return {
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "busy_seconds": round(busy_seconds, 4),
+            "blocked_seconds": round(self.blocked_seconds, 4),
+            "throughput_per_s": round(self.items_in / busy_seconds, 1) if busy_seconds else None,
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "max_queue_depth": self.max_queue_depth,
+            "queue_size": self.queue_size,
+        }
+
+
+class Pipeline:
+    def __init__(self, name: str, stages: List[Tuple[str, Stage]], queue_size: int = 4):
+        """
+        Args:
+            name: label used in logs and stats
+            stages: (name, stage) pairs in processing order
+            queue_size: capacity of the queue after each stage
+        """
+        self.name = name
+        self.stages = stages
+        self.queue_size = queue_size
+        self.metrics = {stage_name: StageMetrics(stage_name, queue_size) for stage_name, _ in stages}
+        self.runs = 0
+        self.failures = 0
+        self.last_run_seconds = None
+
+    async def run(self, items: Iterable) -> AsyncIterator:
+        """
+        Feed `items` into the first stage and yield what the last stage produces.
+        Leaving the loop early cancels every stage still running.
+        """
+        self.runs += 1
+        started = time.perf_counter()
+        tasks = []
+        upstream = _from_iterable(items)
+        for stage_name, stage in self.stages:
+            metrics = self.metrics[stage_name]
+            metrics.queue = asyncio.Queue(self.queue_size)
+            outputs = stage(self._counted(upstream, metrics))
+            tasks.append(asyncio.ensure_future(self._pump(outputs, metrics)))
+            upstream = _drain(metrics.queue)
+        try:
+            async for item in upstream:
+                yield item
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for metrics in self.metrics.values():
+                metrics.queue = None
+            self.last_run_seconds = time.perf_counter() - started
+
+    @staticmethod
+    async def _counted(upstream: AsyncIterator, metrics: StageMetrics) -> AsyncIterator:
+        async for item in upstream:
+            metrics.items_in += 1
+            # Until the stage asks for the next input it is working on this one
+            handed_over = time.perf_counter()
+            yield item
+            metrics.active_seconds += time.perf_counter() - handed_over
+
+    async def _pump(self, outputs: AsyncIterator, metrics: StageMetrics):
+        queue = metrics.queue
+        try:
+            async for item in outputs:
+                metrics.items_out += 1
+                blocked = time.perf_counter()
+                await queue.put(item)
+                metrics.blocked_seconds += time.perf_counter() - blocked
+                metrics.max_queue_depth = max(metrics.max_queue_depth, queue.qsize())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"{self.name}: stage '{metrics.name}' failed: {e}")
+            await queue.put(_Failure(e))
+            return
+        await queue.put(_DONE)
+
+    def stats(self) -> Dict:
+        return {
+            "name": self.name,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_run_seconds": round(self.last_run_seconds, 4) if self.last_run_seconds is not None else None,
+            "stages": {stage_name: self.metrics[stage_name].stats() for stage_name, _ in self.stages},
+        }
+
+
+async def _from_iterable(items: Iterable) -> AsyncIterator:
+    for item in items:
+        yield item
+
+
+async def _drain(queue: asyncio.Queue) -> AsyncIterator:
+    while True:
+        item = await queue.get()
+        if item is _DONE:
+            return
+        if isinstance(item, _Failure):
+            raise item.error
+        yield item
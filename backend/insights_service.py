@@ -6,9 +6,14 @@ import logging
 from emergentintegrations.llm.chat import LlmChat, UserMessage
 import asyncio
 import httpx
+from deadline import DeadlineExceeded, remaining, within_deadline
 
 logger = logging.getLogger(__name__)
 
+# Web search timeout, and the least time left for which an LLM call is still worth starting
+SEARCH_TIMEOUT = 5.0
+LLM_MIN_SECONDS = 3.0
+
 class MarketInsightsService:
     def __init__(self):
         self.api_key = os.environ.get('EMERGENT_LLM_KEY')
@@ -27,12 +32,18 @@ class MarketInsightsService:
             outcomes: List of possible outcomes (for multi-outcome markets)
             
         Returns:
-            dict with analysis, tips, and sentiment
+            dict with analysis, tips, and sentiment; a degraded data-only answer
+            when the request's deadline does not leave time for the LLM
         """
         try:
             # First, get real-time context using web search
             search_context = await self._fetch_market_context(market_title, market_category)
             
+            left = remaining()
+            if left is not None and left < LLM_MIN_SECONDS:
+                # Not enough time left for an answer; don't start work that would be thrown away
+                return self._degraded_insights(outcomes)
+            
             # Create chat instance with system message emphasizing data-driven analysis
             chat = LlmChat(
                 api_key=self.api_key,
@@ -87,7 +98,7 @@ Be specific and data-driven."""
             
             # Send message and get response
             user_message = UserMessage(text=prompt)
-            response = await chat.send_message(user_message)
+            response = await within_deadline(chat.send_message(user_message), reserve=0.1)
             
             # Parse response into structured format
             analysis_text = response if isinstance(response, str) else str(response)
@@ -105,6 +116,10 @@ Be specific and data-driven."""
                 "updated_at": "just now"
             }
             
+        except (DeadlineExceeded, asyncio.TimeoutError):
+            # asyncio.TimeoutError: the LLM client's own timeout, which also leaves no time to retry
+            logger.warning(f"Insights for {market_title} ran out of time, returning market data only")
+            return self._degraded_insights(outcomes)
         except Exception as e:
             logger.error(f"Error generating insights for {market_title}: {e}", exc_info=True)
             return {
@@ -114,10 +129,32 @@ Be specific and data-driven."""
                 "sentiment": "neutral"
             }
     
+    def _degraded_insights(self, outcomes: list = None) -> dict:
+        """Answer from market probabilities alone when there is no time for the LLM"""
+        if outcomes and len(outcomes) > 1:
+            leaders = sorted(outcomes, key=lambda x: x.get('price', 0), reverse=True)[:3]
+            leaders_text = ", ".join(f"{o.get('title', 'Unknown')} {int(o.get('price', 0)*100)}%" for o in leaders)
+            analysis = f"Live analysis timed out. Market favourites right now: {leaders_text}."
+        else:
+            analysis = "Live analysis timed out. Please try again."
+        return {
+            "success": False,
+            "degraded": True,
+            "error": "Insights deadline exceeded",
+            "analysis": analysis,
+            "sentiment": "neutral"
+        }
+    
     async def _fetch_market_context(self, market_title: str, category: str) -> str:
         """
         Fetch real-time context about the market using DuckDuckGo search
         """
+        # The search must leave enough of the request's budget for the LLM call
+        left = remaining()
+        timeout = SEARCH_TIMEOUT if left is None else min(SEARCH_TIMEOUT, left - LLM_MIN_SECONDS)
+        if timeout <= 0.2:
+            return "Analyze based on current market probabilities and general knowledge."
+        
         try:
             # Clean the market title for better search results
             # Remove special characters and question marks
@@ -135,7 +172,7 @@ Be specific and data-driven."""
             
             # Use httpx to make a simple search request
             # Note: Using DuckDuckGo Instant Answer API (no key required)
-            async with httpx.AsyncClient(timeout=5.0) as client:
+            async with httpx.AsyncClient(timeout=timeout) as client:
                 response = await client.get(
                     "https://api.duckduckgo.com/",
                     params={
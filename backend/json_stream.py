@@ -0,0 +1,73 @@
+"""
+Streaming JSON helpers - decode a top-level JSON array one element at a time
+from a chunked byte stream, so large upstream pages never have to be held as
+a single document.
+"""
+import codecs
+import json
+from typing import Any, Iterable, Iterator
+
+_WHITESPACE = ' \t\n\r'
+_DELIMITERS = _WHITESPACE + ',]'
+
+
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """
+    Yield the elements of a JSON array as soon as each one is complete.
+
+    Raises ValueError if the stream is not a JSON array or ends mid-element.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    pos = 0
+    started = False
+    finished = False
+
+    for chunk in _with_final_marker(chunks):
+        if chunk is None:
+            finished = True
+            buffer = buffer[pos:] + utf8.decode(b'', final=True)
+        else:
+            buffer = buffer[pos:] + utf8.decode(chunk)
+        pos = 0
+
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if not started:
+                if buffer[pos] != '[':
+                    raise ValueError("Expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == ',':
+                pos += 1
+                continue
+            if buffer[pos] == ']':
+                return
+            try:
+                element, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if finished:
+                    raise ValueError("JSON array ended mid-element")
+                break  # Element continues in the next chunk
+            # A bare number may still be growing ("-5" of "-500.0") until a delimiter follows it
+            if not finished and buffer[end - 1] not in '}]"' and (
+                    end == len(buffer) or buffer[end] not in _DELIMITERS):
+                break
+            yield element
+            pos = end
+
+        if finished:
+            break
+    raise ValueError("JSON array was not terminated")
+
+
+def _with_final_marker(chunks: Iterable[bytes]) -> Iterator:
+    for chunk in chunks:
+        if chunk:
+            yield chunk
+    yield None
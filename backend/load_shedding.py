@@ -0,0 +1,152 @@
+"""
+Load Shedding - per route class concurrency limits with bounded wait queues.
+
+Expensive work (LLM insights, analytics, cold upstream fetches) runs under a
+limiter per class so a burst of it can't take every worker thread and event
+loop slot from the cheap cached routes, which are not limited at all. Past
+the limit, callers wait in a short priority queue; when that is full or the
+wait runs out they get a fast 503 with a Retry-After estimated from recent
+hold times instead of piling up. Background work (prefetch) queues behind
+interactive requests and is the first to be displaced.
+"""
+import asyncio
+import contextlib
+import heapq
+import itertools
+import logging
+import math
+import time
+from contextvars import ContextVar
+from typing import Dict, List
+
+from fastapi import HTTPException
+
+from deadline import remaining
+from metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+_priority: ContextVar[int] = ContextVar("load_priority", default=PRIORITY_INTERACTIVE)
+
+LOAD_SHED = Counter(
+    "load_shed_total", "Requests rejected by a route class limiter", ["route_class", "reason"]
+)
+
+
+class Overloaded(HTTPException):
+    """503 with Retry-After; an HTTPException so routes that re-raise those pass it through"""
+
+    def __init__(self, route_class: str, retry_after: int):
+        super().__init__(
+            status_code=503,
+            detail=f"Too many {route_class} requests, retry later",
+            headers={"Retry-After": str(retry_after)}
+        )
+        self.retry_after = retry_after
+
+
+@contextlib.contextmanager
+def background_priority():
+    """Limiters entered inside this block (including by tasks it starts) queue as background work"""
+    token = _priority.set(PRIORITY_BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class ConcurrencyLimiter:
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float = 5.0):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters: List[tuple] = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._hold_time = 1.0  # EWMA of seconds a slot is held, for Retry-After
+        self.admitted = 0
+        self.queued = 0
+        self.shed: Dict[str, int] = {}
+
+    def _shed(self, reason: str) -> Overloaded:
+        self.shed[reason] = self.shed.get(reason, 0) + 1
+        LOAD_SHED.inc(self.name, reason)
+        # Time for everyone ahead (and this caller) to get through at the current hold time
+        retry_after = max(1, math.ceil(self._hold_time * (len(self._waiters) + 1) / self.limit))
+        return Overloaded(self.name, retry_after)
+
+    async def acquire(self):
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+        priority = _priority.get()
+        if len(self._waiters) >= self.max_queue:
+            worst = max(self._waiters)
+            if worst[0] <= priority:
+                raise self._shed("queue_full")
+            # Make room by turning away the lowest priority waiter
+            self._waiters.remove(worst)
+            heapq.heapify(self._waiters)
+            worst[2].set_exception(self._shed("displaced"))
+
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._seq), waiter)
+        heapq.heappush(self._waiters, entry)
+        self.queued += 1
+        timeout = self.queue_timeout
+        left = remaining()
+        if left is not None:
+            timeout = max(min(timeout, left), 0)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            self._discard(entry)
+            raise self._shed("queue_timeout")
+        except asyncio.CancelledError:
+            self._discard(entry)
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                self.release()  # The slot was handed over just as the caller went away
+            raise
+        self.admitted += 1
+
+    def _discard(self, entry: tuple):
+        if entry in self._waiters:
+            self._waiters.remove(entry)
+            heapq.heapify(self._waiters)
+
+    def release(self):
+        # Hand the slot straight to the next waiter so a new arrival can't jump the queue
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """Hold one of the class's slots for the duration of the block"""
+        await self.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._hold_time = 0.8 * self._hold_time + 0.2 * (time.monotonic() - started)
+            self.release()
+
+    def stats(self) -> Dict:
+        return {
+            "limit": self.limit,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": len(self._waiters),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed": dict(self.shed),
+            "avg_hold_s": round(self._hold_time, 3),
+        }
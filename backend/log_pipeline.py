@@ -0,0 +1,129 @@
+"""
+Log Pipeline - non-blocking logging for the request and refresh hot paths.
+
+Records are rate-limited per call site, then handed to a bounded queue that a
+background thread drains into the real stream handler, so a slow stderr
+(e.g. a container log pipe under backpressure) never stalls the event loop.
+Past its burst, a call site is sampled and the number of records it
+suppressed is appended to the next line that gets through. Records dropped
+because the queue is full are counted rather than waited on.
+"""
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+from metrics import Counter
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+LOG_RECORDS_SUPPRESSED = Counter(
+    "log_records_suppressed_total", "Log records dropped by per-call-site rate limiting", ["logger"]
+)
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total", "Log records dropped because the log queue was full"
+)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Per call site (logger, file, line): the first `burst` records of each
+    `window` seconds pass, then one in `sample_every`. ERROR and above always pass.
+    """
+
+    def __init__(self, burst: int = 10, window: float = 10.0, sample_every: int = 100):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.sample_every = sample_every
+        self._sites: Dict[tuple, list] = {}  # key -> [window_start, seen_in_window, suppressed_since_last_pass]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR:
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None:
+                site = self._sites[key] = [now, 0, 0]
+            elif now - site[0] >= self.window:
+                site[0], site[1] = now, 0
+            site[1] += 1
+            seen = site[1]
+            if seen > self.burst and (seen - self.burst) % self.sample_every:
+                site[2] += 1
+                suppressed = None
+            else:
+                suppressed, site[2] = site[2], 0
+        if suppressed is None:
+            LOG_RECORDS_SUPPRESSED.inc(record.name)
+            return False
+        if suppressed:
+            record.msg = f"{record.msg} [+{suppressed} similar suppressed]"
+        return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            pending = {f"{name}:{lineno}": site[2] for (name, _, lineno), site in self._sites.items() if site[2]}
+        return {"call_sites": len(self._sites), "pending_suppressed": pending}
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the message now (its args could change later) but leave traceback
+        # formatting, the expensive part, to the listener thread
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def configure_logging(
+    level: int = logging.INFO,
+    fmt: str = LOG_FORMAT,
+    max_queue: int = 10000,
+    rate_limit: Optional[RateLimitFilter] = None,
+    stream=None,
+) -> logging.handlers.QueueListener:
+    """Route the root logger through the rate limiter and a queue drained by a background thread"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    sink = logging.StreamHandler(stream if stream is not None else sys.stderr)
+    sink.setFormatter(logging.Formatter(fmt))
+
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=max_queue))
+    handler.addFilter(rate_limit if rate_limit is not None else RateLimitFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(handler.queue, sink, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """Flush what is queued and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
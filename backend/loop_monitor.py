@@ -0,0 +1,137 @@
+"""
+Loop Monitor - event loop lag measurement and blocking-call capture.
+
+A heartbeat task wakes every `interval` and records how late it ran. A
+watchdog thread checks the heartbeat; once it is more than `threshold` late,
+something is holding the loop (a synchronous requests or Solana call, a large
+transform), so the watchdog grabs the loop thread's stack at that moment.
+When the heartbeat runs again, the stall's length is charged to that stack
+and to the route whose endpoint is on it.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from metrics import LOOP_LAG, Histogram
+
+logger = logging.getLogger(__name__)
+
+LOOP_BLOCKED = Histogram(
+    "event_loop_blocked_seconds", "Stalls longer than the watchdog threshold, by the route holding the loop",
+    ["route"], buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+MAX_STACK_FRAMES = 30
+
+
+class LoopWatchdog:
+    def __init__(self, threshold: float = 0.1, interval: float = 0.05, max_offenders: int = 200):
+        self.threshold = threshold
+        self.interval = interval
+        self.max_offenders = max_offenders
+        self._routes: Dict[object, str] = {}  # endpoint code object -> route template
+        self._loop_thread: Optional[int] = None
+        self._beat = time.monotonic()
+        self._capture: Optional[tuple] = None  # (beat it belongs to, route, stack, signature)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._offenders: Dict[tuple, Dict] = {}
+        self._by_route: Dict[str, float] = {}
+        self.recent: "deque[Dict]" = deque(maxlen=50)
+        self.stalls = 0
+        self.blocked_seconds = 0.0
+
+    def set_routes(self, routes):
+        """Map endpoint functions to route templates so stalls inside a handler name their route"""
+        self._routes = {
+            route.endpoint.__code__: route.path
+            for route in routes if hasattr(getattr(route, "endpoint", None), "__code__")
+        }
+
+    def _describe(self, frame) -> tuple:
+        """(route, stack lines outermost first, line-independent signature) for a loop thread frame"""
+        route = None
+        task = None
+        stack, signature = [], []
+        while frame is not None:
+            code = frame.f_code
+            filename = os.path.basename(code.co_filename)
+            if route is None:
+                route = self._routes.get(code)
+            if task is None and filename == "events.py" and code.co_name == "_run" and signature:
+                task = signature[-1]  # The callback the loop was running when it stalled
+            stack.append(f"{filename}:{frame.f_lineno} {code.co_name}")
+            signature.append(f"{filename}:{code.co_name}")
+            frame = frame.f_back
+        stack.reverse()
+        signature.reverse()
+        return route or f"(task {task or 'unknown'})", stack[-MAX_STACK_FRAMES:], tuple(signature)
+
+    def _watch(self):
+        poll = self.threshold / 2
+        while not self._stop.wait(poll):
+            beat = self._beat
+            if time.monotonic() - beat < self.threshold or (self._capture and self._capture[0] == beat):
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            route, stack, signature = self._describe(frame)
+            with self._lock:
+                if self._beat == beat:
+                    self._capture = (beat, route, stack, signature)
+
+    def _record(self, blocked: float, route: str, stack: List[str], signature: tuple):
+        self.stalls += 1
+        self.blocked_seconds += blocked
+        self._by_route[route] = self._by_route.get(route, 0.0) + blocked
+        LOOP_BLOCKED.observe(blocked, route)
+        # Same route and call path, ignoring line numbers, count as one offender
+        key = (route, signature)
+        offender = self._offenders.get(key)
+        if offender is None:
+            if len(self._offenders) >= self.max_offenders:
+                del self._offenders[min(self._offenders, key=lambda k: self._offenders[k]["total_s"])]
+            offender = self._offenders[key] = {"route": route, "count": 0, "total_s": 0.0, "max_s": 0.0, "stack": stack}
+        offender["count"] += 1
+        offender["total_s"] += blocked
+        if blocked >= offender["max_s"]:
+            offender["max_s"], offender["stack"] = blocked, stack
+        self.recent.append({"at": time.time(), "route": route, "blocked_s": round(blocked, 3), "leaf": stack[-1]})
+        logger.warning(f"Event loop blocked {blocked * 1000:.0f}ms in {route} at {stack[-1]}")
+
+    async def run(self):
+        """Heartbeat on the loop; also starts the watchdog thread"""
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                now = time.monotonic()
+                lag = max(now - self._beat - self.interval, 0.0)
+                LOOP_LAG.observe(lag)
+                with self._lock:
+                    capture, self._capture = self._capture, None
+                    self._beat = now
+                if capture is not None:
+                    self._record(lag, *capture[1:])
+        finally:
+            self._stop.set()
+
+    def stats(self, top: int = 10) -> Dict:
+        worst = sorted(self._offenders.values(), key=lambda o: o["total_s"], reverse=True)[:top]
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "stalls": self.stalls,
+            "blocked_s": round(self.blocked_seconds, 3),
+            "by_route": {route: round(total, 3) for route, total in sorted(self._by_route.items(), key=lambda i: -i[1])},
+            "worst": [{**o, "total_s": round(o["total_s"], 3), "max_s": round(o["max_s"], 3)} for o in worst],
+            "recent": list(self.recent)[::-1],
+        }
@@ -1,192 +1,328 @@
-from polymarket_client import PolymarketClient
+from polymarket_client import EVENTS_STREAM_CHUNK_SIZE, PolymarketClient
+from json_stream import iter_json_array
+from deadline import DeadlineExceeded
+import asyncio
 import logging
 import json
-from typing import List, Dict, Optional
+from datetime import datetime, timezone, timedelta
+from typing import AsyncIterator, List, Dict, Optional
+from metrics import Counter
 
 logger = logging.getLogger(__name__)
 
+# Filtered events are counted here and logged per event only at DEBUG; a refresh skips hundreds
+EVENTS_SKIPPED = Counter("market_events_skipped_total", "Events dropped by the expiry/closed filter", ["reason"])
+
+# Gamma event/market fields read by the transform; everything else is dropped right after decoding
+EVENT_FIELDS = ('id', 'title', 'endDate', 'closed', 'archived', 'volume', 'volume24hr',
+                'liquidity', 'image', 'icon', 'slug')
+EVENT_MARKET_FIELDS = ('id', 'question', 'groupItemTitle', 'description', 'outcomePrices',
+                       'clobTokenIds', 'acceptingOrders', 'slug')
+
+def project_event(event: Dict) -> Dict:
+    """Keep only the fields of a raw Gamma event that the transform uses"""
+    projected = {field: event[field] for field in EVENT_FIELDS if field in event}
+    projected['tags'] = [{'label': tag.get('label', '')} for tag in (event.get('tags') or [])[:1]]
+    projected['markets'] = []
+    for market in (event.get('markets') or []):
+        trimmed = {field: market[field] for field in EVENT_MARKET_FIELDS if field in market}
+        if trimmed.get('groupItemTitle'):
+            # The (often long) description is only read as a fallback outcome title
+            trimmed.pop('description', None)
+        projected['markets'].append(trimmed)
+    return projected
+
 class MarketService:
     def __init__(self):
         self.client = PolymarketClient()
     
-    def get_trending_markets(self, limit: int = 200) -> List[Dict]:
-        """Get trending markets from Polymarket using Events API - ONLY ACTIVE/ONGOING"""
+    @staticmethod
+    def _fetch_limit(limit: int) -> int:
+        # Fetch MORE markets from API since filtering will reduce count significantly
+        # Request 2x the desired limit to account for filtering
+        return min(limit * 2, 400)
+    
+    def event_page_offsets(self, limit: int, page_size: int, max_events: Optional[int] = None) -> range:
+        """Gamma /events offsets to page through for `limit` trending markets"""
+        return range(0, max_events or self._fetch_limit(limit), page_size)
+    
+    # Refresh pipeline stages (see ingest_pipeline.Pipeline): each consumes an async
+    # iterator from the previous stage and yields to the next one
+    
+    async def fetch_event_pages(self, offsets: AsyncIterator[int], page_size: int) -> AsyncIterator[bytes]:
+        """Page fetch stage: raw /events bodies (for the transform pool); a failed page fails the whole refresh"""
+        async for offset in offsets:
+            body = await asyncio.to_thread(self.client.get_events_page, page_size, offset)
+            if body is None:
+                # A partial crawl would silently drop markets from the snapshot
+                raise RuntimeError(f"Events page at offset {offset} unavailable")
+            yield body
+    
+    async def open_event_pages(self, offsets: AsyncIterator[int], page_size: int) -> AsyncIterator:
+        """Page fetch stage: opened, still unread /events responses; a failed page fails the whole refresh"""
+        async for offset in offsets:
+            response = await asyncio.to_thread(self.client.open_events_page, page_size, offset)
+            if response is None:
+                raise RuntimeError(f"Events page at offset {offset} unavailable")
+            yield response
+    
+    @staticmethod
+    def _decode_streamed_page(response) -> List[Dict]:
+        """Decode and project one event at a time as the body arrives; the raw page is never held whole"""
+        with response:
+            return [project_event(event)
+                    for event in iter_json_array(response.iter_content(chunk_size=EVENTS_STREAM_CHUNK_SIZE))]
+    
+    async def decode_event_pages(self, pages: AsyncIterator) -> AsyncIterator[Dict]:
+        """Decode stage: one projected event per Gamma event in each streamed page"""
+        async for response in pages:
+            try:
+                events = await asyncio.to_thread(self._decode_streamed_page, response)
+            except Exception as e:
+                # Like a failed fetch: skipping the page would silently drop its markets
+                raise RuntimeError(f"Events page {response.url} failed mid-body: {e}") from e
+            for event in events:
+                yield event
+    
+    async def filter_live_events(self, events: AsyncIterator[Dict]) -> AsyncIterator[Dict]:
+        """Expiry/closed filter stage"""
+        current_time = datetime.now(timezone.utc)
+        seen = kept = 0
         try:
-            from datetime import datetime, timezone, timedelta
-            
-            # Fetch MORE markets from API since filtering will reduce count significantly
-            # Request 2x the desired limit to account for filtering
-            fetch_limit = min(limit * 2, 400)
-            events_data = self.client.get_events(limit=fetch_limit)
-            
-            # Get current timestamp for filtering
-            current_time = datetime.now(timezone.utc)
-            
-            # Transform event data to market format
-            transformed_markets = []
-            for event in events_data:
+            async for event in events:
+                seen += 1
                 try:
-                    # Get all markets from the event
-                    markets = event.get('markets', [])
-                    if not markets or len(markets) == 0:
-                        logger.debug(f"Skipping event {event.get('id')} - no markets")
-                        continue
-                    
-                    # CRITICAL: Filter out expired markets - only show ACTIVE/ONGOING
-                    # Filter markets ending TODAY or earlier (more strict filtering)
-                    end_date_str = event.get('endDate', '')
-                    event_title = event.get('title', '')
+                    if self._is_live_event(event, current_time):
+                        kept += 1
+                        yield event
+                except Exception as e:
+                    logger.error(f"Error filtering event {event.get('id', 'unknown')}: {e}", exc_info=True)
+        finally:
+            # Also runs when the index stage stops early; per-reason counts are in EVENTS_SKIPPED
+            logger.info(f"Expiry filter kept {kept} of {seen} events")
+    
+    async def filter_placeholder_outcomes(self, events: AsyncIterator[Dict]) -> AsyncIterator[Dict]:
+        """Placeholder filter stage"""
+        async for event in events:
+            yield self._drop_placeholder_outcomes(event)
+    
+    async def transform_events(self, events: AsyncIterator[Dict]) -> AsyncIterator[Dict]:
+        """Transform stage: events to our market format"""
+        async for event in events:
+            try:
+                yield self._build_market(event)
+            except Exception as e:
+                logger.error(f"Error transforming event {event.get('id', 'unknown')}: {e}", exc_info=True)
+    
+    def transform_page(self, page: bytes, current_time: datetime) -> List[Dict]:
+        """Decode, filter and transform a whole /events page (what a transform pool worker runs)"""
+        try:
+            events = json.loads(page)
+        except ValueError as e:
+            logger.error(f"Error decoding events page: {e}")
+            return []
+        transformed_markets = []
+        for event in events:
+            try:
+                transformed_market = self._transform_event(project_event(event), current_time)
+                if transformed_market is not None:
+                    transformed_markets.append(transformed_market)
+            except Exception as e:
+                logger.error(f"Error transforming event {event.get('id', 'unknown')}: {e}", exc_info=True)
+        return transformed_markets
+    
+    def _transform_event(self, event: Dict, current_time: datetime) -> Optional[Dict]:
+        """Transform one Gamma event into our market format, or None if it is filtered out"""
+        if not self._is_live_event(event, current_time):
+            return None
+        return self._build_market(self._drop_placeholder_outcomes(event))
+    
+    def _is_live_event(self, event: Dict, current_time: datetime) -> bool:
+        """Expiry/closed filter: only ACTIVE/ONGOING events that still accept orders pass"""
+        # Get all markets from the event
+        markets = event.get('markets', [])
+        if not markets or len(markets) == 0:
+            EVENTS_SKIPPED.inc("no_markets")
+            logger.debug(f"Skipping event {event.get('id')} - no markets")
+            return False
+        
+        # CRITICAL: Filter out expired markets - only show ACTIVE/ONGOING
+        # Filter markets ending TODAY or earlier (more strict filtering)
+        end_date_str = event.get('endDate', '')
+        event_title = event.get('title', '')
+        
+        if end_date_str:
+            try:
+                # Parse end date - handle multiple formats
+                if 'T' in end_date_str:
+                    # Full ISO8601 format like "2025-12-10T00:00:00Z"
+                    end_date = datetime.fromisoformat(end_date_str.replace('Z', '+00:00'))
+                else:
+                    # Date only format like "2025-11-13" - assume end of day
+                    end_date = datetime.strptime(end_date_str, '%Y-%m-%d')
+                    # Add timezone info and set to end of day
+                    end_date = end_date.replace(hour=23, minute=59, second=59, tzinfo=timezone.utc)
+                
+                # MORE STRICT: Filter out markets ending in the next 24 hours
+                # Only show markets ending TOMORROW or later (Nov 14+)
+                cutoff_time = current_time + timedelta(days=1)
+                
+                if end_date <= cutoff_time:
+                    EVENTS_SKIPPED.inc("ending_soon")
+                    logger.debug(f"Skipping EXPIRED/ENDING-SOON market: {event_title} (ends: {end_date_str})")
+                    return False
+            except (ValueError, AttributeError) as e:
+                logger.warning(f"Could not parse end date '{end_date_str}' for event '{event_title}': {e}")
+                # If we can't parse the date, skip the market to be safe
+                EVENTS_SKIPPED.inc("bad_end_date")
+                return False
+        
+        # Also check if market is marked as closed or accepting orders
+        if event.get('closed', False) or event.get('archived', False):
+            EVENTS_SKIPPED.inc("closed")
+            logger.debug(f"Skipping CLOSED/ARCHIVED market: {event_title}")
+            return False
+        
+        # Check if first market in event has acceptingOrders flag
+        first_market = markets[0] if markets else {}
+        if not first_market.get('acceptingOrders', True):
+            EVENTS_SKIPPED.inc("not_accepting_orders")
+            logger.debug(f"Skipping market NOT accepting orders: {event_title}")
+            return False
+        return True
+    
+    @staticmethod
+    def _outcome_title(market: Dict) -> str:
+        # IMPROVED: Get actual outcome title from market data
+        # Polymarket stores candidate/option names in multiple fields
+        return (
+            market.get('groupItemTitle', '') or 
+            market.get('description', '') or
+            market.get('question', '')
+        )
+    
+    @staticmethod
+    def _is_placeholder_outcome(outcome_title: str) -> bool:
+        # Filter out Polymarket's generic placeholders
+        # They use patterns like: "Person A", "Company D", "Placeholder 20", "Club A"
+        return (
+            outcome_title == "0" or 
+            not outcome_title.strip() or
+            outcome_title.lower().startswith('person ') or
+            outcome_title.lower().startswith('company ') or
+            outcome_title.lower().startswith('placeholder ') or
+            outcome_title.lower().startswith('club ') or
+            (outcome_title.lower().startswith('option ') and len(outcome_title) < 15)
+        )
+    
+    def _drop_placeholder_outcomes(self, event: Dict) -> Dict:
+        """Placeholder filter: drop generic placeholder outcomes from multi-outcome events"""
+        markets = event.get('markets', [])
+        # Check if multi-outcome (event has multiple market groups)
+        if len(markets) <= 2:
+            return {**event, 'is_multi_outcome': False}
+        
+        kept = []
+        for market in markets:
+            try:
+                outcome_title = self._outcome_title(market)
+                if self._is_placeholder_outcome(outcome_title):
+                    logger.debug(f"Skipping placeholder outcome: {outcome_title}")
+                    continue
+                kept.append(market)
+            except Exception as e:
+                logger.warning(f"Error parsing outcome in multi-market: {e}")
+        # Stays multi-outcome even if only a couple of real outcomes are left
+        return {**event, 'markets': kept, 'is_multi_outcome': True}
+    
+    def _build_market(self, event: Dict) -> Dict:
+        """Transform a filtered event into our market format"""
+        markets = event.get('markets', [])
+        event_title = event.get('title', '')
+        
+        if event.get('is_multi_outcome', len(markets) > 2):
+            # Multi-outcome market
+            outcomes = []
+            for market in markets:
+                try:
+                    outcome_prices = market.get('outcomePrices', '["0.5", "0.5"]')
+                    if isinstance(outcome_prices, str):
+                        outcome_prices = json.loads(outcome_prices)
                     
-                    if end_date_str:
-                        try:
-                            # Parse end date - handle multiple formats
-                            if 'T' in end_date_str:
-                                # Full ISO8601 format like "2025-12-10T00:00:00Z"
-                                end_date = datetime.fromisoformat(end_date_str.replace('Z', '+00:00'))
-                            else:
-                                # Date only format like "2025-11-13" - assume end of day
-                                end_date = datetime.strptime(end_date_str, '%Y-%m-%d')
-                                # Add timezone info and set to end of day
-                                end_date = end_date.replace(hour=23, minute=59, second=59, tzinfo=timezone.utc)
-                            
-                            # MORE STRICT: Filter out markets ending in the next 24 hours
-                            # Only show markets ending TOMORROW or later (Nov 14+)
-                            cutoff_time = current_time + timedelta(days=1)
-                            
-                            if end_date <= cutoff_time:
-                                logger.info(f"Skipping EXPIRED/ENDING-SOON market: {event_title} (ends: {end_date_str})")
-                                continue
-                        except (ValueError, AttributeError) as e:
-                            logger.warning(f"Could not parse end date '{end_date_str}' for event '{event_title}': {e}")
-                            # If we can't parse the date, skip the market to be safe
-                            logger.info(f"Skipping market with unparseable end date: {event_title}")
-                            continue
+                    if not outcome_prices or len(outcome_prices) == 0:
+                        outcome_prices = ["0.5", "0.5"]
                     
-                    # Also check if market is marked as closed or accepting orders
-                    if event.get('closed', False) or event.get('archived', False):
-                        logger.info(f"Skipping CLOSED/ARCHIVED market: {event_title}")
-                        continue
+                    yes_price = float(outcome_prices[0]) if outcome_prices[0] not in ["0", "0.0"] else 0.01
                     
-                    # Check if first market in event has acceptingOrders flag
-                    first_market = markets[0] if markets else {}
-                    if not first_market.get('acceptingOrders', True):
-                        logger.info(f"Skipping market NOT accepting orders: {event_title}")
-                        continue
+                    outcome_title = self._outcome_title(market)
                     
-                    # Check if multi-outcome (event has multiple market groups)
-                    if len(markets) > 2:
-                        # Multi-outcome market
-                        outcomes = []
-                        for market in markets:
-                            try:
-                                outcome_prices = market.get('outcomePrices', '["0.5", "0.5"]')
-                                if isinstance(outcome_prices, str):
-                                    outcome_prices = json.loads(outcome_prices)
-                                
-                                if not outcome_prices or len(outcome_prices) == 0:
-                                    outcome_prices = ["0.5", "0.5"]
-                                
-                                yes_price = float(outcome_prices[0]) if outcome_prices[0] not in ["0", "0.0"] else 0.01
-                                
-                                # IMPROVED: Get actual outcome title from market data
-                                # Polymarket stores candidate/option names in multiple fields
-                                outcome_title = (
-                                    market.get('groupItemTitle', '') or 
-                                    market.get('description', '') or
-                                    market.get('question', '')
-                                )
-                                
-                                # Filter out Polymarket's generic placeholders
-                                # They use patterns like: "Person A", "Company D", "Placeholder 20", "Club A"
-                                if (
-                                    outcome_title == "0" or 
-                                    not outcome_title.strip() or
-                                    outcome_title.lower().startswith('person ') or
-                                    outcome_title.lower().startswith('company ') or
-                                    outcome_title.lower().startswith('placeholder ') or
-                                    outcome_title.lower().startswith('club ') or
-                                    (outcome_title.lower().startswith('option ') and len(outcome_title) < 15)
-                                ):
-                                    # Skip this outcome - it's a placeholder
-                                    logger.debug(f"Skipping placeholder outcome: {outcome_title}")
-                                    continue
-                                
-                                try:
-                                    token_ids_str = market.get('clobTokenIds', '[]')
-                                    if isinstance(token_ids_str, str):
-                                        token_ids = json.loads(token_ids_str)
-                                    else:
-                                        token_ids = token_ids_str
-                                except (json.JSONDecodeError, TypeError):
-                                    token_ids = []
-                                
-                                outcomes.append({
-                                    'title': outcome_title.strip(),
-                                    'price': yes_price,
-                                    'token_id': token_ids[0] if token_ids and len(token_ids) > 0 else '',
-                                    'market_id': market.get('id', '')
-                                })
-                            except Exception as e:
-                                logger.warning(f"Error parsing outcome in multi-market: {e}")
-                                continue
-                        
-                        transformed_market = {
-                            'id': str(event.get('id', '')),
-                            'title': event_title,
-                            'category': self._get_category_from_event(event),
-                            'is_multi_outcome': True,
-                            'outcomes': outcomes,
-                            'volume': float(event.get('volume', 0)),
-                            'liquidity': float(event.get('liquidity', 0)),
-                            'endDate': event.get('endDate', '2025-12-31'),
-                            'image': event.get('image', event.get('icon', '')),
-                            'change24h': self._calculate_change(event),
-                            'slug': event.get('slug', ''),
-                        }
-                        transformed_markets.append(transformed_market)
-                    else:
-                        # Single outcome (YES/NO) market
-                        market = markets[0]
-                        
-                        outcome_prices = market.get('outcomePrices', '["0.5", "0.5"]')
-                        if isinstance(outcome_prices, str):
-                            outcome_prices = json.loads(outcome_prices)
-                        
-                        yes_price = float(outcome_prices[0]) if outcome_prices and outcome_prices[0] not in ["0", "0.0"] else 0.5
-                        
+                    try:
                         token_ids_str = market.get('clobTokenIds', '[]')
                         if isinstance(token_ids_str, str):
                             token_ids = json.loads(token_ids_str)
                         else:
                             token_ids = token_ids_str
-                        
-                        token_id = token_ids[0] if token_ids else ''
-                        
-                        transformed_market = {
-                            'id': str(market.get('id', '')),
-                            'title': event.get('title', market.get('question', '')),
-                            'category': self._get_category_from_event(event),
-                            'is_multi_outcome': False,
-                            'yesPrice': yes_price,
-                            'noPrice': 1 - yes_price,
-                            'volume': float(event.get('volume', 0)),
-                            'liquidity': float(event.get('liquidity', 0)),
-                            'endDate': event.get('endDate', '2025-12-31'),
-                            'image': event.get('image', event.get('icon', '')),
-                            'change24h': self._calculate_change(event),
-                            'slug': market.get('slug', ''),
-                            'token_id': token_id
-                        }
-                        transformed_markets.append(transformed_market)
-                        
+                    except (json.JSONDecodeError, TypeError):
+                        token_ids = []
+                    
+                    outcomes.append({
+                        'title': outcome_title.strip(),
+                        'price': yes_price,
+                        'token_id': token_ids[0] if token_ids and len(token_ids) > 0 else '',
+                        'market_id': market.get('id', '')
+                    })
                 except Exception as e:
-                    logger.error(f"Error transforming event {event.get('id', 'unknown')}: {e}", exc_info=True)
+                    logger.warning(f"Error parsing outcome in multi-market: {e}")
                     continue
             
-            return transformed_markets[:limit]
-        except Exception as e:
-            logger.error(f"Error getting trending markets: {e}")
-            return []
+            transformed_market = {
+                'id': str(event.get('id', '')),
+                'title': event_title,
+                'category': self._get_category_from_event(event),
+                'is_multi_outcome': True,
+                'outcomes': outcomes,
+                'volume': float(event.get('volume', 0)),
+                'liquidity': float(event.get('liquidity', 0)),
+                'endDate': event.get('endDate', '2025-12-31'),
+                'image': event.get('image', event.get('icon', '')),
+                'change24h': self._calculate_change(event),
+                'slug': event.get('slug', ''),
+            }
+            return transformed_market
+        else:
+            # Single outcome (YES/NO) market
+            market = markets[0]
+            
+            outcome_prices = market.get('outcomePrices', '["0.5", "0.5"]')
+            if isinstance(outcome_prices, str):
+                outcome_prices = json.loads(outcome_prices)
+            
+            yes_price = float(outcome_prices[0]) if outcome_prices and outcome_prices[0] not in ["0", "0.0"] else 0.5
+            
+            token_ids_str = market.get('clobTokenIds', '[]')
+            if isinstance(token_ids_str, str):
+                token_ids = json.loads(token_ids_str)
+            else:
+                token_ids = token_ids_str
+            
+            token_id = token_ids[0] if token_ids else ''
+            
+            transformed_market = {
+                'id': str(market.get('id', '')),
+                'title': event.get('title', market.get('question', '')),
+                'category': self._get_category_from_event(event),
+                'is_multi_outcome': False,
+                'yesPrice': yes_price,
+                'noPrice': 1 - yes_price,
+                'volume': float(event.get('volume', 0)),
+                'liquidity': float(event.get('liquidity', 0)),
+                'endDate': event.get('endDate', '2025-12-31'),
+                'image': event.get('image', event.get('icon', '')),
+                'change24h': self._calculate_change(event),
+                'slug': market.get('slug', ''),
+                'token_id': token_id
+            }
+            return transformed_market
     
     def get_market_details(self, market_id: str) -> Optional[Dict]:
         """Get detailed market information"""
@@ -221,6 +357,8 @@ class MarketService:
                 'endDate': market.get('endDate', '2025-12-31'),
                 'token_id': token_id
             }
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error getting market details: {e}")
             return None
@@ -228,19 +366,19 @@ class MarketService:
     def get_orderbook(self, token_id: str) -> Optional[Dict]:
         """Get orderbook for a market"""
         try:
-            logger.info(f"Calling Polymarket CLOB API for orderbook: token_id={token_id}")
+            logger.debug(f"Calling Polymarket CLOB API for orderbook: token_id={token_id}")
             orderbook = self.client.get_orderbook(token_id)
             if not orderbook:
                 logger.warning(f"Polymarket returned no orderbook data for token_id={token_id}")
                 return None
             
-            logger.info(f"Raw orderbook received: {len(orderbook.get('bids', []))} bids, {len(orderbook.get('asks', []))} asks")
+            logger.debug(f"Raw orderbook received: {len(orderbook.get('bids', []))} bids, {len(orderbook.get('asks', []))} asks")
             
             # Transform orderbook to our format
             bids = []
             asks = []
             
-            for bid in orderbook.get('bids', [])[:10]:
+            for bid in orderbook.get('bids', []):
                 try:
                     price = float(bid.get('price', 0))
                     size = float(bid.get('size', 0))
@@ -254,7 +392,7 @@ class MarketService:
                     logger.warning(f"Error parsing bid: {e}")
                     continue
             
-            for ask in orderbook.get('asks', [])[:10]:
+            for ask in orderbook.get('asks', []):
                 try:
                     price = float(ask.get('price', 0))
                     size = float(ask.get('size', 0))
@@ -268,6 +406,10 @@ class MarketService:
                     logger.warning(f"Error parsing ask: {e}")
                     continue
             
+            # CLOB lists bids ascending and asks descending (best price last); keep the 10 best of each
+            bids = sorted(bids, key=lambda b: b['price'], reverse=True)[:10]
+            asks = sorted(asks, key=lambda a: a['price'])[:10]
+            
             # Calculate cumulative totals
             cumulative = 0
             for bid in bids:
@@ -279,23 +421,36 @@ class MarketService:
                 cumulative += ask['size']
                 ask['total'] = cumulative
             
-            logger.info(f"Transformed orderbook: {len(bids)} bids, {len(asks)} asks")
+            logger.debug(f"Transformed orderbook: {len(bids)} bids, {len(asks)} asks")
             
             return {
                 'bids': bids,
                 'asks': asks,
                 'timestamp': orderbook.get('timestamp', None)  # Include API timestamp if available
             }
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error getting orderbook for token_id={token_id}: {e}", exc_info=True)
             return None
     
-    def get_price_chart_data(self, token_id: str, interval: str = "1h") -> List[Dict]:
-        """Get price history for chart"""
+    def get_price_chart_data(
+        self,
+        token_id: str,
+        interval: str = "1h",
+        start_ts: Optional[int] = None,
+        end_ts: Optional[int] = None,
+        fidelity: int = 60,
+        raise_errors: bool = False
+    ) -> List[Dict]:
+        """Get price history for chart, for a trailing interval or a start/end range; see PolymarketClient.get_price_history"""
         try:
-            logger.info(f"Calling Polymarket CLOB API for price history: token_id={token_id}, interval={interval}")
-            history = self.client.get_price_history(token_id, interval)
-            logger.info(f"Raw price history received: {len(history)} data points")
+            logger.debug(f"Calling Polymarket CLOB API for price history: token_id={token_id}, interval={interval}, "
+                        f"start_ts={start_ts}, end_ts={end_ts}, fidelity={fidelity}")
+            history = self.client.get_price_history(
+                token_id, interval, start_ts=start_ts, end_ts=end_ts, fidelity=fidelity, raise_errors=raise_errors
+            )
+            logger.debug(f"Raw price history received: {len(history)} data points")
             
             # Transform to chart-friendly format
             chart_data = []
@@ -314,12 +469,32 @@ class MarketService:
                     logger.warning(f"Error parsing price data point: {e}")
                     continue
             
-            logger.info(f"Transformed chart data: {len(chart_data)} valid points")
+            logger.debug(f"Transformed chart data: {len(chart_data)} valid points")
             return chart_data
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error getting price chart data for token_id={token_id}: {e}", exc_info=True)
+            if raise_errors:
+                raise
             return []
     
+    def get_live_prices(self, token_ids: List[str]) -> Dict[str, float]:
+        """Midpoint of the BUY/SELL quotes for each token, from CLOB's batch /prices"""
+        quotes = self.client.get_prices(token_ids)
+        prices = {}
+        for token_id, sides in quotes.items():
+            try:
+                values = [float(sides[side]) for side in ('BUY', 'SELL') if sides.get(side) not in (None, '')]
+            except (ValueError, TypeError, AttributeError) as e:
+                logger.warning(f"Error parsing live price for token_id={token_id}: {e}")
+                continue
+            if values:
+                price = round(sum(values) / len(values), 4)
+                if 0 < price < 1:
+                    prices[token_id] = price
+        return prices
+    
     def _get_category_from_event(self, event: Dict) -> str:
         """Extract category from event tags or description"""
         tags = event.get('tags', [])
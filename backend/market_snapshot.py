@@ -0,0 +1,351 @@
+"""
+Market Snapshot - columnar view of one markets refresh for vectorized queries
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Category codes are stable so encoded snapshots stay comparable across refreshes
+CATEGORIES = ['Politics', 'Crypto', 'Sports', 'Economics', 'Other']
+NUMERIC_COLUMNS = ('price', 'volume', 'liquidity', 'end_ts', 'change24h')
+
+# Binary layout: header | float64 columns | category codes | outcome offsets | outcome prices | JSON
+SNAPSHOT_MAGIC = b'PFSNAP01'
+_HEADER = struct.Struct('<8sQdQQQ')  # magic, version, created_at, rows, outcomes, json length
+
+
+def _align8(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _read_header(buffer) -> tuple:
+    """Unpack and check the header; ValueError for a short or foreign buffer"""
+    if len(buffer) < _HEADER.size:
+        raise ValueError(f"Snapshot buffer too short for its header ({len(buffer)} bytes)")
+    header = _HEADER.unpack_from(buffer, 0)
+    if header[0] != SNAPSHOT_MAGIC:
+        raise ValueError("Not a market snapshot buffer")
+    return header
+
+
+def _parse_end_ts(end_date_str: str) -> float:
+    """Parse a Polymarket endDate into epoch seconds (NaN if unparseable)"""
+    if not end_date_str:
+        return np.nan
+    try:
+        if 'T' in end_date_str:
+            end_date = datetime.fromisoformat(end_date_str.replace('Z', '+00:00'))
+        else:
+            end_date = datetime.strptime(end_date_str, '%Y-%m-%d').replace(
+                hour=23, minute=59, second=59, tzinfo=timezone.utc
+            )
+        if end_date.tzinfo is None:
+            end_date = end_date.replace(tzinfo=timezone.utc)
+        return end_date.timestamp()
+    except (ValueError, AttributeError, TypeError):
+        return np.nan
+
+
+def write_snapshot_file(snapshot: 'MarketSnapshot', path, durable: bool = False):
+    """Atomically replace `path` with the serialized snapshot (fsync'd when durable)"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(snapshot.to_bytes())
+        if durable:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def map_snapshot_file(path, newer_than: int = -1) -> Optional['MarketSnapshot']:
+    """
+    Map a snapshot file read-only, or return None if its version is not newer
+    than `newer_than`. The mapping stays valid after the file is replaced and
+    is released once the snapshot's column views are garbage collected.
+    """
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if MarketSnapshot.read_version(buffer) <= newer_than:
+        buffer.close()
+        return None
+    return MarketSnapshot.from_buffer(buffer)
+
+
+class MarketSnapshot:
+    """
+    One refresh of the markets list, held both as the original market dicts
+    (served as-is by the API) and as columnar NumPy arrays used for masks,
+    aggregates and top-K selection.
+
+    Columns (one row per market, same order as `markets`):
+        ids, price, volume, liquidity, end_ts, change24h, category_code
+    Outcomes of multi-outcome markets are flattened into `outcome_price`,
+    with row i owning outcome_offsets[i]:outcome_offsets[i + 1].
+    """
+
+    def __init__(self, markets: List[Dict], version: int = 0, created_at: Optional[float] = None):
+        self.markets = markets
+        self.version = version
+        self.created_at = created_at if created_at is not None else time.time()
+        self._analytics = None
+
+        n = len(markets)
+        self.ids = np.empty(n, dtype=object)
+        self.price = np.zeros(n, dtype=np.float64)
+        self.volume = np.zeros(n, dtype=np.float64)
+        self.liquidity = np.zeros(n, dtype=np.float64)
+        self.end_ts = np.full(n, np.nan, dtype=np.float64)
+        self.change24h = np.zeros(n, dtype=np.float64)
+        self.category_code = np.zeros(n, dtype=np.int16)
+        self.outcome_offsets = np.zeros(n + 1, dtype=np.int32)
+
+        category_index = {name: code for code, name in enumerate(CATEGORIES)}
+        end_ts_by_str = {}  # Many events share an endDate; parse each string once
+        outcome_prices = []
+        for row, market in enumerate(markets):
+            self.ids[row] = market.get('id', '')
+            self.volume[row] = market.get('volume', 0) or 0
+            self.liquidity[row] = market.get('liquidity', 0) or 0
+            end_date_str = market.get('endDate', '')
+            if end_date_str not in end_ts_by_str:
+                end_ts_by_str[end_date_str] = _parse_end_ts(end_date_str)
+            self.end_ts[row] = end_ts_by_str[end_date_str]
+            self.change24h[row] = market.get('change24h', 0) or 0
+            self.category_code[row] = category_index.get(market.get('category', 'Other'), category_index['Other'])
+
+            outcomes = market.get('outcomes') if market.get('is_multi_outcome') else None
+            if outcomes:
+                prices = [o.get('price', 0) for o in outcomes]
+                outcome_prices.extend(prices)
+                # Leading outcome price represents a multi-outcome market in the price column
+                self.price[row] = max(prices)
+            else:
+                self.price[row] = market.get('yesPrice', 0) or 0
+            self.outcome_offsets[row + 1] = len(outcome_prices)
+
+        self.outcome_price = np.asarray(outcome_prices, dtype=np.float64)
+        self.index = {market_id: row for row, market_id in enumerate(self.ids)}
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize into a flat buffer that `from_buffer` can map without copying
+        the numeric columns. Markets and analytics travel as one JSON blob.
+        """
+        rows, outcomes = len(self.markets), len(self.outcome_price)
+        payload = json.dumps(
+            {'markets': self.markets, 'analytics': self.analytics()},
+            separators=(',', ':')
+        ).encode('utf-8')
+        parts = [_HEADER.pack(SNAPSHOT_MAGIC, self.version, self.created_at, rows, outcomes, len(payload))]
+        offset = _HEADER.size
+        for array in (*(getattr(self, name) for name in NUMERIC_COLUMNS),
+                      self.category_code, self.outcome_offsets, self.outcome_price):
+            padding = _align8(offset) - offset
+            parts.append(b'\0' * padding)
+            parts.append(array.tobytes())
+            offset += padding + array.nbytes
+        parts.append(payload)
+        return b''.join(parts)
+
+    @staticmethod
+    def read_version(buffer) -> int:
+        """Read only the version from a serialized snapshot header"""
+        return _read_header(buffer)[1]
+
+    @classmethod
+    def from_buffer(cls, buffer) -> 'MarketSnapshot':
+        """
+        Rebuild a snapshot from `to_bytes` output. Numeric columns are read-only
+        views over `buffer` (e.g. an mmap), so it must outlive the snapshot.
+        """
+        _, version, created_at, rows, outcomes, json_len = _read_header(buffer)
+        layout = [(name, np.float64, rows) for name in NUMERIC_COLUMNS]
+        layout += [('category_code', np.int16, rows), ('outcome_offsets', np.int32, rows + 1),
+                   ('outcome_price', np.float64, outcomes)]
+        end = _HEADER.size
+        for _, dtype, count in layout:
+            end = _align8(end) + np.dtype(dtype).itemsize * count
+        if end + json_len > len(buffer):
+            raise ValueError(f"Truncated snapshot buffer ({len(buffer)} of {end + json_len} bytes)")
+
+        snapshot = cls.__new__(cls)
+        snapshot.version = version
+        snapshot.created_at = created_at
+        offset = _HEADER.size
+        for name, dtype, count in layout:
+            offset = _align8(offset)
+            array = np.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+            setattr(snapshot, name, array)
+            offset += array.nbytes
+
+        payload = json.loads(bytes(memoryview(buffer)[offset:offset + json_len]))
+        snapshot.markets = payload['markets']
+        snapshot._analytics = payload['analytics']
+        snapshot.ids = np.array([market.get('id', '') for market in snapshot.markets], dtype=object)
+        snapshot.index = {market_id: row for row, market_id in enumerate(snapshot.ids)}
+        return snapshot
+
+    def __len__(self) -> int:
+        return len(self.markets)
+
+    @property
+    def age(self) -> float:
+        """Seconds since this snapshot was built"""
+        return time.time() - self.created_at
+
+    def get(self, market_id: str) -> Optional[Dict]:
+        """Look up a market by id in O(1)"""
+        row = self.index.get(market_id)
+        return self.markets[row] if row is not None else None
+
+    def _token_locations(self) -> Dict[str, List[tuple]]:
+        """token_id -> [(row, outcome position or -1 for a binary market's YES token)], built once"""
+        locations = getattr(self, '_locations', None)
+        if locations is not None:
+            return locations
+        locations = {}
+        for row, market in enumerate(self.markets):
+            if market.get('is_multi_outcome'):
+                for position, outcome in enumerate(market.get('outcomes', [])):
+                    if outcome.get('token_id'):
+                        locations.setdefault(outcome['token_id'], []).append((row, position))
+            elif market.get('token_id'):
+                locations.setdefault(market['token_id'], []).append((row, -1))
+        self._locations = locations
+        return locations
+
+    def token_ids(self) -> List[str]:
+        """Every priced token in the snapshot (binary YES tokens and outcome tokens)"""
+        return list(self._token_locations())
+
+    def apply_prices(self, prices: Dict[str, float], version: int) -> int:
+        """
+        Patch live prices into the markets and price columns in place and move
+        to `version` if anything changed. Returns how many prices changed.
+        """
+        locations = self._token_locations()
+        # Columns mapped from a shared/persisted buffer are read-only; take a private copy once
+        if not self.price.flags.writeable:
+            self.price = self.price.copy()
+            self.outcome_price = self.outcome_price.copy()
+
+        changed = 0
+        touched_rows = set()
+        for token_id, price in prices.items():
+            for row, position in locations.get(token_id, ()):
+                market = self.markets[row]
+                if position < 0:
+                    if market.get('yesPrice') == price:
+                        continue
+                    market['yesPrice'] = price
+                    market['noPrice'] = 1 - price
+                else:
+                    outcome = market['outcomes'][position]
+                    if outcome.get('price') == price:
+                        continue
+                    outcome['price'] = price
+                    self.outcome_price[self.outcome_offsets[row] + position] = price
+                touched_rows.add(row)
+                changed += 1
+
+        for row in touched_rows:
+            market = self.markets[row]
+            if market.get('is_multi_outcome') and market.get('outcomes'):
+                self.price[row] = max(o.get('price', 0) for o in market['outcomes'])
+            else:
+                self.price[row] = market.get('yesPrice', 0)
+        if changed:
+            self._analytics = None  # Top lists may hold decoded copies of the old dicts
+            self.version = version
+        return changed
+
+    def head(self, limit: int) -> List[Dict]:
+        """First `limit` markets in upstream (trending) order"""
+        return self.markets[:limit]
+
+    def mask(
+        self,
+        category: Optional[str] = None,
+        min_volume: Optional[float] = None,
+        min_liquidity: Optional[float] = None,
+        ends_after: Optional[float] = None,
+    ) -> np.ndarray:
+        """Build a boolean row mask from simple column predicates"""
+        mask = np.ones(len(self.markets), dtype=bool)
+        if category is not None:
+            matches = [code for code, name in enumerate(CATEGORIES) if name.lower() == category.lower()]
+            if not matches:
+                return np.zeros(len(self.markets), dtype=bool)
+            mask &= self.category_code == matches[0]
+        if min_volume is not None:
+            mask &= self.volume >= min_volume
+        if min_liquidity is not None:
+            mask &= self.liquidity >= min_liquidity
+        if ends_after is not None:
+            # NaN end times compare False and are excluded
+            mask &= self.end_ts > ends_after
+        return mask
+
+    def select(self, mask: Optional[np.ndarray] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Markets matching `mask`, in snapshot order"""
+        rows = np.flatnonzero(mask) if mask is not None else np.arange(len(self.markets))
+        if limit is not None:
+            rows = rows[:limit]
+        return [self.markets[row] for row in rows]
+
+    def top_k(self, column: str, k: int, mask: Optional[np.ndarray] = None) -> List[Dict]:
+        """Top `k` markets by a numeric column (descending), optionally within a mask"""
+        if column not in NUMERIC_COLUMNS:
+            raise ValueError(f"Unknown snapshot column: {column}")
+        values = getattr(self, column)
+        rows = np.flatnonzero(mask) if mask is not None else np.arange(len(values))
+        if k <= 0 or len(rows) == 0:
+            return []
+        candidates = values[rows]
+        if k < len(rows):
+            # argpartition is O(n); only the k survivors get fully sorted
+            part = np.argpartition(-candidates, k - 1)[:k]
+            order = part[np.argsort(-candidates[part], kind='stable')]
+        else:
+            order = np.argsort(-candidates, kind='stable')
+        return [self.markets[row] for row in rows[order]]
+
+    def category_breakdown(self) -> List[Dict]:
+        """Count and total volume per category, largest volume first"""
+        counts = np.bincount(self.category_code, minlength=len(CATEGORIES))
+        volumes = np.bincount(self.category_code, weights=self.volume, minlength=len(CATEGORIES))
+        order = np.argsort(-volumes, kind='stable')
+        return [
+            {
+                'category': CATEGORIES[code],
+                'count': int(counts[code]),
+                'totalVolume': float(volumes[code])
+            }
+            for code in order
+            if counts[code] > 0
+        ]
+
+    def analytics(self) -> Dict:
+        """Aggregate market statistics (computed once per snapshot)"""
+        if self._analytics is None:
+            total_markets = len(self.markets)
+            total_volume = float(self.volume.sum())
+            self._analytics = {
+                "totalVolume": total_volume,
+                "totalLiquidity": float(self.liquidity.sum()),
+                "totalMarkets": total_markets,
+                "avgMarketSize": total_volume / total_markets if total_markets > 0 else 0,
+                "topByVolume": self.top_k('volume', 10),
+                "topByLiquidity": self.top_k('liquidity', 10),
+                "categoryBreakdown": self.category_breakdown(),
+            }
+        return self._analytics
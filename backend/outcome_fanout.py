@@ -0,0 +1,99 @@
+"""
+Outcome Fan-out - fetch data for every outcome of a market concurrently and
+summarize the orderbooks into a consolidated ranking.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from deadline import DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+
+def market_outcomes(market: Dict) -> List[Dict]:
+    """Outcomes of a snapshot market; binary markets expose their YES token as one outcome"""
+    if market.get('is_multi_outcome'):
+        return [o for o in market.get('outcomes', []) if o.get('token_id')]
+    if market.get('token_id'):
+        return [{
+            'title': 'Yes',
+            'price': market.get('yesPrice', 0),
+            'token_id': market['token_id'],
+            'market_id': market.get('id', '')
+        }]
+    return []
+
+
+async def fan_out(
+    outcomes: List[Dict],
+    fetch: Callable[[str], Awaitable[Any]],
+    max_concurrency: int = 8,
+) -> List[Dict]:
+    """
+    Run `fetch(token_id)` for every outcome with at most `max_concurrency` in
+    flight. Failures are reported per outcome instead of failing the batch.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def fetch_one(outcome: Dict) -> Dict:
+        result = {
+            'title': outcome.get('title', ''),
+            'token_id': outcome['token_id'],
+            'market_id': outcome.get('market_id', ''),
+            'price': outcome.get('price'),
+            'data': None,
+            'error': None,
+            'timed_out': False
+        }
+        async with semaphore:
+            try:
+                result['data'] = await fetch(outcome['token_id'])
+                if not result['data']:
+                    result['error'] = "No data returned"
+            except DeadlineExceeded:
+                # Out of request time: report this outcome as missing and let the rest stand
+                result['error'] = "Request deadline exceeded"
+                result['timed_out'] = True
+            except Exception as e:
+                logger.warning(f"Outcome fetch failed for token_id={outcome['token_id']}: {e}")
+                result['error'] = str(e) or type(e).__name__
+        return result
+
+    return await asyncio.gather(*(fetch_one(outcome) for outcome in outcomes))
+
+
+def summarize_book(book: Optional[Dict]) -> Dict:
+    """Best bid/ask, spread and depth of a transformed orderbook"""
+    bids = (book or {}).get('bids', [])
+    asks = (book or {}).get('asks', [])
+    best_bid = max((b['price'] for b in bids), default=None)
+    best_ask = min((a['price'] for a in asks), default=None)
+    return {
+        'bestBid': best_bid,
+        'bestAsk': best_ask,
+        'spread': round(best_ask - best_bid, 6) if best_bid is not None and best_ask is not None else None,
+        'bidDepth': sum(b['size'] for b in bids),
+        'askDepth': sum(a['size'] for a in asks),
+    }
+
+
+def rank_outcomes(results: List[Dict]) -> List[Dict]:
+    """
+    Consolidated view: outcomes with a book ordered by best bid (highest first),
+    then best ask (lowest first), then total depth (deepest first).
+    """
+    ranked = []
+    for result in results:
+        if result['data'] is None:
+            continue
+        summary = summarize_book(result['data'])
+        ranked.append({'title': result['title'], 'token_id': result['token_id'], **summary})
+    ranked.sort(key=lambda r: (
+        -(r['bestBid'] if r['bestBid'] is not None else -1),
+        r['bestAsk'] if r['bestAsk'] is not None else 2,
+        -(r['bidDepth'] + r['askDepth'])
+    ))
+    for rank, row in enumerate(ranked, start=1):
+        row['rank'] = rank
+    return ranked
@@ -2,14 +2,170 @@ import requests
 from typing import List, Dict, Optional
 import logging
 import json
+import os
+import threading
+import time
+import functools
+from collections import OrderedDict
+from contextvars import ContextVar
+from upstream_guard import UpstreamGuard, UpstreamError, CircuitOpenError, RetryableHTTPError
+from request_hedger import RequestHedger
+from deadline import DeadlineExceeded, timeout_for
+from metrics import Counter, Histogram
 
 logger = logging.getLogger(__name__)
 
+UPSTREAM_LATENCY = Histogram(
+    "polymarket_call_duration_seconds",
+    "PolymarketClient method latency, including retries, hedges and fallbacks",
+    ["method"]
+)
+UPSTREAM_ERRORS = Counter(
+    "polymarket_call_errors_total", "Polymarket requests that failed after retries", ["method", "error"]
+)
+UPSTREAM_STALE = Counter(
+    "polymarket_stale_responses_total", "Failed Polymarket requests answered from the last good response", ["method"]
+)
+
+# Client method currently running, so _request can label its errors
+_current_method: ContextVar[str] = ContextVar("polymarket_method", default="unknown")
+
+# Failures worth retrying and counting against a host's circuit breaker
+RETRYABLE_ERRORS = (RetryableHTTPError, requests.ConnectionError, requests.Timeout)
+
+# Responses kept per client to answer from while a host is unavailable
+LAST_GOOD_ENTRIES = 500
+
+# Bytes read per step when decoding a streamed /events body
+EVENTS_STREAM_CHUNK_SIZE = 64 * 1024
+
+# Per-call timeout; shrunk to the request's remaining deadline when there is one. Client methods
+# turn upstream failures into empty results, but DeadlineExceeded always propagates so routes
+# can answer 504 or degrade instead of reporting "not found" / "no data"
+REQUEST_TIMEOUT = 10.0
+
+def _send(method: str, url: str, **kwargs):
+    """requests.request with the deadline-aware timeout"""
+    timeout = timeout_for(REQUEST_TIMEOUT)
+    try:
+        return requests.request(method, url, timeout=timeout, **kwargs)
+    except requests.Timeout:
+        if timeout < REQUEST_TIMEOUT:
+            # Our budget ran out, not the host: don't count it as an upstream failure
+            raise DeadlineExceeded(f"request deadline exceeded calling {url}") from None
+        raise
+
+def _tracked(fn):
+    """Record a client method's latency (and, via _request, its errors) in the upstream metrics"""
+    name = fn.__name__
+    
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = _current_method.set(name)
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            UPSTREAM_LATENCY.observe(time.perf_counter() - started, name)
+            _current_method.reset(token)
+    return wrapper
+
+def _retry_after(response) -> Optional[float]:
+    try:
+        return float(response.headers.get('Retry-After', ''))
+    except ValueError:
+        return None
+
 class PolymarketClient:
     def __init__(self):
-        self.gamma_base_url = "https://gamma-api.polymarket.com"
-        self.clob_base_url = "https://clob.polymarket.com"
+        # Overridable to point at a stand-in (see benchmarks/fake_polymarket.py)
+        self.gamma_base_url = os.environ.get('POLYMARKET_GAMMA_URL', "https://gamma-api.polymarket.com").rstrip('/')
+        self.clob_base_url = os.environ.get('POLYMARKET_CLOB_URL', "https://clob.polymarket.com").rstrip('/')
+        # Per-host breaker, rate limiter and retry budget; rates stay well under
+        # Polymarket's published per-10s limits and can be tuned per deployment
+        self.guards = {
+            "gamma": UpstreamGuard(
+                "gamma",
+                rate=float(os.environ.get('POLYMARKET_GAMMA_RPS', '5')),
+                burst=int(os.environ.get('POLYMARKET_GAMMA_BURST', '10'))
+            ),
+            "clob": UpstreamGuard(
+                "clob",
+                rate=float(os.environ.get('POLYMARKET_CLOB_RPS', '20')),
+                burst=int(os.environ.get('POLYMARKET_CLOB_BURST', '40'))
+            ),
+        }
+        # Optional hedging of the latency-sensitive CLOB reads (/book, /prices-history)
+        self.hedger = RequestHedger(
+            budget_ratio=float(os.environ.get('UPSTREAM_HEDGE_BUDGET', '0.05'))
+        ) if os.environ.get('UPSTREAM_HEDGING', '').lower() in ('1', 'true', 'yes') else None
+        self._last_good: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._last_good_lock = threading.Lock()
+        self.stale_responses = 0
+    
+    def _request(
+        self,
+        host: str,
+        method: str,
+        path: str,
+        params: Optional[Dict] = None,
+        json_body: Optional[Dict] = None,
+        fallback: bool = True,
+        hedge: bool = False
+    ) -> bytes:
+        """
+        Guarded request returning the response body. When the host fails (or its
+        circuit is open) the last good body for the same request is returned if
+        `fallback` is set and one exists; otherwise the error is raised.
+        With `hedge` (and hedging enabled) a slow call is raced against a duplicate.
+        """
+        base_url = self.gamma_base_url if host == "gamma" else self.clob_base_url
+        url = f"{base_url}{path}"
+        key = (method, url, tuple(sorted((params or {}).items())), json.dumps(json_body, sort_keys=True) if json_body else None)
+        
+        def attempt() -> bytes:
+            response = _send(method, url, params=params, json=json_body)
+            if response.status_code == 429 or response.status_code >= 500:
+                raise RetryableHTTPError(response.status_code, _retry_after(response))
+            response.raise_for_status()
+            return response.content
+        
+        try:
+            guarded = lambda: self.guards[host].call(attempt, RETRYABLE_ERRORS)
+            if hedge and self.hedger is not None:
+                content = self.hedger.call(f"{host}{path}", guarded)
+            else:
+                content = guarded()
+        except (UpstreamError, requests.RequestException, DeadlineExceeded) as e:
+            UPSTREAM_ERRORS.inc(_current_method.get(), type(e).__name__)
+            if fallback and not isinstance(e, DeadlineExceeded):
+                with self._last_good_lock:
+                    stale = self._last_good.get(key)
+                if stale is not None:
+                    self.stale_responses += 1
+                    UPSTREAM_STALE.inc(_current_method.get())
+                    log = logger.debug if isinstance(e, CircuitOpenError) else logger.warning
+                    log(f"{host} unavailable ({e}), serving last good response for {path}")
+                    return stale
+            raise
+        
+        if fallback:
+            with self._last_good_lock:
+                self._last_good[key] = content
+                self._last_good.move_to_end(key)
+                while len(self._last_good) > LAST_GOOD_ENTRIES:
+                    self._last_good.popitem(last=False)
+        return content
+    
+    def guard_stats(self) -> Dict:
+        return {
+            "hosts": {host: guard.stats() for host, guard in self.guards.items()},
+            "hedging": self.hedger.stats() if self.hedger is not None else None,
+            "last_good_entries": len(self._last_good),
+            "stale_responses": self.stale_responses,
+        }
         
+    @_tracked
     def get_markets(self, limit: int = 50, offset: int = 0) -> List[Dict]:
         """Fetch markets from Polymarket Gamma API"""
         try:
@@ -21,13 +177,14 @@ class PolymarketClient:
                 "ascending": "false"
             }
                 
-            response = requests.get(f"{self.gamma_base_url}/markets", params=params, timeout=10)
-            response.raise_for_status()
-            return response.json()
+            return json.loads(self._request("gamma", "GET", "/markets", params=params))
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error fetching markets: {e}")
             return []
     
+    @_tracked
     def get_events(self, limit: int = 100, offset: int = 0, tag: Optional[str] = None) -> List[Dict]:
         """Fetch events from Polymarket - ONLY active/ongoing markets"""
         try:
@@ -45,13 +202,79 @@ class PolymarketClient:
             if tag:
                 params["tag"] = tag
             
-            response = requests.get(f"{self.gamma_base_url}/events", params=params, timeout=10)
-            response.raise_for_status()
-            return response.json()
+            return json.loads(self._request("gamma", "GET", "/events", params=params))
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error fetching events: {e}")
             return []
     
+    @_tracked
+    def get_events_page(self, limit: int = 100, offset: int = 0, tag: Optional[str] = None) -> Optional[bytes]:
+        """Raw /events response body (same filters as get_events), for callers that decode it themselves"""
+        params = {
+            "limit": limit,
+            "offset": offset,
+            "closed": "false",
+            "archived": "false",
+            "active": "true",
+            "order": "volume24hr",
+            "ascending": "false"
+        }
+        if tag:
+            params["tag"] = tag
+        
+        try:
+            # No last-good fallback: a refresh must fail (and keep the old snapshot) rather than mix in stale pages
+            return self._request("gamma", "GET", "/events", params=params, fallback=False)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"Error fetching events page (offset={offset}): {e}")
+            return None
+    
+    def _open_events_stream(self, params: Dict) -> requests.Response:
+        """Open a streamed /events response under the gamma guard; only opening it is guarded"""
+        def attempt():
+            response = _send("GET", f"{self.gamma_base_url}/events", params=params, stream=True)
+            if response.status_code == 429 or response.status_code >= 500:
+                response.close()
+                raise RetryableHTTPError(response.status_code, _retry_after(response))
+            response.raise_for_status()
+            return response
+        
+        return self.guards["gamma"].call(attempt, RETRYABLE_ERRORS)
+    
+    @_tracked
+    def open_events_page(self, limit: int = 100, offset: int = 0, tag: Optional[str] = None) -> Optional[requests.Response]:
+        """
+        Streamed /events response (same filters as get_events) for callers that
+        decode the body incrementally, e.g. with iter_json_array over
+        iter_content(). The caller must close it. None if the page can't be opened.
+        """
+        params = {
+            "limit": limit,
+            "offset": offset,
+            "closed": "false",
+            "archived": "false",
+            "active": "true",
+            "order": "volume24hr",
+            "ascending": "false"
+        }
+        if tag:
+            params["tag"] = tag
+        
+        try:
+            # Never answered from the last good cache: a refresh must fail rather than mix in stale pages
+            return self._open_events_stream(params)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            UPSTREAM_ERRORS.inc("open_events_page", type(e).__name__)
+            logger.error(f"Error opening events page (offset={offset}): {e}")
+            return None
+    
+    @_tracked
     def get_trending_events(self, limit: int = 50) -> List[Dict]:
         """Fetch trending events from Polymarket"""
         try:
@@ -63,70 +286,89 @@ class PolymarketClient:
                 "ascending": "false"
             }
             
-            response = requests.get(f"{self.gamma_base_url}/events", params=params, timeout=10)
-            response.raise_for_status()
-            return response.json()
+            return json.loads(self._request("gamma", "GET", "/events", params=params))
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error fetching trending events: {e}")
             return []
     
+    @_tracked
     def get_market_by_slug(self, slug: str) -> Optional[Dict]:
         """Fetch a specific market by its slug"""
         try:
-            response = requests.get(f"{self.gamma_base_url}/markets/{slug}", timeout=10)
-            response.raise_for_status()
-            return response.json()
+            return json.loads(self._request("gamma", "GET", f"/markets/{slug}"))
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error fetching market {slug}: {e}")
             return None
     
+    @_tracked
     def get_orderbook(self, token_id: str) -> Optional[Dict]:
         """Fetch orderbook for a specific token"""
         try:
-            url = f"{self.clob_base_url}/book"
             params = {"token_id": token_id}
-            logger.info(f"GET {url} with params: {params}")
+            logger.debug(f"GET {self.clob_base_url}/book with params: {params}")
             
-            response = requests.get(url, params=params, timeout=10)
-            logger.info(f"Orderbook API response status: {response.status_code}")
-            response.raise_for_status()
-            
-            data = response.json()
+            data = json.loads(self._request("clob", "GET", "/book", params=params, hedge=True))
             logger.debug(f"Orderbook API response preview: bids={len(data.get('bids', []))}, asks={len(data.get('asks', []))}")
             return data
-        except requests.exceptions.RequestException as e:
+        except DeadlineExceeded:
+            raise
+        except (requests.exceptions.RequestException, UpstreamError) as e:
             logger.error(f"HTTP error fetching orderbook for token_id={token_id}: {e}")
             return None
         except Exception as e:
             logger.error(f"Error fetching orderbook for token_id={token_id}: {e}", exc_info=True)
             return None
     
-    def get_price_history(self, token_id: str, interval: str = "1h") -> List[Dict]:
-        """Fetch price history for a token"""
+    @_tracked
+    def get_price_history(
+        self,
+        token_id: str,
+        interval: str = "1h",
+        start_ts: Optional[int] = None,
+        end_ts: Optional[int] = None,
+        fidelity: int = 60,
+        raise_errors: bool = False
+    ) -> List[Dict]:
+        """
+        Fetch price history for a token, for a trailing interval or a start/end range.
+        Failures return [] unless raise_errors, for callers that cache an empty history.
+        """
         try:
-            url = f"{self.clob_base_url}/prices-history"
             params = {
                 "market": token_id,
-                "interval": interval,
-                "fidelity": "60"  # 60 data points
+                "fidelity": str(fidelity)  # Resolution in minutes
             }
-            logger.info(f"GET {url} with params: {params}")
+            # CLOB takes either a trailing interval or an explicit time range
+            if start_ts is not None:
+                params["startTs"] = start_ts
+                params["endTs"] = end_ts if end_ts is not None else int(time.time())
+            else:
+                params["interval"] = interval
+            logger.debug(f"GET {self.clob_base_url}/prices-history with params: {params}")
             
-            response = requests.get(url, params=params, timeout=10)
-            logger.info(f"Price history API response status: {response.status_code}")
-            response.raise_for_status()
-            
-            data = response.json()
+            # Range queries end at "now", so only trailing-interval queries repeat and are worth a fallback
+            data = json.loads(self._request("clob", "GET", "/prices-history", params=params, fallback=start_ts is None, hedge=True))
             history = data.get('history', [])
-            logger.info(f"Price history API response: {len(history)} data points")
+            logger.debug(f"Price history API response: {len(history)} data points")
             return history
-        except requests.exceptions.RequestException as e:
+        except DeadlineExceeded:
+            raise
+        except (requests.exceptions.RequestException, UpstreamError) as e:
             logger.error(f"HTTP error fetching price history for token_id={token_id}: {e}")
+            if raise_errors:
+                raise
             return []
         except Exception as e:
             logger.error(f"Error fetching price history for token_id={token_id}: {e}", exc_info=True)
+            if raise_errors:
+                raise
             return []
     
+    @_tracked
     def get_prices(self, token_ids: List[str]) -> Dict:
         """Fetch prices for multiple tokens"""
         try:
@@ -135,13 +377,9 @@ class PolymarketClient:
                 params_list.append({"token_id": token_id, "side": "BUY"})
                 params_list.append({"token_id": token_id, "side": "SELL"})
             
-            response = requests.post(
-                f"{self.clob_base_url}/prices",
-                json={"params": params_list},
-                timeout=10
-            )
-            response.raise_for_status()
-            return response.json()
+            return json.loads(self._request("clob", "POST", "/prices", json_body={"params": params_list}))
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error fetching prices: {e}")
             return {}
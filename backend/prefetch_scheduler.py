@@ -0,0 +1,180 @@
+"""
+Prefetch Scheduler - keeps the most requested tokens' data warm in the background.
+
+Every orderbook/chart request records its token in a decaying popularity
+counter. The hottest tokens are refreshed on a loop, each at a rate
+proportional to its share of the total popularity, so the upstream cost stays
+within a fixed calls-per-minute budget.
+"""
+import asyncio
+import heapq
+import logging
+import math
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PrefetchScheduler:
+    def __init__(
+        self,
+        fetchers: Dict[str, Callable[[str], Awaitable[Any]]],
+        hot_size: int = 50,
+        budget_per_minute: float = 600,
+        max_concurrency: int = 4,
+        half_life: float = 300,
+        min_interval: float = 5,
+        max_interval: float = 120,
+        jitter: float = 0.2,
+        max_tracked: int = 10000,
+    ):
+        """
+        Args:
+            fetchers: kind -> async callable(token_id) refreshing that kind of data
+            hot_size: how many of the most popular tokens are kept warm
+            budget_per_minute: upstream calls per minute spent on prefetching
+            max_concurrency: prefetch calls in flight at once
+            half_life: seconds for a token's popularity to halve without requests
+            min_interval / max_interval: bounds on each token's refresh interval
+            jitter: +/- fraction applied to each interval to spread calls out
+        """
+        self.fetchers = fetchers
+        self.hot_size = hot_size
+        self.budget_per_minute = budget_per_minute
+        self.half_life = half_life
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.max_tracked = max_tracked
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        self._scores: Dict[str, tuple] = {}  # token_id -> (score, last update time)
+        self._values: Dict[tuple, tuple] = {}  # (kind, token_id) -> (fetched_at, value)
+        self._next_due: Dict[str, float] = {}
+        self._intervals: Dict[str, float] = {}
+        self._in_flight = set()
+        self._calls_window: List[float] = []
+        self.prefetches = 0
+        self.errors = 0
+        self.hits = 0
+
+    def _decayed(self, token_id: str, now: float) -> float:
+        score, updated_at = self._scores.get(token_id, (0.0, now))
+        return score * math.pow(0.5, (now - updated_at) / self.half_life)
+
+    def record(self, token_id: str):
+        """Count one request for `token_id`"""
+        if not token_id:
+            return
+        now = time.monotonic()
+        self._scores[token_id] = (self._decayed(token_id, now) + 1.0, now)
+        if len(self._scores) > self.max_tracked:
+            self._prune(now)
+
+    def _prune(self, now: float):
+        """Drop the coldest half of tracked tokens to bound memory"""
+        keep = heapq.nlargest(self.max_tracked // 2, self._scores, key=lambda t: self._decayed(t, now))
+        keep = set(keep)
+        for token_id in list(self._scores):
+            if token_id not in keep:
+                self._scores.pop(token_id, None)
+                self._next_due.pop(token_id, None)
+                self._intervals.pop(token_id, None)
+        for key in list(self._values):
+            if key[1] not in keep:
+                del self._values[key]
+
+    def get(self, kind: str, token_id: str, max_age: float) -> Optional[Any]:
+        """Return prefetched data if it was fetched within `max_age` seconds"""
+        entry = self._values.get((kind, token_id))
+        if entry is None or time.monotonic() - entry[0] > max_age:
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def hot_set(self) -> List[tuple]:
+        """(token_id, decayed score) of the hottest tokens, most popular first"""
+        now = time.monotonic()
+        scored = ((token_id, self._decayed(token_id, now)) for token_id in self._scores)
+        return heapq.nlargest(self.hot_size, scored, key=lambda item: item[1])
+
+    def _plan(self, hot: List[tuple]):
+        """Split the call budget across the hot set in proportion to popularity"""
+        total = sum(score for _, score in hot)
+        calls_per_second = self.budget_per_minute / 60.0
+        for token_id, score in hot:
+            share = score / total if total > 0 else 0
+            # One refresh of a token costs one call per fetcher kind
+            refreshes_per_second = calls_per_second * share / max(len(self.fetchers), 1)
+            interval = 1.0 / refreshes_per_second if refreshes_per_second > 0 else self.max_interval
+            self._intervals[token_id] = min(max(interval, self.min_interval), self.max_interval)
+
+    def _within_budget(self, now: float) -> bool:
+        self._calls_window = [t for t in self._calls_window if now - t < 60]
+        return len(self._calls_window) + len(self.fetchers) <= self.budget_per_minute
+
+    async def _refresh(self, token_id: str):
+        try:
+            async with self._semaphore:
+                for kind, fetch in self.fetchers.items():
+                    self._calls_window.append(time.monotonic())
+                    try:
+                        value = await fetch(token_id)
+                        if value:
+                            self._values[(kind, token_id)] = (time.monotonic(), value)
+                        self.prefetches += 1
+                    except Exception as e:
+                        self.errors += 1
+                        logger.warning(f"Prefetch {kind} failed for token_id={token_id}: {e}")
+        finally:
+            # Also on cancellation, or the token would never be prefetched again
+            self._in_flight.discard(token_id)
+
+    async def run(self, tick: float = 1.0):
+        """Background loop: re-plan the hot set and start refreshes that are due"""
+        while True:
+            try:
+                now = time.monotonic()
+                hot = self.hot_set()
+                self._plan(hot)
+                for token_id, _ in hot:
+                    if token_id in self._in_flight or self._next_due.get(token_id, 0) > now:
+                        continue
+                    if not self._within_budget(now):
+                        break
+                    interval = self._intervals[token_id]
+                    self._next_due[token_id] = now + interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+                    self._in_flight.add(token_id)
+                    asyncio.create_task(self._refresh(token_id))
+            except Exception as e:
+                logger.error(f"Prefetch scheduler tick failed: {e}")
+            await asyncio.sleep(tick * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        hot = self.hot_set()
+        return {
+            "tracked_tokens": len(self._scores),
+            "hot_size": len(hot),
+            "budget_per_minute": self.budget_per_minute,
+            "calls_last_minute": len([t for t in self._calls_window if now - t < 60]),
+            "in_flight": len(self._in_flight),
+            "prefetches": self.prefetches,
+            "errors": self.errors,
+            "hits": self.hits,
+            "hot_set": [
+                {
+                    "token_id": token_id,
+                    "score": round(score, 3),
+                    "refresh_interval": round(self._intervals.get(token_id, self.max_interval), 1),
+                    "last_fetched_age": {
+                        kind: round(now - self._values[(kind, token_id)][0], 1)
+                        for kind in self.fetchers
+                        if (kind, token_id) in self._values
+                    }
+                }
+                for token_id, score in hot
+            ]
+        }
@@ -0,0 +1,289 @@
+"""
+Price History Cache - chart series per (token_id, interval), refreshed by
+fetching only the points newer than the last cached timestamp, plus a range
+cache for explicit start/end queries that only fetches uncovered gaps.
+"""
+import asyncio
+import bisect
+import contextlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from async_cache import SingleFlightCache
+
+logger = logging.getLogger(__name__)
+
+# Trailing window covered by each CLOB interval (None = full history)
+INTERVAL_SECONDS = {
+    '1h': 3600,
+    '6h': 6 * 3600,
+    '1d': 86400,
+    '1w': 7 * 86400,
+    '1m': 30 * 86400,
+    'max': None,
+}
+
+
+def ttl_for_interval(interval: str) -> float:
+    """Coarser intervals change less per second of wall time, so they can be cached longer"""
+    window = INTERVAL_SECONDS.get(interval)
+    if window is None:
+        return 600.0
+    return min(max(window / 120.0, 10.0), 600.0)
+
+
+class PriceHistoryCache:
+    def __init__(
+        self,
+        fetch_history: Callable[[str, str, Optional[int]], Awaitable[List[Dict]]],
+        max_entries: int = 2000,
+    ):
+        """
+        Args:
+            fetch_history: async (token_id, interval, start_ts) -> chart points
+                sorted by 'timestamp'; start_ts=None fetches the whole interval
+            max_entries: LRU bound per interval
+        """
+        self.fetch_history = fetch_history
+        self.max_entries = max_entries
+        self._caches: Dict[str, SingleFlightCache] = {}
+        self.full_fetches = 0
+        self.tail_fetches = 0
+        self.tail_points = 0
+
+    def _cache(self, interval: str) -> SingleFlightCache:
+        cache = self._caches.get(interval)
+        if cache is None:
+            cache = SingleFlightCache(ttl_for_interval(interval), self.max_entries, name=f"chart:{interval}")
+            self._caches[interval] = cache
+        return cache
+
+    async def get(self, token_id: str, interval: str, since: Optional[int] = None) -> List[Dict]:
+        """Series for the interval; with `since`, only points strictly newer than it"""
+        cache = self._cache(interval)
+        points = await cache.get(token_id, lambda: self._load(cache, token_id, interval)) or []
+        if since is not None:
+            start = bisect.bisect_right([p['timestamp'] for p in points], since)
+            return points[start:]
+        return points
+
+    async def refresh(self, token_id: str, interval: str) -> Optional[List[Dict]]:
+        """Append the latest tail now (used by the background prefetcher)"""
+        cache = self._cache(interval)
+        return await cache.refresh(token_id, lambda: self._load(cache, token_id, interval))
+
+    async def _load(self, cache: SingleFlightCache, token_id: str, interval: str) -> Optional[List[Dict]]:
+        cached = cache.peek(token_id, max_age=float('inf'))
+        if not cached:
+            self.full_fetches += 1
+            points = await self.fetch_history(token_id, interval, None)
+            # An empty result is usually an upstream error; don't pin it in the cache
+            return points or None
+
+        last_ts = cached[-1]['timestamp']
+        tail = await self.fetch_history(token_id, interval, last_ts + 1)
+        self.tail_fetches += 1
+        new_points = [p for p in tail if p['timestamp'] > last_ts]
+        self.tail_points += len(new_points)
+        # Build a new list: the cached one may still be held by in-progress responses
+        points = cached + new_points
+
+        window = INTERVAL_SECONDS.get(interval)
+        if window is not None:
+            cutoff = time.time() - window
+            start = bisect.bisect_left([p['timestamp'] for p in points], cutoff)
+            points = points[start:]
+        return points
+
+    def stats(self) -> Dict:
+        return {
+            "full_fetches": self.full_fetches,
+            "tail_fetches": self.tail_fetches,
+            "tail_points_appended": self.tail_points,
+            "intervals": {interval: cache.stats() for interval, cache in self._caches.items()},
+        }
+
+
+class PriceRangeCache:
+    """
+    Chart points for explicit [start_ts, end_ts] ranges at a given fidelity.
+
+    Each (token_id, fidelity) keeps a sorted list of non-overlapping covered
+    fragments. A query fetches only the gaps between fragments (split into
+    bounded chunks, a few at a time), then merges the results so overlapping
+    or adjacent fragments collapse into one. A chunk that comes back empty is
+    still covered (e.g. before the market existed); a failed one is not.
+    """
+
+    def __init__(
+        self,
+        fetch_range: Callable[[str, int, int, int], Awaitable[List[Dict]]],
+        max_entries: int = 1000,
+        max_points_per_request: int = 1000,
+        max_chunks: int = 20,
+        chunk_concurrency: int = 4,
+        max_points: int = 200_000,
+    ):
+        """
+        Args:
+            fetch_range: async (token_id, start_ts, end_ts, fidelity) -> chart points;
+                must raise on upstream failure, since an empty list is cached as "no points"
+            max_entries: LRU bound on cached (token_id, fidelity) keys
+            max_points_per_request: gaps longer than this many buckets are split
+            max_chunks: largest range accepted, in chunks (see max_chunks_exceeded)
+            chunk_concurrency: chunk fetches in flight at once per query
+            max_points: LRU bound on points held across all keys
+        """
+        self.fetch_range = fetch_range
+        self.max_entries = max_entries
+        self.max_points_per_request = max_points_per_request
+        self.max_chunks = max_chunks
+        self.chunk_concurrency = chunk_concurrency
+        self.max_points = max_points
+        # (token_id, fidelity) -> list of (start, end, points)
+        self._fragments: "OrderedDict[Tuple[str, int], List[tuple]]" = OrderedDict()
+        self._point_counts: Dict[Tuple[str, int], int] = {}
+        self._total_points = 0
+        # (token_id, fidelity) -> [lock, holders and waiters]; dropped once nobody uses it
+        self._locks: Dict[Tuple[str, int], list] = {}
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+        self.upstream_requests = 0
+
+    @staticmethod
+    def _gaps(fragments: List[tuple], start: int, end: int) -> List[Tuple[int, int]]:
+        gaps = []
+        cursor = start
+        for frag_start, frag_end, _ in fragments:
+            if frag_end < cursor:
+                continue
+            if frag_start > end:
+                break
+            if frag_start > cursor:
+                gaps.append((cursor, frag_start - 1))
+            cursor = max(cursor, frag_end + 1)
+        if cursor <= end:
+            gaps.append((cursor, end))
+        return gaps
+
+    @staticmethod
+    def _merge(fragments: List[tuple], new: List[tuple]) -> List[tuple]:
+        """Union of fragments; overlapping or touching ones are combined"""
+        merged = []
+        for frag_start, frag_end, points in sorted(fragments + new, key=lambda f: f[0]):
+            if merged and frag_start <= merged[-1][1] + 1:
+                last_start, last_end, last_points = merged[-1]
+                by_ts = {p['timestamp']: p for p in last_points}
+                by_ts.update((p['timestamp'], p) for p in points)
+                merged[-1] = (last_start, max(last_end, frag_end), [by_ts[ts] for ts in sorted(by_ts)])
+            else:
+                merged.append((frag_start, frag_end, points))
+        return merged
+
+    def _chunks(self, gap_start: int, gap_end: int, fidelity: int) -> List[Tuple[int, int]]:
+        span = self.max_points_per_request * fidelity * 60
+        return [(s, min(s + span - 1, gap_end)) for s in range(gap_start, gap_end + 1, span)]
+
+    def max_chunks_exceeded(self, start_ts: int, end_ts: int, fidelity: int) -> bool:
+        """Whether fetching the whole range would take more than max_chunks upstream requests"""
+        return len(range(start_ts, end_ts + 1, self.max_points_per_request * fidelity * 60)) > self.max_chunks
+
+    async def _fetch_chunks(self, token_id: str, chunks: List[Tuple[int, int]], fidelity: int) -> List:
+        """Fetch every chunk, at most chunk_concurrency at once; a failed chunk yields its exception"""
+        semaphore = asyncio.Semaphore(self.chunk_concurrency)
+
+        async def fetch(chunk_start: int, chunk_end: int):
+            async with semaphore:
+                return await self.fetch_range(token_id, chunk_start, chunk_end, fidelity)
+
+        return await asyncio.gather(*(fetch(*chunk) for chunk in chunks), return_exceptions=True)
+
+    @contextlib.asynccontextmanager
+    async def _key_lock(self, key: Tuple[str, int]):
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
+
+    def _store(self, key: Tuple[str, int], fragments: List[tuple]):
+        count = sum(len(points) for _, _, points in fragments)
+        self._total_points += count - self._point_counts.get(key, 0)
+        self._fragments[key] = fragments
+        self._point_counts[key] = count
+        self._fragments.move_to_end(key)
+        while self._fragments and (len(self._fragments) > self.max_entries or self._total_points > self.max_points):
+            evicted, _ = self._fragments.popitem(last=False)
+            self._total_points -= self._point_counts.pop(evicted)
+
+    async def get(self, token_id: str, start_ts: int, end_ts: int, fidelity: int = 60) -> List[Dict]:
+        key = (token_id, fidelity)
+        # Serialize per key so overlapping concurrent queries don't fetch the same gap twice
+        async with self._key_lock(key):
+            fragments = self._fragments.get(key, [])
+            gaps = self._gaps(fragments, start_ts, end_ts)
+            if not gaps:
+                self.hits += 1
+                self._fragments.move_to_end(key)
+                return self._slice(fragments, start_ts, end_ts)
+
+            if gaps == [(start_ts, end_ts)]:
+                self.misses += 1
+            else:
+                self.partial_hits += 1
+            chunks = [chunk for gap in gaps for chunk in self._chunks(*gap, fidelity)]
+            self.upstream_requests += len(chunks)
+            results = await self._fetch_chunks(token_id, chunks, fidelity)
+            errors = [r for r in results if isinstance(r, BaseException)]
+            if len(errors) == len(results):
+                raise errors[0]
+
+            # The newest bucket may still change, so coverage stops one bucket before now;
+            # points past that edge are returned for this request but not cached
+            covered_until = int(time.time()) - fidelity * 60
+            covered, edge_points = [], []
+            for (chunk_start, chunk_end), points in zip(chunks, results):
+                if isinstance(points, BaseException):
+                    continue  # Leave the gap to be refetched
+                frag_end = min(chunk_end, covered_until)
+                if frag_end >= chunk_start:
+                    covered.append((chunk_start, frag_end, [p for p in points if p['timestamp'] <= frag_end]))
+                edge_points.extend(p for p in points if p['timestamp'] > frag_end)
+
+            fragments = self._merge(fragments, covered)
+            self._store(key, fragments)
+
+            points = self._slice(fragments, start_ts, end_ts)
+            if edge_points:
+                points = sorted(points + [p for p in edge_points if start_ts <= p['timestamp'] <= end_ts],
+                                key=lambda p: p['timestamp'])
+            return points
+
+    @staticmethod
+    def _slice(fragments: List[tuple], start_ts: int, end_ts: int) -> List[Dict]:
+        points = []
+        for frag_start, frag_end, frag_points in fragments:
+            if frag_end < start_ts or frag_start > end_ts:
+                continue
+            points.extend(p for p in frag_points if start_ts <= p['timestamp'] <= end_ts)
+        return points
+
+    def stats(self) -> Dict:
+        return {
+            "keys": len(self._fragments),
+            "fragments": sum(len(f) for f in self._fragments.values()),
+            "points": self._total_points,
+            "hits": self.hits,
+            "partial_hits": self.partial_hits,
+            "misses": self.misses,
+            "upstream_requests": self.upstream_requests,
+        }
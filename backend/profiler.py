@@ -0,0 +1,178 @@
+"""
+Profiler - on-demand sampling profiler for a running server.
+
+A background thread samples every thread's stack with sys._current_frames()
+and counts identical stacks, giving collapsed-stack output that flamegraph.pl
+or speedscope can render. Optionally tracemalloc runs for the session to
+report the top allocation sites. Nothing runs between sessions, so a disabled
+profiler costs nothing.
+
+Sessions cover all threads: the event loop and the to_thread workers where
+MarketService and PolymarketClient do their work. A request-triggered session
+therefore also picks up any requests running concurrently with it.
+"""
+import asyncio
+import itertools
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Leaf frames of threads parked waiting for work; counted as idle, not profiled
+IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("connection.py", "wait"),
+    ("thread.py", "_worker"),  # ThreadPoolExecutor worker blocked on its (C) work queue
+}
+
+
+class ProfilerBusy(Exception):
+    """Another profiling session is already running"""
+
+
+class ProfileSession:
+    def __init__(self, session_id: int, trigger: str, interval: float, memory_top: int, label: str = ""):
+        self.id = session_id
+        self.trigger = trigger
+        self.label = label
+        self.interval = interval
+        self.memory_top = memory_top
+        self.started_at = time.time()
+        self.duration = 0.0
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.idle_samples = 0
+        self.memory: List[Dict] = []
+        self.owns_tracemalloc = False  # Started tracing itself, so stops it again when done
+
+    def collapsed(self) -> str:
+        """One 'thread;outer;...;leaf count' line per distinct stack"""
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, top: int = 25) -> Dict:
+        self_time: Counter = Counter()
+        inclusive: Counter = Counter()
+        for stack, count in self.stacks.items():
+            self_time[stack[-1]] += count
+            for frame in set(stack[1:]):
+                inclusive[frame] += count
+        total = sum(self.stacks.values()) or 1
+        return {
+            "id": self.id,
+            "trigger": self.trigger,
+            "label": self.label,
+            "started_at": self.started_at,
+            "duration_s": round(self.duration, 3),
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "idle_samples": self.idle_samples,
+            "top_self": [{"frame": f, "samples": n, "pct": round(100 * n / total, 1)} for f, n in self_time.most_common(top)],
+            "top_inclusive": [{"frame": f, "samples": n, "pct": round(100 * n / total, 1)} for f, n in inclusive.most_common(top)],
+            "memory_top": self.memory,
+        }
+
+
+class Profiler:
+    def __init__(self, max_sessions: int = 20):
+        self._lock = threading.Lock()
+        self._active: Optional[ProfileSession] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._ids = itertools.count(1)
+        self._labels: Dict[object, str] = {}
+        self.sessions: "deque[ProfileSession]" = deque(maxlen=max_sessions)
+
+    @property
+    def active(self) -> bool:
+        return self._active is not None
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+        return label
+
+    def _sample_loop(self, session: ProfileSession):
+        me = threading.get_ident()
+        while not self._stop.wait(session.interval):
+            names = {t.ident: re.sub(r"[_-][0-9a-f]+$", "", t.name) for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                leaf = frame.f_code
+                session.samples += 1
+                if (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_LEAVES:
+                    session.idle_samples += 1
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, "thread"))
+                session.stacks[tuple(reversed(stack))] += 1
+
+    def start(self, trigger: str, interval: float = 0.005, memory_top: int = 0, label: str = "") -> ProfileSession:
+        """Begin a session; raises ProfilerBusy if one is running"""
+        with self._lock:
+            if self._active is not None:
+                raise ProfilerBusy("a profiling session is already running")
+            session = self._active = ProfileSession(next(self._ids), trigger, interval, memory_top, label)
+        if memory_top and not tracemalloc.is_tracing():
+            tracemalloc.start(1)
+            session.owns_tracemalloc = True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample_loop, args=(session,), name="profiler", daemon=True)
+        self._thread.start()
+        return session
+
+    def stop(self) -> ProfileSession:
+        session = self._active
+        self._stop.set()
+        self._thread.join()
+        session.duration = time.time() - session.started_at
+        try:
+            if session.memory_top and tracemalloc.is_tracing():
+                snapshot = tracemalloc.take_snapshot().filter_traces([
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, __file__),
+                    tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+                ])
+                session.memory = [
+                    {"location": f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                     "size_kb": round(stat.size / 1024, 1), "blocks": stat.count}
+                    for stat in snapshot.statistics("lineno")[:session.memory_top]
+                ]
+        finally:
+            # Also when the memory report failed: a session left active refuses every later one as busy
+            if session.owns_tracemalloc:
+                # Tracing someone else started (e.g. PYTHONTRACEMALLOC) keeps running
+                tracemalloc.stop()
+            self.sessions.append(session)
+            self._active = None
+        logger.info(f"Profile {session.id} ({session.trigger} {session.label}) finished: "
+                    f"{session.samples} samples in {session.duration:.1f}s")
+        return session
+
+    async def profile_window(self, seconds: float, interval: float = 0.005, memory_top: int = 0) -> ProfileSession:
+        """Profile everything the process does for `seconds`"""
+        session = self.start("window", interval, memory_top, label=f"{seconds:g}s")
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            self.stop()
+        return session
+
+    def get(self, session_id: int) -> Optional[ProfileSession]:
+        for session in self.sessions:
+            if session.id == session_id:
+                return session
+        return None
@@ -0,0 +1,168 @@
+"""
+Request Hedger - cut tail latency of idempotent upstream reads by firing a
+duplicate request once the first one has taken longer than the recent p95,
+then using whichever answers first.
+
+Hedges are capped by a global budget (a fraction of recent requests), so a
+slow upstream sees at most that much extra load. The losing request cannot
+be interrupted mid-read by `requests`; it is dropped if still queued,
+otherwise left to finish in the background and its result discarded.
+"""
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional, TypeVar
+
+from upstream_guard import RetryBudget
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Recent successful attempt latencies for one endpoint"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._p95 = None
+        self._dirty = 0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self._dirty += 1
+
+    def p95(self) -> Optional[float]:
+        with self._lock:
+            # Re-sorting on every call would cost more than the requests it hedges
+            if self._p95 is None or self._dirty >= 10:
+                ordered = sorted(self._samples)
+                self._p95 = ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] if ordered else None
+                self._dirty = 0
+            return self._p95
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class EndpointStats:
+    def __init__(self):
+        self.tracker = LatencyTracker()
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.budget_denied = 0
+
+
+class RequestHedger:
+    def __init__(
+        self,
+        max_workers: int = 16,
+        budget_ratio: float = 0.05,
+        min_samples: int = 20,
+        min_delay: float = 0.02,
+        max_delay: float = 2.0,
+    ):
+        """
+        Args:
+            max_workers: threads running primary and hedge attempts
+            budget_ratio: hedges allowed as a fraction of recent requests (all endpoints)
+            min_samples: no hedging for an endpoint until this many latencies are known
+            min_delay, max_delay: clamp on the p95-based hedge delay
+        """
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.budget = RetryBudget(ratio=budget_ratio, min_retries=1)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self._endpoints: Dict[str, EndpointStats] = {}
+        self._lock = threading.Lock()
+
+    def _endpoint(self, name: str) -> EndpointStats:
+        with self._lock:
+            stats = self._endpoints.get(name)
+            if stats is None:
+                stats = self._endpoints[name] = EndpointStats()
+            return stats
+
+    def hedge_delay(self, name: str) -> Optional[float]:
+        tracker = self._endpoint(name).tracker
+        if len(tracker) < self.min_samples:
+            return None
+        return min(max(tracker.p95(), self.min_delay), self.max_delay)
+
+    def _submit(self, stats: EndpointStats, attempt: Callable[[], T]):
+        started = time.monotonic()
+        # Run in a copy of the caller's context so context-local request state follows the attempt
+        future = self._executor.submit(contextvars.copy_context().run, attempt)
+
+        def record(done):
+            if not done.cancelled() and done.exception() is None:
+                stats.tracker.record(time.monotonic() - started)
+        future.add_done_callback(record)
+        return future
+
+    def call(self, name: str, attempt: Callable[[], T]) -> T:
+        """Run `attempt()`, hedging it with a second identical call if it is slow"""
+        stats = self._endpoint(name)
+        stats.requests += 1
+        self.budget.record_request()
+        delay = self.hedge_delay(name)
+
+        if delay is None:
+            started = time.monotonic()
+            result = attempt()
+            stats.tracker.record(time.monotonic() - started)
+            return result
+
+        primary = self._submit(stats, attempt)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        if not self.budget.try_spend():
+            stats.budget_denied += 1
+            return primary.result()
+
+        stats.hedged += 1
+        hedge = self._submit(stats, attempt)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        stats.hedge_wins += 1
+                    for loser in pending:
+                        loser.cancel()
+                    return future.result()
+                error = future.exception()
+        # Both attempts failed: surface the last error, as a single call would
+        raise error
+
+    def stats(self) -> Dict:
+        with self._lock:
+            endpoints = dict(self._endpoints)
+        return {
+            "budget": self.budget.stats(),
+            "endpoints": {
+                name: {
+                    "requests": s.requests,
+                    "hedged": s.hedged,
+                    "hedge_rate": round(s.hedged / s.requests, 4) if s.requests else 0.0,
+                    "hedge_wins": s.hedge_wins,
+                    "hedge_win_rate": round(s.hedge_wins / s.hedged, 4) if s.hedged else 0.0,
+                    "budget_denied": s.budget_denied,
+                    "p95_ms": round(s.tracker.p95() * 1000, 1) if len(s.tracker) else None,
+                }
+                for name, s in endpoints.items()
+            },
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
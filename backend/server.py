@@ -1,18 +1,42 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Query
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Depends, Response
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 import asyncio
+import contextvars
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
 from typing import List, Optional
 import uuid
 from datetime import datetime, timezone, timedelta
-from market_service import MarketService
-from solana_service import SolanaService
-from insights_service import MarketInsightsService
+from dependencies import (
+    get_market_service,
+    solana_service_provider,
+    insights_service_provider,
+    is_admin_token,
+    require_admin,
+)
+from market_snapshot import MarketSnapshot, map_snapshot_file, write_snapshot_file
+from snapshot_shm import SharedSnapshotStore
+from snapshot_leader import SnapshotLeaderElection
+from prefetch_scheduler import PrefetchScheduler
+from async_cache import SingleFlightCache
+from price_history_cache import INTERVAL_SECONDS, PriceHistoryCache, PriceRangeCache
+from outcome_fanout import market_outcomes, fan_out, rank_outcomes, summarize_book
+from ingest_pipeline import Pipeline
+from transform_pool import TransformPool
+from deadline import DEADLINE_HEADER, DeadlineExceeded, set_deadline, reset_deadline
+from log_pipeline import configure_logging
+from profiler import Profiler, ProfilerBusy
+from loop_monitor import LoopWatchdog
+from load_shedding import ConcurrencyLimiter, background_priority
+from metrics import REGISTRY as metrics_registry, CONTENT_TYPE as METRICS_CONTENT_TYPE, Counter, Histogram
 
 
 ROOT_DIR = Path(__file__).parent
@@ -23,33 +47,550 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
-# Initialize services
-market_service = MarketService()
-solana_service = SolanaService()
-insights_service = MarketInsightsService()
+# Services are created lazily by the providers in dependencies.py
 
 # In-memory cache for markets (reduces load on Polymarket API)
+# The snapshot holds the market list plus columnar arrays for analytics/filtering
 markets_cache = {
-    "data": None,
+    "snapshot": None,
     "timestamp": None,
+    "version": 0,
+    "live": False,  # False while serving a snapshot restored from disk
     "cache_duration": 60  # Cache for 60 seconds
 }
 
+# Last good snapshot persisted locally so a restart can serve immediately
+snapshot_file = Path(os.environ.get('SNAPSHOT_CACHE_PATH', ROOT_DIR / '.snapshot_cache' / 'markets.snapshot'))
+
+# Optional cross-worker sharing: one refresher publishes, other workers map it read-only
+shared_snapshot = SharedSnapshotStore(os.environ['SNAPSHOT_SHM_DIR']) if os.environ.get('SNAPSHOT_SHM_DIR') else None
+
+# Optional cross-node sharing: the MongoDB lease holder refreshes, other nodes pull its snapshot
+leader_election = SnapshotLeaderElection(
+    db, lease_seconds=float(os.environ.get('SNAPSHOT_LEASE_SECONDS', '30'))
+) if os.environ.get('SNAPSHOT_LEADER_ELECTION', '').lower() in ('1', 'true', 'yes') else None
+# Live price patches bump the version every few seconds; the leader republishes the whole compressed
+# snapshot for them at most this often (new refreshes are published right away)
+LEADER_PATCH_PUBLISH_INTERVAL = float(os.environ.get('SNAPSHOT_PATCH_PUBLISH_INTERVAL', '30'))
+
+# Request, refresh and cache metrics (exported on /metrics with the upstream and loop lag ones)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "API request latency by route template and status", ["method", "route", "status"]
+)
+REFRESH_DURATION = Histogram(
+    "markets_refresh_duration_seconds", "Market snapshot refresh pipeline runs", ["pipeline", "outcome"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+)
+MARKETS_CACHE_REQUESTS = Counter(
+    "markets_cache_requests_total", "/api/markets lookups by how the snapshot cache answered", ["result"]
+)
+
+def install_snapshot(snapshot: MarketSnapshot, live: bool = True):
+    """Swap in a new snapshot (a single reference assignment, so readers never see a mix)"""
+    markets_cache["snapshot"] = snapshot
+    markets_cache["version"] = snapshot.version
+    markets_cache["timestamp"] = datetime.fromtimestamp(snapshot.created_at)
+    markets_cache["live"] = live
+    if live and (shared_snapshot is None or shared_snapshot.is_refresher):
+        if shared_snapshot is not None:
+            shared_publisher.schedule()
+        snapshot_persister.schedule()
+
+class SnapshotWriter:
+    """
+    Runs a blocking snapshot write in a worker thread so serialization and disk I/O never
+    stall the event loop. At most one write is in flight; requests made meanwhile coalesce
+    into one more write, which picks up whatever snapshot is current by then.
+    """
+
+    def __init__(self, name: str, write):
+        self.name = name
+        self.write = write
+        self._task: Optional[asyncio.Task] = None
+        self._pending = False
+
+    def schedule(self):
+        self._pending = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while self._pending:
+            self._pending = False
+            try:
+                await asyncio.to_thread(self.write)
+            except Exception as e:
+                logging.error(f"Snapshot {self.name} failed: {e}")
+
+    async def drain(self):
+        """Wait for any scheduled write to finish"""
+        if self._task is not None:
+            await self._task
+
+def publish_shared_snapshot():
+    """Publish the current snapshot to the other workers on this host"""
+    snapshot = markets_cache["snapshot"]
+    if snapshot is not None and markets_cache["live"]:
+        shared_snapshot.publish(snapshot)
+
+def persist_snapshot():
+    """Write the current live snapshot to disk for warm starts"""
+    snapshot = markets_cache["snapshot"]
+    if snapshot is None or not markets_cache["live"]:
+        return
+    try:
+        snapshot_file.parent.mkdir(parents=True, exist_ok=True)
+        write_snapshot_file(snapshot, snapshot_file, durable=True)
+    except OSError as e:
+        logging.warning(f"Could not persist snapshot to {snapshot_file}: {e}")
+
+snapshot_persister = SnapshotWriter("persist", persist_snapshot)
+shared_publisher = SnapshotWriter("shared publish", publish_shared_snapshot)
+
+def load_persisted_snapshot() -> bool:
+    """Map the last persisted snapshot so it can be served (as stale) right away"""
+    try:
+        snapshot = map_snapshot_file(snapshot_file)
+    except FileNotFoundError:
+        return False
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable snapshot file {snapshot_file}: {e}")
+        return False
+    install_snapshot(snapshot, live=False)
+    logging.info(f"Restored snapshot v{snapshot.version} from disk ({len(snapshot)} markets, {snapshot.age:.0f}s old)")
+    return True
+
+def is_refresher() -> bool:
+    """Whether this process fetches from Polymarket itself (always true without sharing)"""
+    if shared_snapshot is not None and not shared_snapshot.is_refresher:
+        return False
+    if leader_election is not None and not leader_election.is_leader:
+        return False
+    return True
+
+def snapshot_age() -> float:
+    """Seconds since the cached snapshot was built (infinite when there is none)"""
+    if markets_cache["snapshot"] is None or markets_cache["timestamp"] is None:
+        return float('inf')
+    return (datetime.now() - markets_cache["timestamp"]).total_seconds()
+
+# Market refresh pipeline: page fetch -> decode -> expiry/closed filter -> placeholder
+# filter -> transform -> index update. Each stage is its own task behind a bounded
+# queue, so the next events page is fetched while the previous one is transformed.
+REFRESH_MARKET_LIMIT = int(os.environ.get('REFRESH_MARKET_LIMIT', '300'))  # Fetch max, cache it
+REFRESH_PAGE_SIZE = int(os.environ.get('REFRESH_PAGE_SIZE', '100'))
+REFRESH_QUEUE_SIZE = int(os.environ.get('REFRESH_QUEUE_SIZE', '4'))
+
+# Events crawled per refresh (default: twice the market limit, capped at 400)
+REFRESH_EVENT_LIMIT = int(os.environ['REFRESH_EVENT_LIMIT']) if os.environ.get('REFRESH_EVENT_LIMIT') else None
+
+# Crawls of TRANSFORM_POOL_MIN_BATCH+ events decode/filter/transform their pages in worker processes
+transform_pool = TransformPool(
+    max_workers=int(os.environ['TRANSFORM_POOL_WORKERS']) if os.environ.get('TRANSFORM_POOL_WORKERS') else None,
+    min_batch_size=int(os.environ.get('TRANSFORM_POOL_MIN_BATCH', '2000')),
+)
+
+async def index_markets(markets):
+    """Index update stage: collect up to the market limit and build the next snapshot"""
+    collected = []
+    async for market in markets:
+        collected.append(market)
+        if len(collected) >= REFRESH_MARKET_LIMIT:
+            break  # Leaving early cancels the page fetches still ahead
+    yield MarketSnapshot(collected, version=markets_cache["version"] + 1)
+
+# Pages are decoded incrementally from the response stream, in a worker thread
+refresh_pipeline = Pipeline("markets_refresh", [
+    ("fetch", lambda offsets: get_market_service().open_event_pages(offsets, REFRESH_PAGE_SIZE)),
+    ("decode", lambda pages: get_market_service().decode_event_pages(pages)),
+    ("expiry_filter", lambda events: get_market_service().filter_live_events(events)),
+    ("placeholder_filter", lambda events: get_market_service().filter_placeholder_outcomes(events)),
+    ("transform", lambda events: get_market_service().transform_events(events)),
+    ("index", index_markets),
+], queue_size=REFRESH_QUEUE_SIZE)
+
+# Large crawls: whole pages go to the transform pool and only markets come back
+pooled_refresh_pipeline = Pipeline("markets_refresh_pooled", [
+    ("fetch", lambda offsets: get_market_service().fetch_event_pages(offsets, REFRESH_PAGE_SIZE)),
+    ("pooled_transform", lambda pages: transform_pool.transform_pages(get_market_service(), pages)),
+    ("index", index_markets),
+], queue_size=REFRESH_QUEUE_SIZE)
+
+# Concurrent refresh triggers share one pipeline run
+refresh_flight = SingleFlightCache(ttl=0, max_entries=1, name="refresh")
+
+async def run_refresh_pipeline() -> MarketSnapshot:
+    offsets = get_market_service().event_page_offsets(REFRESH_MARKET_LIMIT, REFRESH_PAGE_SIZE, REFRESH_EVENT_LIMIT)
+    pipeline = pooled_refresh_pipeline if transform_pool.should_offload(len(offsets) * REFRESH_PAGE_SIZE) else refresh_pipeline
+    snapshot = None
+    started = time.perf_counter()
+    try:
+        async for snapshot in pipeline.run(offsets):
+            pass
+        if snapshot is None or not len(snapshot):
+            # An empty result means upstream failed; keep serving the last good snapshot
+            # (and never cache an empty one on a cold start)
+            raise RuntimeError("Polymarket returned no markets")
+    except Exception:
+        REFRESH_DURATION.observe(time.perf_counter() - started, pipeline.name, "error")
+        raise
+    REFRESH_DURATION.observe(time.perf_counter() - started, pipeline.name, "ok")
+    install_snapshot(snapshot)
+    return snapshot
+
+async def refresh_snapshot() -> MarketSnapshot:
+    """Fetch markets from Polymarket and install them as the new cached snapshot"""
+    return await refresh_flight.refresh("markets", run_refresh_pipeline)
+
+async def get_market_snapshot() -> MarketSnapshot:
+    """Return the cached snapshot, refreshing it when missing or expired"""
+    if markets_cache["snapshot"] is not None:
+        # Followers never refresh on their own; the shared refresher owns freshness.
+        # A restored snapshot is served while warm_cache fetches in the background.
+        if snapshot_age() < markets_cache["cache_duration"] or not is_refresher() or not markets_cache["live"]:
+            return markets_cache["snapshot"]
+        try:
+            return await refresh_snapshot()
+        except Exception as e:
+            logging.warning(f"Refresh failed, serving stale snapshot: {e}")
+            return markets_cache["snapshot"]
+    return await refresh_snapshot()
+
+async def snapshot_for_request() -> MarketSnapshot:
+    """get_market_snapshot for routes: the cached snapshot if a refresh fails or runs out of time, else 503"""
+    try:
+        return await get_market_snapshot()
+    except Exception as e:
+        if markets_cache["snapshot"] is not None:
+            logging.warning(f"Snapshot refresh failed ({type(e).__name__}: {e}), serving the cached one")
+            return markets_cache["snapshot"]
+        logging.error(f"No market snapshot available: {e}")
+        raise HTTPException(status_code=503, detail="Markets temporarily unavailable", headers={"Retry-After": "5"})
+
+def sync_shared_snapshot() -> bool:
+    """Install the published shared snapshot if it is newer than ours"""
+    snapshot = shared_snapshot.load_if_newer(markets_cache["version"])
+    if snapshot is None:
+        return False
+    install_snapshot(snapshot)
+    logging.info(f"Loaded shared snapshot v{snapshot.version} ({len(snapshot)} markets)")
+    return True
+
+async def sync_leader_snapshot() -> bool:
+    """Install the snapshot published by the leader node if it is newer than ours"""
+    snapshot = await leader_election.load_if_newer(markets_cache["version"])
+    if snapshot is None:
+        return False
+    install_snapshot(snapshot)
+    logging.info(f"Loaded leader snapshot v{snapshot.version} ({len(snapshot)} markets)")
+    return True
+
 # Background task to pre-warm cache
 async def warm_cache():
     """Pre-load markets cache on startup"""
     try:
         logging.info("Warming up markets cache...")
-        markets = market_service.get_trending_markets(limit=300)
-        markets_cache["data"] = markets
-        markets_cache["timestamp"] = datetime.now()
-        logging.info(f"Cache warmed with {len(markets)} markets")
+        if shared_snapshot is not None:
+            sync_shared_snapshot()
+            if not shared_snapshot.try_acquire_refresher():
+                # Another worker refreshes; snapshot_sync_loop follows its versions
+                logging.info(f"Cache warmed from shared snapshot v{markets_cache['version']}")
+                return
+        if leader_election is not None:
+            await sync_leader_snapshot()
+            if not await leader_election.try_acquire_or_renew() and markets_cache["snapshot"] is not None:
+                logging.info(f"Cache warmed from leader snapshot v{markets_cache['version']}")
+                return
+        retry_delay = 5
+        while True:
+            try:
+                snapshot = await refresh_snapshot()
+                break
+            except Exception as e:
+                if markets_cache["snapshot"] is None:
+                    raise
+                # Keep serving the restored snapshot and retry until a live refresh lands
+                logging.warning(f"Live refresh failed, serving stale snapshot (retry in {retry_delay}s): {e}")
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 60)
+                if markets_cache["live"]:
+                    return
+        if leader_election is not None and leader_election.is_leader:
+            await leader_election.publish(snapshot)
+        logging.info(f"Cache warmed with {len(snapshot)} markets")
     except Exception as e:
         logging.error(f"Failed to warm cache: {e}")
 
+async def snapshot_sync_loop():
+    """Keep the snapshot fresh when this process is the refresher, otherwise follow published versions"""
+    while True:
+        await asyncio.sleep(1)
+        try:
+            if shared_snapshot is not None and not shared_snapshot.try_acquire_refresher():
+                sync_shared_snapshot()
+                continue
+            if leader_election is not None:
+                # Always adopt newer published data first so versions stay monotonic across failover
+                await sync_leader_snapshot()
+                if not await leader_election.try_acquire_or_renew():
+                    continue
+            if snapshot_age() >= markets_cache["cache_duration"]:
+                await refresh_snapshot()
+            if leader_election is not None and leader_election.publish_due(markets_cache["snapshot"], LEADER_PATCH_PUBLISH_INTERVAL):
+                await leader_election.publish(markets_cache["snapshot"])
+        except Exception as e:
+            logging.error(f"Snapshot sync failed: {e}")
+
+# Concurrency per expensive route class; cheap cached routes (/markets, snapshot lookups) are never limited
+UPSTREAM_CONCURRENCY = int(os.environ.get('UPSTREAM_CONCURRENCY', '8'))
+route_limiters = {
+    "insights": ConcurrencyLimiter(
+        "insights", int(os.environ.get('INSIGHTS_CONCURRENCY', '4')),
+        int(os.environ.get('INSIGHTS_QUEUE', '8')), queue_timeout=10.0
+    ),
+    "analytics": ConcurrencyLimiter(
+        "analytics", int(os.environ.get('ANALYTICS_CONCURRENCY', '2')),
+        int(os.environ.get('ANALYTICS_QUEUE', '8')), queue_timeout=2.0
+    ),
+    "upstream": ConcurrencyLimiter(
+        "upstream", UPSTREAM_CONCURRENCY,
+        int(os.environ.get('UPSTREAM_QUEUE', '64')), queue_timeout=5.0
+    ),
+}
+
+# Admitted upstream calls get a pool sized to the limit, so one always has a thread: the default
+# to_thread pool is shared with the refresh pipeline, live price batches and everything else
+upstream_executor = ThreadPoolExecutor(max_workers=UPSTREAM_CONCURRENCY, thread_name_prefix="upstream")
+
+async def limited_upstream_call(fn, *args):
+    """Run a blocking upstream call off the loop, within the upstream class limit (cold cache loads only)"""
+    async with route_limiters["upstream"].slot():
+        # Like asyncio.to_thread, carry the caller's context (request deadline) into the worker
+        call = functools.partial(contextvars.copy_context().run, fn, *args)
+        return await asyncio.get_running_loop().run_in_executor(upstream_executor, call)
+
+# Background prefetch of the most requested tokens' orderbooks and chart tails
+PREFETCH_CHART_INTERVAL = "1h"  # The interval the trading page opens with
+
+# Per-token orderbook microcache: identical requests within the TTL share one upstream call
+ORDERBOOK_CACHE_TTL = float(os.environ.get('ORDERBOOK_CACHE_TTL', '1'))
+# Prefetched books are served only while no older than a microcache hit could be
+PREFETCH_BOOK_MAX_AGE = min(float(os.environ.get('PREFETCH_BOOK_MAX_AGE', ORDERBOOK_CACHE_TTL)), ORDERBOOK_CACHE_TTL)
+orderbook_cache = SingleFlightCache(
+    ttl=ORDERBOOK_CACHE_TTL,
+    max_entries=int(os.environ.get('ORDERBOOK_CACHE_SIZE', '2000')),
+    name="orderbook"
+)
+
+def load_orderbook(token_id: str):
+    """Loader for orderbook_cache; runs the blocking upstream call off the event loop"""
+    return limited_upstream_call(get_market_service().get_orderbook, token_id)
+
+async def fetch_orderbook(token_id: str):
+    """Orderbook for a token: prefetched if fresh, else via the single-flight microcache"""
+    prefetcher.record(token_id)
+    orderbook = prefetcher.get("book", token_id, PREFETCH_BOOK_MAX_AGE)
+    if orderbook is None:
+        orderbook = await orderbook_cache.get(token_id, lambda: load_orderbook(token_id))
+    return orderbook
+
+async def prefetch_orderbook(token_id: str):
+    # Goes through the microcache so it coalesces with concurrent user requests
+    with background_priority():
+        return await orderbook_cache.refresh(token_id, lambda: load_orderbook(token_id))
+
+# Chart series per (token_id, interval); refreshes only fetch the tail after the last cached point
+def check_chart_interval(interval: str):
+    """Only known intervals are served; each one gets its own cache, so arbitrary strings would grow memory"""
+    if interval not in INTERVAL_SECONDS:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown interval {interval!r}; expected one of {', '.join(INTERVAL_SECONDS)}"
+        )
+
+def load_price_history(token_id: str, interval: str, start_ts: Optional[int]):
+    return limited_upstream_call(get_market_service().get_price_chart_data, token_id, interval, start_ts)
+
+price_history_cache = PriceHistoryCache(
+    load_price_history,
+    max_entries=int(os.environ.get('CHART_CACHE_SIZE', '2000'))
+)
+
+# Explicit start/end/fidelity chart queries; only uncovered gaps are fetched upstream
+def load_price_range(token_id: str, start_ts: int, end_ts: int, fidelity: int):
+    # Failures raise: the range cache records an empty result as a covered range with no points
+    return limited_upstream_call(
+        get_market_service().get_price_chart_data, token_id, None, start_ts, end_ts, fidelity, True
+    )
+
+price_range_cache = PriceRangeCache(
+    load_price_range,
+    max_entries=int(os.environ.get('CHART_RANGE_CACHE_SIZE', '1000')),
+    max_points=int(os.environ.get('CHART_RANGE_CACHE_POINTS', '200000'))
+)
+
+async def prefetch_chart(token_id: str):
+    with background_priority():
+        return await price_history_cache.refresh(token_id, PREFETCH_CHART_INTERVAL)
+
+prefetcher = PrefetchScheduler(
+    {"book": prefetch_orderbook, "chart": prefetch_chart},
+    hot_size=int(os.environ.get('PREFETCH_HOT_SIZE', '50')),
+    budget_per_minute=float(os.environ.get('PREFETCH_BUDGET_PER_MIN', '600')),
+    max_concurrency=int(os.environ.get('PREFETCH_CONCURRENCY', '4')),
+)
+
+# Fast lane: patch prices from CLOB's batch /prices between full refreshes (0 disables)
+PRICE_REFRESH_INTERVAL = float(os.environ.get('PRICE_REFRESH_INTERVAL', '3'))
+PRICE_BATCH_SIZE = int(os.environ.get('PRICE_BATCH_SIZE', '100'))
+PRICE_BATCH_CONCURRENCY = 4
+
+async def refresh_live_prices() -> int:
+    """Fetch live prices for every token in the snapshot and patch them in, bumping its version"""
+    snapshot = markets_cache["snapshot"]
+    if snapshot is None:
+        return 0
+    token_ids = snapshot.token_ids()
+    batches = [token_ids[i:i + PRICE_BATCH_SIZE] for i in range(0, len(token_ids), PRICE_BATCH_SIZE)]
+    semaphore = asyncio.Semaphore(PRICE_BATCH_CONCURRENCY)
+
+    async def fetch_batch(batch):
+        async with semaphore:
+            return await asyncio.to_thread(get_market_service().get_live_prices, batch)
+
+    prices = {}
+    for batch_prices in await asyncio.gather(*(fetch_batch(batch) for batch in batches)):
+        prices.update(batch_prices)
+    if markets_cache["snapshot"] is not snapshot:
+        return 0  # A full refresh landed meanwhile; its prices are at least as fresh
+    changed = snapshot.apply_prices(prices, markets_cache["version"] + 1)
+    if changed:
+        markets_cache["version"] = snapshot.version
+        if shared_snapshot is not None and shared_snapshot.is_refresher:
+            shared_publisher.schedule()
+    return changed
+
+async def price_refresh_loop():
+    """Keep snapshot prices within a few seconds of CLOB at a fraction of a full refresh's cost"""
+    while True:
+        await asyncio.sleep(PRICE_REFRESH_INTERVAL)
+        if not is_refresher() or not markets_cache["live"]:
+            continue  # Followers receive patched snapshots through their version sync
+        try:
+            changed = await refresh_live_prices()
+            if changed:
+                logging.info(f"Patched {changed} live prices (snapshot v{markets_cache['version']})")
+        except Exception as e:
+            logging.error(f"Live price refresh failed: {e}")
+
+# Max upstream calls in flight when fetching every outcome of one market
+OUTCOME_FANOUT_CONCURRENCY = int(os.environ.get('OUTCOME_FANOUT_CONCURRENCY', '8'))
+
 # Create the main app without a prefix
 app = FastAPI()
 
+# Time budget per request (a client may ask for less or more, up to the cap, via X-Request-Timeout)
+REQUEST_DEADLINE_SECONDS = float(os.environ.get('REQUEST_DEADLINE_SECONDS', '20'))
+MAX_REQUEST_DEADLINE_SECONDS = 60.0
+
+@app.middleware("http")
+async def request_deadline(request, call_next):
+    """Attach the request's deadline so downstream timeouts shrink to what is left"""
+    budget = REQUEST_DEADLINE_SECONDS
+    requested = request.headers.get(DEADLINE_HEADER)
+    if requested:
+        try:
+            budget = min(max(float(requested), 0.1), MAX_REQUEST_DEADLINE_SECONDS)
+        except ValueError:
+            pass
+    token = set_deadline(budget)
+    try:
+        return await call_next(request)
+    finally:
+        reset_deadline(token)
+
+@app.middleware("http")
+async def record_request_metrics(request, call_next):
+    """Latency per route template (not raw path, so ids don't explode the label set) and status"""
+    started = time.perf_counter()
+    status = "500"
+    try:
+        response = await call_next(request)
+        status = str(response.status_code)
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_DURATION.observe(
+            time.perf_counter() - started, request.method, getattr(route, "path", "unmatched"), status
+        )
+
+# On-demand sampling profiler; idle (no thread) unless an admin starts a session
+profiler = Profiler()
+PROFILE_HEADER = "X-Profile"
+
+# Stalls of the event loop longer than this are captured with the stack that caused them
+LOOP_BLOCK_THRESHOLD_MS = float(os.environ.get('LOOP_BLOCK_THRESHOLD_MS', '100'))
+loop_watchdog = LoopWatchdog(threshold=LOOP_BLOCK_THRESHOLD_MS / 1000)
+
+@app.middleware("http")
+async def profile_flagged_requests(request, call_next):
+    """
+    Profile a request sent with X-Profile and a valid X-Admin-Token; others pass straight through.
+    A numeric X-Profile value (up to 100) also traces allocations and keeps that many top sites.
+    """
+    if PROFILE_HEADER not in request.headers or not is_admin_token(request.headers.get("X-Admin-Token")):
+        return await call_next(request)
+    value = request.headers[PROFILE_HEADER].strip() or "0"
+    if not value.isdecimal() or int(value) > 100:
+        # Middleware runs outside FastAPI's exception handlers, so answer directly
+        return JSONResponse({"detail": f"{PROFILE_HEADER} must be empty or a number of allocation sites from 0 to 100"},
+                            status_code=400)
+    try:
+        session = profiler.start("request", memory_top=int(value), label=f"{request.method} {request.url.path}")
+    except ProfilerBusy:
+        # Serve the request unprofiled rather than failing it
+        logger.info(f"Skipping profile of {request.method} {request.url.path}: another session is running")
+        return await call_next(request)
+    try:
+        response = await call_next(request)
+    finally:
+        profiler.stop()
+    response.headers["X-Profile-Id"] = str(session.id)
+    return response
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus scrape endpoint"""
+    return Response(metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+@metrics_registry.collector
+def collect_cache_metrics():
+    """Cache and snapshot state, read from the caches' own stats at scrape time"""
+    caches = {
+        "orderbook": orderbook_cache.stats(),
+        **{f"chart:{interval}": stats for interval, stats in price_history_cache.stats()["intervals"].items()},
+        "chart_range": price_range_cache.stats(),
+    }
+    families = [
+        (metric, kind, help, [({"cache": name}, stats[field]) for name, stats in caches.items() if field in stats])
+        for metric, field, kind, help in (
+            ("cache_hits_total", "hits", "counter", "Lookups answered from the cache"),
+            ("cache_misses_total", "misses", "counter", "Lookups that started an upstream load"),
+            ("cache_partial_hits_total", "partial_hits", "counter", "Range lookups that fetched only the missing gaps"),
+            ("cache_coalesced_total", "coalesced", "counter", "Lookups that joined a load already in flight"),
+            ("cache_evictions_total", "evictions", "counter", "Entries dropped by the LRU bound"),
+            ("cache_entries", "entries", "gauge", "Entries currently cached"),
+        )
+    ]
+    if markets_cache["snapshot"] is not None:
+        families += [
+            ("markets_snapshot_age_seconds", "gauge", "Age of the served market snapshot", [({}, snapshot_age())]),
+            ("markets_snapshot_version", "gauge", "Version of the served market snapshot", [({}, markets_cache["version"])]),
+            ("markets_snapshot_markets", "gauge", "Markets in the served snapshot", [({}, len(markets_cache["snapshot"]))]),
+            ("markets_snapshot_live", "gauge", "1 once a live refresh replaced the snapshot restored from disk",
+             [({}, 1 if markets_cache["live"] else 0)]),
+        ]
+    return families
+
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
@@ -102,57 +643,31 @@ async def root():
 @api_router.get("/analytics")
 async def get_analytics(timeframe: str = Query("24h", regex="^(24h|7d|30d)$")):
     """Get market analytics and statistics"""
-    try:
-        # Get all markets from cache or fresh
-        markets = market_service.get_trending_markets(limit=300)
-        
-        # Calculate total volume and liquidity
-        total_volume = sum(m.get('volume', 0) for m in markets)
-        total_liquidity = sum(m.get('liquidity', 0) for m in markets)
-        total_markets = len(markets)
-        avg_market_size = total_volume / total_markets if total_markets > 0 else 0
+    async with route_limiters["analytics"].slot():
+        try:
+            # Aggregates, top-K and category breakdown are vectorized over the snapshot columns
+            snapshot = await get_market_snapshot()
+            stats = snapshot.analytics()
         
-        # Sort by volume and liquidity
-        top_by_volume = sorted(markets, key=lambda x: x.get('volume', 0), reverse=True)[:10]
-        top_by_liquidity = sorted(markets, key=lambda x: x.get('liquidity', 0), reverse=True)[:10]
+            # Mock change data (would need historical data for real calculation)
+            volume_change = 12.5  # Placeholder
+            new_markets = 15  # Placeholder
         
-        # Category breakdown
-        category_stats = {}
-        for market in markets:
-            cat = market.get('category', 'Other')
-            if cat not in category_stats:
-                category_stats[cat] = {'count': 0, 'totalVolume': 0}
-            category_stats[cat]['count'] += 1
-            category_stats[cat]['totalVolume'] += market.get('volume', 0)
-        
-        category_breakdown = [
-            {
-                'category': cat,
-                'count': stats['count'],
-                'totalVolume': stats['totalVolume']
+            return {
+                "totalVolume": stats["totalVolume"],
+                "totalLiquidity": stats["totalLiquidity"],
+                "totalMarkets": stats["totalMarkets"],
+                "avgMarketSize": stats["avgMarketSize"],
+                "volumeChange": volume_change,
+                "newMarkets": new_markets,
+                "topByVolume": stats["topByVolume"],
+                "topByLiquidity": stats["topByLiquidity"],
+                "categoryBreakdown": stats["categoryBreakdown"],
+                "timeframe": timeframe
             }
-            for cat, stats in sorted(category_stats.items(), key=lambda x: x[1]['totalVolume'], reverse=True)
-        ]
-        
-        # Mock change data (would need historical data for real calculation)
-        volume_change = 12.5  # Placeholder
-        new_markets = 15  # Placeholder
-        
-        return {
-            "totalVolume": total_volume,
-            "totalLiquidity": total_liquidity,
-            "totalMarkets": total_markets,
-            "avgMarketSize": avg_market_size,
-            "volumeChange": volume_change,
-            "newMarkets": new_markets,
-            "topByVolume": top_by_volume,
-            "topByLiquidity": top_by_liquidity,
-            "categoryBreakdown": category_breakdown,
-            "timeframe": timeframe
-        }
-    except Exception as e:
-        logging.error(f"Error getting analytics: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        except Exception as e:
+            logging.error(f"Error getting analytics: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/markets")
 async def get_markets(limit: int = Query(150, ge=1, le=300)):
@@ -161,41 +676,48 @@ async def get_markets(limit: int = Query(150, ge=1, le=300)):
         # Check cache first
         current_time = datetime.now()
         
-        if markets_cache["data"] is not None and markets_cache["timestamp"] is not None:
+        if markets_cache["snapshot"] is not None and markets_cache["timestamp"] is not None:
             cache_age = (current_time - markets_cache["timestamp"]).total_seconds()
             
-            if cache_age < markets_cache["cache_duration"]:
-                logging.info(f"Returning cached markets (age: {cache_age:.1f}s)")
-                cached_markets = markets_cache["data"][:limit]  # Apply limit
+            if not markets_cache["live"]:
+                # Restored from disk at boot; served until the first live refresh lands
+                MARKETS_CACHE_REQUESTS.inc("stale")
+                stale_markets = markets_cache["snapshot"].head(limit)
+                return {"markets": stale_markets, "count": len(stale_markets), "cached": True, "stale": True}
+            
+            if cache_age < markets_cache["cache_duration"] or not is_refresher():
+                MARKETS_CACHE_REQUESTS.inc("hit")
+                logging.debug(f"Returning cached markets (age: {cache_age:.1f}s)")
+                cached_markets = markets_cache["snapshot"].head(limit)  # Apply limit
                 return {"markets": cached_markets, "count": len(cached_markets), "cached": True}
         
         # Cache miss or expired - fetch fresh data
+        MARKETS_CACHE_REQUESTS.inc("miss")
         logging.info("Cache miss or expired - fetching fresh markets from Polymarket")
-        markets = market_service.get_trending_markets(limit=300)  # Fetch max, cache it
-        
-        # Update cache
-        markets_cache["data"] = markets
-        markets_cache["timestamp"] = current_time
+        snapshot = await refresh_snapshot()
         
         # Return requested limit
-        return {"markets": markets[:limit], "count": len(markets[:limit]), "cached": False}
+        markets = snapshot.head(limit)
+        return {"markets": markets, "count": len(markets), "cached": False}
     except Exception as e:
         logging.error(f"Error fetching markets: {e}")
         # If error but cache exists, return stale cache
-        if markets_cache["data"] is not None:
+        if markets_cache["snapshot"] is not None:
             logging.warning("Returning stale cache due to error")
-            stale_markets = markets_cache["data"][:limit]
+            stale_markets = markets_cache["snapshot"].head(limit)
             return {"markets": stale_markets, "count": len(stale_markets), "cached": True, "stale": True}
-        raise HTTPException(status_code=500, detail="Failed to fetch markets")
+        raise HTTPException(status_code=503, detail="Markets temporarily unavailable", headers={"Retry-After": "5"})
 
 @api_router.get("/markets/{market_id}")
-async def get_market_details(market_id: str):
+async def get_market_details(market_id: str, market_service=Depends(get_market_service)):
     """Get detailed market information"""
     try:
         market = market_service.get_market_details(market_id)
         if not market:
             raise HTTPException(status_code=404, detail="Market not found")
         return market
+    except DeadlineExceeded:
+        raise HTTPException(status_code=504, detail="Market request timed out")
     except HTTPException:
         raise
     except Exception as e:
@@ -206,14 +728,15 @@ async def get_market_details(market_id: str):
 async def get_markets_by_category(category: str, limit: int = Query(100, ge=1, le=200)):
     """Get markets filtered by category"""
     try:
-        markets = market_service.get_markets_by_category(category, limit)
+        snapshot = await get_market_snapshot()
+        markets = snapshot.select(snapshot.mask(category=category), limit=limit)
         return markets
     except Exception as e:
         logging.error(f"Error fetching markets by category: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch markets by category")
 
 @api_router.get("/markets/trending/top")
-async def get_trending_markets(limit: int = Query(50, ge=1, le=100)):
+async def get_trending_markets(limit: int = Query(50, ge=1, le=100), market_service=Depends(get_market_service)):
     """Get top trending markets"""
     try:
         markets = market_service.get_trending_only(limit)
@@ -227,12 +750,14 @@ async def get_trending_markets(limit: int = Query(50, ge=1, le=100)):
 async def get_orderbook(token_id: str):
     """Get orderbook for a market token"""
     try:
-        orderbook = market_service.get_orderbook(token_id)
+        orderbook = await fetch_orderbook(token_id)
         if not orderbook:
             raise HTTPException(status_code=404, detail="Orderbook not found")
         return orderbook
     except HTTPException:
         raise
+    except DeadlineExceeded:
+        raise HTTPException(status_code=504, detail="Orderbook request timed out")
     except Exception as e:
         logging.error(f"Error fetching orderbook: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch orderbook")
@@ -242,8 +767,8 @@ async def get_orderbook(token_id: str):
 async def get_market_orderbook(market_id: str, token_id: str = Query(...)):
     """Get live orderbook for a market"""
     try:
-        logging.info(f"Fetching orderbook for market_id={market_id}, token_id={token_id}")
-        orderbook = market_service.get_orderbook(token_id)
+        logging.debug(f"Fetching orderbook for market_id={market_id}, token_id={token_id}")
+        orderbook = await fetch_orderbook(token_id)
         if not orderbook:
             logging.warning(f"No orderbook data found for token_id={token_id}")
             raise HTTPException(status_code=404, detail="Orderbook not found")
@@ -251,49 +776,201 @@ async def get_market_orderbook(market_id: str, token_id: str = Query(...)):
         # Log orderbook stats
         bids_count = len(orderbook.get('bids', []))
         asks_count = len(orderbook.get('asks', []))
-        logging.info(f"Orderbook fetched: {bids_count} bids, {asks_count} asks")
+        logging.debug(f"Orderbook fetched: {bids_count} bids, {asks_count} asks")
         return orderbook
     except HTTPException:
         raise
+    except DeadlineExceeded:
+        raise HTTPException(status_code=504, detail="Orderbook request timed out")
     except Exception as e:
         logging.error(f"Error fetching orderbook: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to fetch orderbook")
 
 @api_router.get("/markets/{market_id}/chart")
-async def get_market_chart(market_id: str, token_id: str = Query(...), interval: str = Query("1h")):
+async def get_market_chart(
+    market_id: str,
+    token_id: str = Query(...),
+    interval: str = Query("1h"),
+    since: Optional[int] = Query(None, description="Only return points newer than this unix timestamp"),
+    start_ts: Optional[int] = Query(None, ge=0, description="Range start (unix seconds); overrides interval"),
+    end_ts: Optional[int] = Query(None, ge=0, description="Range end (unix seconds), defaults to now"),
+    fidelity: int = Query(60, ge=1, le=10080, description="Resolution in minutes for range queries")
+):
     """Get price chart data for a market"""
     try:
-        logging.info(f"Fetching chart data for token_id={token_id}, interval={interval}")
-        chart_data = market_service.get_price_chart_data(token_id, interval)
-        logging.info(f"Chart data fetched successfully: {len(chart_data)} data points")
+        check_chart_interval(interval)
+        logging.debug(f"Fetching chart data for token_id={token_id}, interval={interval}")
+        prefetcher.record(token_id)
+        if start_ts is not None:
+            end_ts = end_ts if end_ts is not None else int(datetime.now(timezone.utc).timestamp())
+            if end_ts <= start_ts:
+                raise HTTPException(status_code=400, detail="end_ts must be after start_ts")
+            if price_range_cache.max_chunks_exceeded(start_ts, end_ts, fidelity):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Range too long for fidelity={fidelity}; at most "
+                           f"{price_range_cache.max_chunks * price_range_cache.max_points_per_request} points per query"
+                )
+            chart_data = await price_range_cache.get(token_id, start_ts, end_ts, fidelity)
+        else:
+            chart_data = await price_history_cache.get(token_id, interval, since=since)
+        logging.debug(f"Chart data fetched successfully: {len(chart_data)} data points")
         return {"data": chart_data}
+    except HTTPException:
+        raise
+    except DeadlineExceeded:
+        raise HTTPException(status_code=504, detail="Chart request timed out")
     except Exception as e:
         logging.error(f"Error fetching chart data: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch chart data")
 
+@api_router.get("/markets/{market_id}/outcomes/books")
+async def get_outcome_books(market_id: str):
+    """Orderbooks for every outcome of a market, fetched concurrently, plus a consolidated ranking"""
+    market = (await snapshot_for_request()).get(market_id)
+    if not market:
+        raise HTTPException(status_code=404, detail="Market not found")
+    
+    results = await fan_out(market_outcomes(market), fetch_orderbook, OUTCOME_FANOUT_CONCURRENCY)
+    consolidated = rank_outcomes(results)
+    outcomes = []
+    for result in results:
+        book = result.pop('data')
+        outcomes.append({**result, 'book': book, **summarize_book(book)})
+    return {
+        "market_id": market_id,
+        "outcomes": outcomes,
+        "consolidated": consolidated,
+        "errors": sum(1 for r in outcomes if r['error']),
+        # Outcomes the request's deadline cut off are reported as errors; the rest stand
+        "degraded": any(r['timed_out'] for r in outcomes)
+    }
+
+@api_router.get("/markets/{market_id}/outcomes/charts")
+async def get_outcome_charts(market_id: str, interval: str = Query("1h")):
+    """Price charts for every outcome of a market, fetched concurrently"""
+    check_chart_interval(interval)
+    market = (await snapshot_for_request()).get(market_id)
+    if not market:
+        raise HTTPException(status_code=404, detail="Market not found")
+    
+    results = await fan_out(
+        market_outcomes(market),
+        lambda token_id: price_history_cache.get(token_id, interval),
+        OUTCOME_FANOUT_CONCURRENCY
+    )
+    return {
+        "market_id": market_id,
+        "interval": interval,
+        "outcomes": [{**r, 'data': r['data'] or []} for r in results],
+        "errors": sum(1 for r in results if r['error']),
+        "degraded": any(r['timed_out'] for r in results)
+    }
+
+@api_router.get("/cache/stats")
+async def get_cache_stats():
+    """Hit, miss and coalescing counters of the upstream response caches"""
+    return {
+        "orderbook": orderbook_cache.stats(),
+        "chart": price_history_cache.stats(),
+        "chart_range": price_range_cache.stats()
+    }
+
+@api_router.get("/prefetch/stats")
+async def get_prefetch_stats():
+    """Hot set and budget usage of the background prefetcher"""
+    return prefetcher.stats()
+
+@api_router.get("/upstream/stats")
+async def get_upstream_stats(market_service=Depends(get_market_service)):
+    """Circuit breaker, rate limiter and retry budget state per Polymarket host"""
+    return market_service.client.guard_stats()
+
+@api_router.get("/limits/stats")
+async def get_limit_stats():
+    """Active, queued and shed counts of each route class limiter"""
+    return {name: limiter.stats() for name, limiter in route_limiters.items()}
+
+@api_router.get("/refresh/stats")
+async def get_refresh_stats():
+    """Per-stage throughput and queue depth of the market refresh pipeline"""
+    return {
+        **refresh_pipeline.stats(),
+        "pooled": pooled_refresh_pipeline.stats(),
+        "transform_pool": transform_pool.stats()
+    }
+
+@api_router.post("/admin/profile", dependencies=[Depends(require_admin)])
+async def run_profile(
+    seconds: float = Query(10.0, gt=0, le=120),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+    memory_top: int = Query(0, ge=0, le=100)
+):
+    """Sample every thread for `seconds`, optionally tracing allocations, and return the summary"""
+    try:
+        session = await profiler.profile_window(seconds, interval_ms / 1000, memory_top)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return session.summary()
+
+@api_router.get("/admin/profile", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    """Recent profiling sessions, newest first"""
+    return {
+        "active": profiler.active,
+        "sessions": [
+            {"id": s.id, "trigger": s.trigger, "label": s.label, "started_at": s.started_at,
+             "duration_s": round(s.duration, 3), "samples": s.samples}
+            for s in reversed(profiler.sessions)
+        ]
+    }
+
+@api_router.get("/admin/profile/{session_id}", dependencies=[Depends(require_admin)])
+async def get_profile(session_id: int, format: str = Query("json", pattern="^(json|collapsed)$"), top: int = 25):
+    """A session's summary, or its collapsed stacks for flamegraph.pl / speedscope"""
+    session = profiler.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "collapsed":
+        return Response(session.collapsed(), media_type="text/plain")
+    return session.summary(top)
+
+@api_router.get("/admin/loop", dependencies=[Depends(require_admin)])
+async def get_loop_stalls(top: int = Query(10, ge=1, le=100)):
+    """Event loop stalls over the threshold, worst call paths first, with the stack that blocked"""
+    return loop_watchdog.stats(top)
+
 @api_router.get("/markets/{market_id}/insights")
-async def get_market_insights(market_id: str, market_title: str = Query(...), category: str = Query("Politics")):
+async def get_market_insights(
+    market_id: str,
+    market_title: str = Query(...),
+    category: str = Query("Politics"),
+    insights_service=Depends(insights_service_provider)
+):
     """Get AI-powered insights and tips for a market"""
-    try:
-        logging.info(f"Generating insights for market: {market_title}")
+    async with route_limiters["insights"].slot():
+        try:
+            logging.info(f"Generating insights for market: {market_title}")
         
-        # Get market data to include outcomes
-        markets = market_service.get_trending_markets(200)
-        market_data = next((m for m in markets if m['id'] == market_id), None)
+            # Get market data to include outcomes; without a snapshot, insights go on from the title alone
+            try:
+                market_data = (await snapshot_for_request()).get(market_id)
+            except HTTPException:
+                market_data = None
         
-        outcomes = market_data.get('outcomes', []) if market_data and market_data.get('is_multi_outcome') else None
+            outcomes = market_data.get('outcomes', []) if market_data and market_data.get('is_multi_outcome') else None
         
-        # Generate insights using AI
-        insights = await insights_service.get_market_insights(
-            market_title=market_title,
-            market_category=category,
-            outcomes=outcomes
-        )
+            # Generate insights using AI
+            insights = await insights_service.get_market_insights(
+                market_title=market_title,
+                market_category=category,
+                outcomes=outcomes
+            )
         
-        return insights
-    except Exception as e:
-        logging.error(f"Error generating insights: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Failed to generate insights")
+            return insights
+        except Exception as e:
+            logging.error(f"Error generating insights: {e}", exc_info=True)
+            raise HTTPException(status_code=500, detail="Failed to generate insights")
 
 @api_router.post("/positions")
 async def create_position(position: Position):
@@ -368,7 +1045,8 @@ async def close_position(position_id: str):
 async def close_position_with_refund(
     position_id: str = Query(...),
     wallet_address: str = Query(...),
-    amount_sol: float = Query(...)
+    amount_sol: float = Query(...),
+    solana_service=Depends(solana_service_provider)
 ):
     """
     Close position and send SOL refund back to user
@@ -445,19 +1123,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging: rate-limited per call site and written by a background thread
+configure_logging(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 @app.on_event("startup")
 async def startup_db_client():
     logging.info("Starting up...")
-    # Pre-warm the cache on startup
+    # Serve the last persisted snapshot immediately, then pre-warm the cache
+    if shared_snapshot is None or not sync_shared_snapshot():
+        load_persisted_snapshot()
     asyncio.create_task(warm_cache())
+    asyncio.create_task(prefetcher.run())
+    loop_watchdog.set_routes(app.routes)
+    asyncio.create_task(loop_watchdog.run())
+    if PRICE_REFRESH_INTERVAL > 0:
+        asyncio.create_task(price_refresh_loop())
+    if shared_snapshot is not None or leader_election is not None:
+        asyncio.create_task(snapshot_sync_loop())
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await shared_publisher.drain()
+    await snapshot_persister.drain()  # Never race a background write of the same file
+    if is_refresher():
+        await asyncio.to_thread(persist_snapshot)
+    if shared_snapshot is not None:
+        shared_snapshot.release_refresher()
+    if leader_election is not None:
+        await leader_election.release()
+    transform_pool.shutdown()
+    upstream_executor.shutdown(wait=False)
+    hedger = get_market_service().client.hedger
+    if hedger is not None:
+        hedger.shutdown()
     client.close()
\ No newline at end of file
@@ -0,0 +1,134 @@
+"""
+Snapshot Leader Election - one backend node refreshes markets from Polymarket,
+the others pull its published snapshot from MongoDB.
+
+Leadership is a lease document in `snapshot_leases`; the leader renews it
+periodically and any node may take it over once it expires. The leader stores
+the zlib-compressed serialized snapshot in `market_snapshots`, and followers
+poll that collection for a newer version.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from bson import Binary
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from market_snapshot import MarketSnapshot
+
+logger = logging.getLogger(__name__)
+
+LEASE_ID = "markets_refresher"
+SNAPSHOT_ID = "markets"
+
+
+class SnapshotLeaderElection:
+    def __init__(self, db, lease_seconds: float = 30, poll_interval: float = 2):
+        self.leases = db.snapshot_leases
+        self.snapshots = db.market_snapshots
+        self.node_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.is_leader = False
+        self.published_version = 0
+        self.published_created_at = None  # Identifies the refresh the published version came from
+        self.published_at = 0.0
+        self._checked_at = 0.0
+
+    async def try_acquire_or_renew(self) -> bool:
+        """
+        Take or renew the lease. The leader renews every third of the lease;
+        followers retry at `poll_interval`, so an expired lease fails over quickly.
+        """
+        now_monotonic = time.monotonic()
+        interval = self.lease_seconds / 3 if self.is_leader else self.poll_interval
+        if now_monotonic - self._checked_at < interval:
+            return self.is_leader
+        self._checked_at = now_monotonic
+
+        now = datetime.now(timezone.utc)
+        was_leader = self.is_leader
+        try:
+            # Matches only if we already hold the lease or it has expired; otherwise
+            # the upsert collides with the live lease document's _id
+            lease = await self.leases.find_one_and_update(
+                {"_id": LEASE_ID, "$or": [{"holder": self.node_id}, {"expires_at": {"$lt": now}}]},
+                {"$set": {
+                    "holder": self.node_id,
+                    "expires_at": now + timedelta(seconds=self.lease_seconds),
+                    "renewed_at": now
+                }},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            self.is_leader = lease is not None and lease.get("holder") == self.node_id
+        except DuplicateKeyError:
+            self.is_leader = False
+
+        if self.is_leader != was_leader:
+            logger.info(f"Node {self.node_id} {'acquired' if self.is_leader else 'lost'} snapshot leadership")
+        return self.is_leader
+
+    async def release(self):
+        """Drop the lease on shutdown so a follower takes over without waiting for expiry"""
+        if self.is_leader:
+            await self.leases.delete_one({"_id": LEASE_ID, "holder": self.node_id})
+            self.is_leader = False
+
+    def publish_due(self, snapshot: MarketSnapshot, patch_interval: float) -> bool:
+        """
+        Whether `snapshot` should be published now: a new refresh right away, live price
+        patches of the already published one at most every `patch_interval` seconds.
+        """
+        if snapshot.version <= self.published_version:
+            return False
+        if snapshot.created_at != self.published_created_at:
+            return True
+        return time.monotonic() - self.published_at >= patch_interval
+
+    async def publish(self, snapshot: MarketSnapshot) -> bool:
+        """Store the compressed snapshot unless a newer version is already published"""
+        # Serializing and compressing a full snapshot takes long enough to stall the event loop
+        data = await asyncio.to_thread(lambda: zlib.compress(snapshot.to_bytes(), 6))
+        try:
+            # The version filter fences off a deposed leader publishing stale data
+            await self.snapshots.replace_one(
+                {"_id": SNAPSHOT_ID, "version": {"$lt": snapshot.version}},
+                {
+                    "_id": SNAPSHOT_ID,
+                    "version": snapshot.version,
+                    "created_at": snapshot.created_at,
+                    "holder": self.node_id,
+                    "data": Binary(data)
+                },
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Don't retry this version; the next poll adopts whatever is newer
+            self.published_version = snapshot.version
+            logger.warning(f"Skipped publishing snapshot v{snapshot.version}: a newer version exists")
+            return False
+        self.published_version = snapshot.version
+        self.published_created_at = snapshot.created_at
+        self.published_at = time.monotonic()
+        logger.info(f"Published snapshot v{snapshot.version} to MongoDB ({len(data)} bytes compressed)")
+        return True
+
+    async def load_if_newer(self, current_version: int) -> Optional[MarketSnapshot]:
+        """Fetch the published snapshot only if its version is newer than ours"""
+        doc = await self.snapshots.find_one({"_id": SNAPSHOT_ID, "version": {"$gt": current_version}})
+        if doc is None:
+            return None
+        # Already in MongoDB, so the leader must not try to republish it
+        if doc["version"] > self.published_version:
+            self.published_version = doc["version"]
+            self.published_created_at = doc.get("created_at")
+            self.published_at = time.monotonic()
+        return MarketSnapshot.from_buffer(zlib.decompress(doc["data"]))
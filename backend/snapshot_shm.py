@@ -0,0 +1,71 @@
+"""
+Shared Snapshot Store - one refresher process publishes the markets snapshot,
+every other uvicorn worker on the host maps it read-only.
+
+Enabled by setting SNAPSHOT_SHM_DIR (e.g. /dev/shm/polyfluid). The refresher
+role is held through an exclusive flock on a lock file, so when the refresher
+worker dies the OS releases the lock and another worker takes over.
+"""
+import fcntl
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+from market_snapshot import MarketSnapshot, map_snapshot_file, write_snapshot_file
+
+logger = logging.getLogger(__name__)
+
+
+class SharedSnapshotStore:
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.snapshot_path = self.directory / "markets.snapshot"
+        self.lock_path = self.directory / "refresher.lock"
+        self._lock_fd = None
+        self._last_stat = None
+
+    @property
+    def is_refresher(self) -> bool:
+        return self._lock_fd is not None
+
+    def try_acquire_refresher(self) -> bool:
+        """Become the single refresher for this host if nobody holds the role"""
+        if self._lock_fd is not None:
+            return True
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        logger.info(f"Process {os.getpid()} is now the shared snapshot refresher")
+        return True
+
+    def release_refresher(self):
+        if self._lock_fd is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def publish(self, snapshot: MarketSnapshot):
+        """Write the snapshot to a temp file and atomically rename it into place"""
+        write_snapshot_file(snapshot, self.snapshot_path)
+        logger.info(f"Published shared snapshot v{snapshot.version} ({len(snapshot)} markets)")
+
+    def load_if_newer(self, current_version: int) -> Optional[MarketSnapshot]:
+        """
+        Map the published snapshot if its version is newer than `current_version`.
+        A stat check short-circuits the common case where nothing was republished.
+        """
+        try:
+            st = os.stat(self.snapshot_path)
+        except FileNotFoundError:
+            return None
+        stat_key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if stat_key == self._last_stat:
+            return None
+        self._last_stat = stat_key
+        return map_snapshot_file(self.snapshot_path, newer_than=current_version)
@@ -0,0 +1,124 @@
+"""
+Transform Pool - decode, filter and transform /events pages in worker
+processes for large crawls, yielding the markets back in page order.
+
+Only the raw page bytes go to a worker and only the transformed markets come
+back (marshal-encoded, much cheaper than pickling dicts), so the event loop
+never parses or transforms the pages itself.
+"""
+import asyncio
+import logging
+import marshal
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_worker_service = None
+
+
+def _init_worker():
+    global _worker_service
+    from market_service import MarketService
+    _worker_service = MarketService()
+
+
+def _transform_page(page: bytes, now_ts: float) -> bytes:
+    current_time = datetime.fromtimestamp(now_ts, timezone.utc)
+    return marshal.dumps(_worker_service.transform_page(page, current_time))
+
+
+class TransformPool:
+    def __init__(self, max_workers: Optional[int] = None, min_batch_size: int = 2000):
+        """
+        Args:
+            max_workers: worker processes (default: CPU count, at most 4; 0 disables the pool)
+            min_batch_size: crawls of fewer events are transformed in-process
+        """
+        self.max_workers = min(os.cpu_count() or 1, 4) if max_workers is None else max_workers
+        self.min_batch_size = min_batch_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.pooled_pages = 0
+        self.pooled_markets = 0
+        self.inline_pages = 0
+        self.failures = 0
+
+    def should_offload(self, event_count: int) -> bool:
+        return self.max_workers > 0 and event_count >= self.min_batch_size
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn, not fork: the server process already runs threads (Mongo, asyncio.to_thread)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+            )
+        return self._executor
+
+    async def transform_pages(self, service, pages: AsyncIterator[bytes]) -> AsyncIterator[Dict]:
+        """
+        Pipeline stage: one page per worker task, up to max_workers pages in
+        flight, markets yielded in page order. Pages whose worker fails are
+        transformed in-process with `service.transform_page`.
+        """
+        current_time = datetime.now(timezone.utc)
+        loop = asyncio.get_running_loop()
+        in_flight = deque()
+        try:
+            async for page in pages:
+                in_flight.append((page, self._submit(loop, page, current_time)))
+                if len(in_flight) >= self.max_workers:
+                    for market in await self._collect(service, *in_flight.popleft(), current_time):
+                        yield market
+            while in_flight:
+                for market in await self._collect(service, *in_flight.popleft(), current_time):
+                    yield market
+        finally:
+            for _, future in in_flight:
+                if future is not None:
+                    future.cancel()
+
+    def _submit(self, loop, page: bytes, current_time: datetime) -> Optional[asyncio.Future]:
+        try:
+            return loop.run_in_executor(self._get_executor(), _transform_page, page, current_time.timestamp())
+        except (BrokenProcessPool, RuntimeError) as e:
+            logger.warning(f"Transform pool unavailable, transforming page in-process: {e}")
+            self.failures += 1
+            self.shutdown()
+            return None
+
+    async def _collect(self, service, page: bytes, future: Optional[asyncio.Future], current_time: datetime) -> List[Dict]:
+        if future is not None:
+            try:
+                markets = marshal.loads(await future)
+                self.pooled_pages += 1
+                self.pooled_markets += len(markets)
+                return markets
+            except BrokenProcessPool as e:
+                logger.warning(f"Transform pool broke, transforming page in-process: {e}")
+                self.failures += 1
+                self.shutdown()
+        self.inline_pages += 1
+        return service.transform_page(page, current_time)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict:
+        return {
+            "max_workers": self.max_workers,
+            "min_batch_size": self.min_batch_size,
+            "running": self._executor is not None,
+            "pooled_pages": self.pooled_pages,
+            "pooled_markets": self.pooled_markets,
+            "inline_pages": self.inline_pages,
+            "failures": self.failures,
+        }
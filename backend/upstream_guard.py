@@ -0,0 +1,328 @@
+"""
+Upstream Guard - per-host protection for Polymarket calls: a circuit breaker
+that fails fast while a host is down, an adaptive token-bucket rate limiter,
+and jittered retries bounded by a retry budget.
+
+Everything here is thread-safe: PolymarketClient is synchronous and is called
+from worker threads.
+"""
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+from deadline import DeadlineExceeded, remaining
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamError(Exception):
+    """A guarded call failed without reaching a usable response"""
+
+
+class CircuitOpenError(UpstreamError):
+    pass
+
+
+class RateLimitedError(UpstreamError):
+    pass
+
+
+class RetryableHTTPError(UpstreamError):
+    """5xx or 429 response; `retry_after` is the server's hint in seconds, if any"""
+
+    def __init__(self, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures; open fails
+    fast for `reset_timeout` seconds, then half-open lets one probe through.
+    The probe's outcome closes the circuit or re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half_open"
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == "closed":
+                return True
+            if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = "half_open"
+            if self._state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def reject_if_open(self) -> bool:
+        """Fail-fast check before queueing for a token: True, counted as a rejection, while fully open"""
+        with self._lock:
+            if self._state != "open" or time.monotonic() - self._opened_at >= self.reset_timeout:
+                return False
+            self.rejected += 1
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = "closed"
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                if self._state != "open":
+                    self.opened += 1
+                self._state = "open"
+                self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """Give back a half-open probe slot when the call ended without an upstream verdict"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def stats(self) -> Dict:
+        state = self.state
+        with self._lock:
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
+
+
+class TokenBucket:
+    """
+    Token bucket whose rate backs off multiplicatively on 429s and recovers
+    additively on successes (never above the configured rate).
+    """
+
+    def __init__(self, rate: float, burst: int, min_rate: float = 1.0):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min(min_rate, rate)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.throttled = 0
+
+    def acquire(self, max_wait: float) -> bool:
+        """Take a token, sleeping up to `max_wait` seconds for one; False if none comes in time"""
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            if now + wait > deadline:
+                self.throttled += 1
+                return False
+            time.sleep(wait)
+
+    def on_throttled(self, retry_after: Optional[float] = None):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = 0.0
+            if retry_after:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+
+    def on_success(self):
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 50)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "rate": round(self.rate, 2),
+                "max_rate": self.max_rate,
+                "burst": self.burst,
+                "throttled": self.throttled,
+            }
+
+
+class RetryBudget:
+    """
+    Retries may add at most `ratio` extra load over a sliding window (plus a
+    small floor so a quiet host can still retry), so a degraded upstream is
+    never hit with a retry storm.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 3, window: float = 10.0):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window
+        self._requests = deque()
+        self._retries = deque()
+        self._lock = threading.Lock()
+        self.exhausted = 0
+
+    def _trim(self, now: float):
+        for events in (self._requests, self._retries):
+            while events and now - events[0] > self.window:
+                events.popleft()
+
+    def record_request(self):
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            self._requests.append(now)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            if len(self._retries) >= self.min_retries + self.ratio * len(self._requests):
+                self.exhausted += 1
+                return False
+            self._retries.append(now)
+            return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._trim(time.monotonic())
+            return {
+                "requests_in_window": len(self._requests),
+                "retries_in_window": len(self._retries),
+                "exhausted": self.exhausted,
+            }
+
+
+class UpstreamGuard:
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: int,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        max_attempts: int = 3,
+        base_delay: float = 0.2,
+        max_delay: float = 2.0,
+        max_queue_wait: float = 2.0,
+        retry_ratio: float = 0.2,
+    ):
+        """
+        Args:
+            name: host label used in logs and stats
+            rate, burst: token bucket refill per second and capacity
+            failure_threshold, reset_timeout: circuit breaker settings
+            max_attempts: tries per call, first attempt included
+            base_delay, max_delay: full-jitter exponential backoff between tries
+            max_queue_wait: longest a call waits for a rate-limit token
+            retry_ratio: retry budget as a fraction of recent requests
+        """
+        self.name = name
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.limiter = TokenBucket(rate, burst)
+        self.budget = RetryBudget(retry_ratio)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_queue_wait = max_queue_wait
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.deadline_exceeded = 0
+
+    def call(self, attempt: Callable[[], object], retryable: tuple):
+        """
+        Run `attempt()` under the breaker, limiter and retry budget.
+
+        Exceptions in `retryable` count against the breaker and may be retried;
+        anything else (e.g. a 404) is passed straight through.
+        """
+        self.calls += 1
+        self.budget.record_request()
+        tries = 0
+        while True:
+            # Check before queueing for a token so open circuits fail fast
+            if self.breaker.reject_if_open():
+                self.failures += 1
+                raise CircuitOpenError(f"{self.name} circuit open")
+            left = remaining()
+            if left is not None and left <= 0:
+                self.deadline_exceeded += 1
+                raise DeadlineExceeded(f"{self.name}: request deadline exceeded")
+            if not self.limiter.acquire(self.max_queue_wait if left is None else min(self.max_queue_wait, left)):
+                # Our own throttling, not an upstream failure: the breaker is left alone
+                self.failures += 1
+                raise RateLimitedError(f"{self.name} rate limit queue full")
+            if not self.breaker.allow():
+                self.failures += 1
+                raise CircuitOpenError(f"{self.name} circuit open")
+            tries += 1
+            try:
+                result = attempt()
+            except retryable as e:
+                retry_after = getattr(e, "retry_after", None)
+                if getattr(e, "status_code", None) == 429:
+                    # The host is up but wants less traffic: slow down rather than trip the breaker
+                    self.limiter.on_throttled(retry_after)
+                    self.breaker.record_success()
+                else:
+                    self.breaker.record_failure()
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (tries - 1)))
+                if retry_after:
+                    # Longer pauses are enforced by the limiter before the next try
+                    delay = max(delay, min(retry_after, self.max_delay))
+                left = remaining()
+                if tries >= self.max_attempts or (left is not None and left <= delay) or not self.budget.try_spend():
+                    self.failures += 1
+                    raise
+                self.retries += 1
+                time.sleep(delay)
+                continue
+            except DeadlineExceeded:
+                self.breaker.release_probe()
+                self.deadline_exceeded += 1
+                raise
+            except Exception:
+                # Not an availability problem (bad request, 404...): the host is up
+                self.breaker.record_success()
+                raise
+            self.breaker.record_success()
+            self.limiter.on_success()
+            return result
+
+    def stats(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "retries": self.retries,
+            "deadline_exceeded": self.deadline_exceeded,
+            "breaker": self.breaker.stats(),
+            "rate_limiter": self.limiter.stats(),
+            "retry_budget": self.budget.stats(),
+        }
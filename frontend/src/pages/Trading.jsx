@@ -10,6 +10,15 @@ import { Tabs, TabsContent, TabsList, TabsTrigger } from '../components/ui/tabs'
 import { toast } from '../hooks/use-toast';
 import { useWallet } from '../contexts/WalletContext';
 
+// Chart window per interval in seconds, matching the backend's INTERVAL_SECONDS ('max' is unbounded)
+const CHART_INTERVAL_SECONDS = {
+  '1h': 3600,
+  '6h': 6 * 3600,
+  '1d': 86400,
+  '1w': 7 * 86400,
+  '1m': 30 * 86400,
+};
+
 const Trading = () => {
   const location = useLocation();
   const { isConnected, connect, signAndSendTransaction, publicKey } = useWallet();
@@ -83,18 +92,37 @@ const Trading = () => {
 
   // Fetch live chart data when outcome changes
   useEffect(() => {
+    // After the first load, only ask for points newer than the last one we have
+    let lastTimestamp = null;
     const fetchChartData = async () => {
       if (selectedOutcome?.token_id && selectedOutcome?.market_id) {
         try {
           const data = await marketService.getChartData(
             selectedOutcome.market_id, 
             selectedOutcome.token_id, 
-            chartInterval
+            chartInterval,
+            lastTimestamp
           );
-          setChartData(data || []);
+          const points = data || [];
+          if (lastTimestamp === null) {
+            setChartData(points);
+          } else if (points.length > 0) {
+            // Keep only the selected interval's window, as the server-side cache does
+            const windowSeconds = CHART_INTERVAL_SECONDS[chartInterval];
+            const cutoff = windowSeconds ? Date.now() / 1000 - windowSeconds : null;
+            setChartData(prev => {
+              const merged = [...prev, ...points];
+              return cutoff === null ? merged : merged.filter(point => point.timestamp >= cutoff);
+            });
+          }
+          if (points.length > 0) {
+            lastTimestamp = points[points.length - 1].timestamp;
+          }
         } catch (error) {
           console.error('Error fetching chart data:', error);
-          setChartData([]);
+          if (lastTimestamp === null) {
+            setChartData([]);
+          }
         }
       }
     };
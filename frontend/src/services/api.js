@@ -22,11 +22,11 @@ export const marketService = {
     return response.data;
   },
 
-  // Get price chart data
-  getChartData: async (marketId, tokenId, interval = '1h') => {
-    const response = await axios.get(`${API}/markets/${marketId}/chart`, { 
-      params: { token_id: tokenId, interval } 
-    });
+  // Get price chart data (pass `since` to fetch only points newer than that timestamp)
+  getChartData: async (marketId, tokenId, interval = '1h', since = null) => {
+    const params = { token_id: tokenId, interval };
+    if (since !== null) params.since = since;
+    const response = await axios.get(`${API}/markets/${marketId}/chart`, { params });
     return response.data.data;
   },
 };
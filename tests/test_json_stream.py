@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from json_stream import iter_json_array
+
+DOCUMENT = [
+    {"id": "1", "title": "Will \"X\" win?", "path": "C:\\markets\\1", "tags": ["a", "b"]},
+    {"id": "2", "title": "Élection présidentielle 🗳️ — 2028", "escaped": "\u00e9\u2603\n\t"},
+    12345,
+    -0.5e3,
+    "plain string with ] and , and { inside",
+    [1, [2, [3]], {}],
+    True,
+    None,
+]
+
+
+def split(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 100000])
+def test_chunk_boundaries_anywhere(size, ensure_ascii):
+    # Size 1 splits inside every string, escape sequence and multi-byte UTF-8 character
+    data = json.dumps(DOCUMENT, ensure_ascii=ensure_ascii, indent=1).encode("utf-8")
+    assert list(iter_json_array(split(data, size))) == DOCUMENT
+
+
+def test_number_split_across_chunks_is_not_cut_short():
+    assert list(iter_json_array([b"[12", b"34", b"5, 6", b"7]"])) == [12345, 67]
+
+
+def test_elements_are_yielded_before_the_stream_ends():
+    def chunks():
+        yield b'[{"a": 1}, '
+        yield b'{"b": 2}'
+        raise AssertionError("read past the second element")
+
+    stream = iter_json_array(chunks())
+    assert next(stream) == {"a": 1}
+    assert next(stream) == {"b": 2}
+
+
+@pytest.mark.parametrize("data", [b"[]", b"  [ \n ]  ", b"[\n]"])
+def test_empty_array(data):
+    assert list(iter_json_array(split(data, 1))) == []
+
+
+def test_empty_chunks_are_skipped():
+    assert list(iter_json_array([b"", b"[1,", b"", b"2]", b""])) == [1, 2]
+
+
+@pytest.mark.parametrize("data", [
+    b'[{"id": "1"}, {"id": "2"',
+    b'[{"id": "1"}, "unterminated',
+    b'[1, 2',
+    b'[',
+    b'',
+])
+def test_truncated_stream_raises(data):
+    with pytest.raises(ValueError):
+        list(iter_json_array(split(data, 3)))
+
+
+def test_multibyte_character_cut_at_end_raises():
+    data = '["é"]'.encode("utf-8")[:3]
+    with pytest.raises(ValueError):
+        list(iter_json_array([data]))
+
+
+def test_non_array_raises():
+    with pytest.raises(ValueError):
+        list(iter_json_array([b'{"id": 1}']))
@@ -0,0 +1,155 @@
+import asyncio
+
+import pytest
+
+from load_shedding import ConcurrencyLimiter, Overloaded, background_priority
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def settle():
+    # Let started tasks reach their await on the limiter
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_admits_up_to_limit_without_queueing():
+    async def scenario():
+        limiter = ConcurrencyLimiter("test", limit=2, max_queue=4)
+        await limiter.acquire()
+        await limiter.acquire()
+        assert limiter.active == 2 and limiter.queued == 0
+        limiter.release()
+        limiter.release()
+        assert limiter.active == 0
+
+    run(scenario())
+
+
+def test_interactive_waiters_are_admitted_before_background():
+    async def scenario():
+        limiter = ConcurrencyLimiter("test", limit=1, max_queue=4)
+        order = []
+        release = asyncio.Event()
+
+        async def holder():
+            async with limiter.slot():
+                await release.wait()
+
+        async def worker(name):
+            async with limiter.slot():
+                order.append(name)
+
+        async def background_worker(name):
+            with background_priority():
+                await worker(name)
+
+        tasks = [asyncio.create_task(holder())]
+        await settle()
+        tasks.append(asyncio.create_task(background_worker("background-1")))
+        await settle()
+        tasks.append(asyncio.create_task(worker("interactive-1")))
+        await settle()
+        tasks.append(asyncio.create_task(background_worker("background-2")))
+        await settle()
+        tasks.append(asyncio.create_task(worker("interactive-2")))
+        await settle()
+        assert limiter.stats()["waiting"] == 4
+
+        release.set()
+        await asyncio.gather(*tasks)
+        return order, limiter
+
+    order, limiter = run(scenario())
+    assert order == ["interactive-1", "interactive-2", "background-1", "background-2"]
+    assert limiter.active == 0
+
+
+def test_full_queue_sheds_with_503_and_retry_after():
+    async def scenario():
+        limiter = ConcurrencyLimiter("test", limit=1, max_queue=1)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await settle()
+        with pytest.raises(Overloaded) as shed:
+            await limiter.acquire()
+        limiter.release()  # Hands the slot to the queued waiter
+        await waiter
+        limiter.release()
+        return shed.value, limiter
+
+    error, limiter = run(scenario())
+    assert error.status_code == 503
+    assert int(error.headers["Retry-After"]) >= 1
+    assert limiter.shed == {"queue_full": 1}
+    assert limiter.active == 0
+
+
+def test_interactive_arrival_displaces_background_waiter():
+    async def scenario():
+        limiter = ConcurrencyLimiter("test", limit=1, max_queue=1)
+        await limiter.acquire()
+        with background_priority():
+            background = asyncio.create_task(limiter.acquire())
+        await settle()
+        interactive = asyncio.create_task(limiter.acquire())
+        await settle()
+        with pytest.raises(Overloaded):
+            await background
+        limiter.release()
+        await interactive
+        limiter.release()
+        return limiter
+
+    limiter = run(scenario())
+    assert limiter.shed == {"displaced": 1}
+    assert limiter.active == 0
+
+
+def test_queue_timeout_sheds():
+    async def scenario():
+        limiter = ConcurrencyLimiter("test", limit=1, max_queue=4, queue_timeout=0.01)
+        await limiter.acquire()
+        with pytest.raises(Overloaded):
+            await limiter.acquire()
+        limiter.release()
+        return limiter
+
+    limiter = run(scenario())
+    assert limiter.shed == {"queue_timeout": 1}
+    assert limiter.stats()["waiting"] == 0 and limiter.active == 0
+
+
+def test_slot_is_released_when_the_block_raises():
+    async def scenario():
+        limiter = ConcurrencyLimiter("test", limit=1, max_queue=1)
+        with pytest.raises(RuntimeError):
+            async with limiter.slot():
+                raise RuntimeError("handler failed")
+        assert limiter.active == 0
+        # The freed slot is admitted straight away, without queueing
+        async with limiter.slot():
+            assert limiter.active == 1
+        return limiter
+
+    limiter = run(scenario())
+    assert limiter.active == 0 and limiter.queued == 0
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        limiter = ConcurrencyLimiter("test", limit=1, max_queue=4)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await settle()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert limiter.stats()["waiting"] == 0
+        limiter.release()
+        return limiter
+
+    limiter = run(scenario())
+    assert limiter.active == 0
@@ -0,0 +1,85 @@
+import struct
+
+import numpy as np
+import pytest
+
+from market_snapshot import SNAPSHOT_MAGIC, MarketSnapshot, map_snapshot_file, write_snapshot_file
+
+
+def make_markets():
+    return [
+        {"id": "m1", "yesPrice": 0.4, "noPrice": 0.6, "volume": 100.0, "liquidity": 10.0,
+         "endDate": "2030-01-01T00:00:00Z", "category": "Politics", "change24h": 1.5,
+         "clobTokenIds": ["y1", "n1"]},
+        {"id": "m2", "is_multi_outcome": True, "volume": 250.0, "liquidity": 20.0,
+         "endDate": "2030-06-30", "category": "Sports",
+         "outcomes": [{"name": "A", "price": 0.2, "token_id": "a"},
+                      {"name": "B", "price": 0.7, "token_id": "b"},
+                      {"name": "C", "price": 0.1, "token_id": "c"}]},
+        {"id": "m3", "yesPrice": 0.9, "volume": 5.0, "category": "Unknown"},
+    ]
+
+
+def test_round_trip_keeps_columns_markets_and_outcomes():
+    original = MarketSnapshot(make_markets(), version=7, created_at=1234.5)
+    restored = MarketSnapshot.from_buffer(original.to_bytes())
+
+    assert restored.version == 7
+    assert restored.created_at == 1234.5
+    assert restored.markets == original.markets
+    assert list(restored.ids) == ["m1", "m2", "m3"]
+    for column in ("price", "volume", "liquidity", "end_ts", "change24h", "category_code",
+                   "outcome_offsets", "outcome_price"):
+        np.testing.assert_array_equal(getattr(restored, column), getattr(original, column))
+    assert list(restored.outcome_offsets) == [0, 0, 3, 3]
+    assert restored.price[1] == 0.7  # Leading outcome represents a multi-outcome market
+    assert restored.get("m2")["outcomes"][2]["name"] == "C"
+    assert restored.analytics() == original.analytics()
+
+
+def test_apply_prices_on_mapped_snapshot(tmp_path):
+    path = tmp_path / "snapshot.bin"
+    write_snapshot_file(MarketSnapshot(make_markets(), version=1), path)
+    snapshot = map_snapshot_file(path)
+
+    changed = snapshot.apply_prices({"b": 0.3, "c": 0.65, "y1": 0.4}, version=2)
+
+    assert changed == 2  # y1 is unchanged
+    assert snapshot.version == 2
+    assert snapshot.get("m2")["outcomes"][1]["price"] == 0.3
+    assert snapshot.price[1] == 0.65
+    assert list(snapshot.outcome_price) == [0.2, 0.3, 0.65]
+    assert map_snapshot_file(path, newer_than=1) is None
+
+
+def test_magic_mismatch_is_rejected():
+    buffer = bytearray(MarketSnapshot(make_markets(), version=1).to_bytes())
+    buffer[:len(SNAPSHOT_MAGIC)] = b"PFSNAP99"
+    with pytest.raises(ValueError):
+        MarketSnapshot.from_buffer(bytes(buffer))
+    with pytest.raises(ValueError):
+        MarketSnapshot.read_version(bytes(buffer))
+
+
+@pytest.mark.parametrize("keep", [0, 10, 47, -1])
+def test_truncated_buffer_raises_value_error(keep):
+    data = MarketSnapshot(make_markets(), version=1).to_bytes()
+    with pytest.raises(ValueError):
+        MarketSnapshot.from_buffer(data[:keep])
+
+
+def test_declared_sizes_larger_than_buffer_are_rejected():
+    data = bytearray(MarketSnapshot(make_markets(), version=1).to_bytes())
+    header = struct.Struct('<8sQdQQQ')
+    magic, version, created_at, rows, outcomes, json_len = header.unpack_from(data, 0)
+    header.pack_into(data, 0, magic, version, created_at, rows + 1000, outcomes, json_len)
+    with pytest.raises(ValueError):
+        MarketSnapshot.from_buffer(bytes(data))
+
+
+@pytest.mark.parametrize("size", [0, 20])
+def test_short_snapshot_file_raises_value_error(tmp_path, size):
+    path = tmp_path / "snapshot.bin"
+    path.write_bytes(MarketSnapshot(make_markets(), version=1).to_bytes()[:size])
+    with pytest.raises(ValueError):
+        map_snapshot_file(path)
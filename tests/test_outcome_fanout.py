@@ -0,0 +1,50 @@
+from market_service import MarketService
+from outcome_fanout import rank_outcomes, summarize_book
+
+
+class BookClient:
+    def __init__(self, books):
+        self.books = books
+
+    def get_orderbook(self, token_id):
+        return self.books[token_id]
+
+
+def clob_book(best_bid, best_ask, levels=15, tick=0.01, size=100.0):
+    """A book in CLOB order: bids ascending and asks descending, best price last"""
+    bids = [{"price": f"{best_bid - tick * i:.3f}", "size": f"{size + i}"} for i in range(levels)]
+    asks = [{"price": f"{best_ask + tick * i:.3f}", "size": f"{size + i}"} for i in range(levels)]
+    return {"bids": bids[::-1], "asks": asks[::-1], "timestamp": "1"}
+
+
+def service_for(books):
+    service = MarketService.__new__(MarketService)
+    service.client = BookClient(books)
+    return service
+
+
+def test_deep_book_keeps_best_levels_first():
+    book = service_for({"a": clob_book(0.60, 0.62)}).get_orderbook("a")
+
+    assert [b["price"] for b in book["bids"]] == [round(0.60 - 0.01 * i, 3) for i in range(10)]
+    assert [a["price"] for a in book["asks"]] == [round(0.62 + 0.01 * i, 3) for i in range(10)]
+    # Cumulative totals run outward from the top of the book
+    assert book["bids"][0]["total"] == 100.0
+    assert book["asks"][-1]["total"] == sum(100.0 + i for i in range(10))
+
+
+def test_summary_and_ranking_use_top_of_deep_books():
+    service = service_for({"a": clob_book(0.40, 0.45), "b": clob_book(0.55, 0.56)})
+    results = [
+        {"title": title, "token_id": token_id, "data": service.get_orderbook(token_id)}
+        for title, token_id in (("A", "a"), ("B", "b"))
+    ]
+
+    summary = summarize_book(results[0]["data"])
+    assert summary["bestBid"] == 0.40
+    assert summary["bestAsk"] == 0.45
+    assert summary["spread"] == 0.05
+    assert summary["bidDepth"] == sum(100.0 + i for i in range(10))
+
+    ranked = rank_outcomes(results)
+    assert [(r["token_id"], r["rank"]) for r in ranked] == [("b", 1), ("a", 2)]
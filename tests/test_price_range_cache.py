@@ -0,0 +1,203 @@
+import asyncio
+
+import pytest
+
+from price_history_cache import PriceRangeCache
+
+FIDELITY = 1  # minutes; one bucket every 60s
+STEP = FIDELITY * 60
+BASE = 1_599_999_960  # Bucket-aligned and far in the past, so every fetched bucket is cacheable
+
+
+class FakeUpstream:
+    def __init__(self, fail_ranges=(), listed_from=None):
+        self.calls = []
+        self.fail_ranges = list(fail_ranges)
+        self.listed_from = listed_from  # No points before this timestamp, as before a market existed
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, token_id, start_ts, end_ts, fidelity):
+        self.calls.append((start_ts, end_ts))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0)
+            if any(start_ts <= failed <= end_ts for failed in self.fail_ranges):
+                raise ConnectionError("upstream down")
+            first = max(start_ts + (-start_ts % STEP), self.listed_from or 0)
+            return [{"timestamp": ts, "price": ts % 100 / 100} for ts in range(first, end_ts + 1, STEP)]
+        finally:
+            self.in_flight -= 1
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def timestamps(points):
+    return [p["timestamp"] for p in points]
+
+
+def test_request_inside_cached_fragment_makes_no_upstream_call():
+    upstream = FakeUpstream()
+    cache = PriceRangeCache(upstream)
+
+    async def scenario():
+        await cache.get("t", BASE, BASE + 100 * STEP, FIDELITY)
+        calls = len(upstream.calls)
+        points = await cache.get("t", BASE + 10 * STEP, BASE + 20 * STEP, FIDELITY)
+        return calls, points
+
+    calls, points = run(scenario())
+    assert len(upstream.calls) == calls == 1
+    assert timestamps(points) == list(range(BASE + 10 * STEP, BASE + 20 * STEP + 1, STEP))
+    assert cache.stats()["hits"] == 1
+
+
+def test_overlapping_query_fetches_only_the_gap_and_merges():
+    upstream = FakeUpstream()
+    cache = PriceRangeCache(upstream)
+
+    async def scenario():
+        await cache.get("t", BASE, BASE + 50 * STEP, FIDELITY)
+        return await cache.get("t", BASE + 30 * STEP, BASE + 80 * STEP, FIDELITY)
+
+    points = run(scenario())
+    assert upstream.calls[1] == (BASE + 50 * STEP + 1, BASE + 80 * STEP)
+    assert timestamps(points) == list(range(BASE + 30 * STEP, BASE + 80 * STEP + 1, STEP))
+    stats = cache.stats()
+    assert stats["fragments"] == 1
+    assert stats["partial_hits"] == 1
+
+
+def test_adjacent_fragments_collapse_and_fill_a_middle_gap():
+    upstream = FakeUpstream()
+    cache = PriceRangeCache(upstream)
+
+    async def scenario():
+        await cache.get("t", BASE, BASE + 10 * STEP, FIDELITY)
+        await cache.get("t", BASE + 10 * STEP + 1, BASE + 20 * STEP, FIDELITY)  # Touches the first
+        await cache.get("t", BASE + 40 * STEP, BASE + 50 * STEP, FIDELITY)
+        assert cache.stats()["fragments"] == 2
+        return await cache.get("t", BASE, BASE + 50 * STEP, FIDELITY)
+
+    points = run(scenario())
+    assert upstream.calls[-1] == (BASE + 20 * STEP + 1, BASE + 40 * STEP - 1)
+    assert timestamps(points) == list(range(BASE, BASE + 50 * STEP + 1, STEP))
+    assert cache.stats()["fragments"] == 1
+
+
+def test_long_gap_is_chunked_with_bounded_concurrency():
+    upstream = FakeUpstream()
+    cache = PriceRangeCache(upstream, max_points_per_request=10, chunk_concurrency=2)
+
+    points = run(cache.get("t", BASE, BASE + 99 * STEP, FIDELITY))
+    assert len(upstream.calls) == 10
+    assert all(end - start < 10 * STEP for start, end in upstream.calls)
+    assert upstream.max_in_flight <= 2
+    assert len(points) == 100
+
+
+def test_max_chunks_exceeded():
+    cache = PriceRangeCache(FakeUpstream(), max_points_per_request=10, max_chunks=5)
+    assert not cache.max_chunks_exceeded(BASE, BASE + 50 * STEP - 1, FIDELITY)
+    assert cache.max_chunks_exceeded(BASE, BASE + 50 * STEP, FIDELITY)
+
+
+def test_partial_upstream_failure_returns_the_rest_and_refetches_the_gap():
+    failed_ts = BASE + 15 * STEP
+    upstream = FakeUpstream(fail_ranges=[failed_ts])
+    cache = PriceRangeCache(upstream, max_points_per_request=10)
+
+    async def scenario():
+        first = await cache.get("t", BASE, BASE + 29 * STEP, FIDELITY)
+        upstream.fail_ranges = []
+        upstream.calls.clear()
+        second = await cache.get("t", BASE, BASE + 29 * STEP, FIDELITY)
+        return first, second
+
+    first, second = run(scenario())
+    assert failed_ts not in timestamps(first)
+    assert len(first) == 20
+    assert upstream.calls == [(BASE + 10 * STEP, BASE + 20 * STEP - 1)]  # Only the failed chunk again
+    assert len(second) == 30
+
+
+def test_every_chunk_failing_raises():
+    cache = PriceRangeCache(FakeUpstream(fail_ranges=[BASE]))
+    with pytest.raises(ConnectionError):
+        run(cache.get("t", BASE, BASE + 10 * STEP, FIDELITY))
+
+
+def test_empty_range_is_cached_as_covered():
+    upstream = FakeUpstream(listed_from=BASE + 100 * STEP)
+    cache = PriceRangeCache(upstream)
+
+    async def scenario():
+        first = await cache.get("t", BASE, BASE + 50 * STEP, FIDELITY)
+        second = await cache.get("t", BASE + 10 * STEP, BASE + 20 * STEP, FIDELITY)
+        return first, second
+
+    assert run(scenario()) == ([], [])
+    assert len(upstream.calls) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_key_locks_are_dropped_once_unused():
+    cache = PriceRangeCache(FakeUpstream(fail_ranges=[BASE + 200 * STEP]))
+
+    async def scenario():
+        await cache.get("ok", BASE, BASE + 10 * STEP, FIDELITY)
+        with pytest.raises(ConnectionError):
+            await cache.get("failing", BASE + 200 * STEP, BASE + 210 * STEP, FIDELITY)
+
+    run(scenario())
+    assert cache._locks == {}
+
+
+def test_eviction_does_not_split_a_key_lock_in_use():
+    gate = asyncio.Event()
+    in_flight = {}
+    max_in_flight = {}
+
+    async def upstream(token_id, start_ts, end_ts, fidelity):
+        in_flight[token_id] = in_flight.get(token_id, 0) + 1
+        max_in_flight[token_id] = max(max_in_flight.get(token_id, 0), in_flight[token_id])
+        try:
+            if token_id == "a":
+                await gate.wait()
+            return [{"timestamp": ts, "price": 0.5} for ts in range(start_ts, end_ts + 1, STEP)]
+        finally:
+            in_flight[token_id] -= 1
+
+    cache = PriceRangeCache(upstream, max_entries=1)
+
+    async def scenario():
+        gate.set()
+        await cache.get("a", BASE, BASE + 10 * STEP, FIDELITY)
+        gate.clear()
+        holder = asyncio.create_task(cache.get("a", BASE + 20 * STEP, BASE + 30 * STEP, FIDELITY))
+        await asyncio.sleep(0)
+        await cache.get("b", BASE, BASE + 10 * STEP, FIDELITY)  # Evicts "a" while its lock is held
+        late = asyncio.create_task(cache.get("a", BASE + 20 * STEP, BASE + 30 * STEP, FIDELITY))
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(holder, late)
+
+    run(scenario())
+    assert max_in_flight["a"] == 1
+    assert cache._locks == {}
+
+
+def test_point_bound_evicts_least_recently_used_keys():
+    cache = PriceRangeCache(FakeUpstream(), max_points=150)
+
+    async def scenario():
+        await cache.get("a", BASE, BASE + 100 * STEP, FIDELITY)
+        await cache.get("b", BASE, BASE + 100 * STEP, FIDELITY)
+
+    run(scenario())
+    stats = cache.stats()
+    assert stats["keys"] == 1
+    assert stats["points"] == 101